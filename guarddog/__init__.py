@@ -1,2 +1,16 @@
-from guarddog.scanners.npm_package_scanner import NPMPackageScanner  # NOQA
-from guarddog.scanners.pypi_package_scanner import PypiPackageScanner  # NOQA
+def __getattr__(name: str) -> object:
+    # Scanners are imported on first access, so that importing guarddog (e.g. to run its CLI) stays fast
+    match name:
+        case "__version__":
+            from importlib.metadata import PackageNotFoundError, version
+            try:
+                return version("guarddog")
+            except PackageNotFoundError:
+                return "unknown"
+        case "NPMPackageScanner":
+            from guarddog.scanners.npm_package_scanner import NPMPackageScanner
+            return NPMPackageScanner
+        case "PypiPackageScanner":
+            from guarddog.scanners.pypi_package_scanner import PypiPackageScanner
+            return PypiPackageScanner
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
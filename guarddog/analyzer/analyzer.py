@@ -1,24 +1,97 @@
+import asyncio
+import functools
+import hashlib
 import json
 import logging
 import os
 import subprocess
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Optional, Iterable, List
+from typing import Optional, Iterable, List, Union
 
+import guarddog
+from guarddog.analyzer.manifest import MANIFEST_RULES
 from guarddog.analyzer.metadata import get_metadata_detectors
+from guarddog.analyzer.package_manifest import PackageManifest, build_manifest
+from guarddog.analyzer.profiling import ScanTimings
+from guarddog.analyzer.rule_catalog import RULES_PATH, get_catalog
+from guarddog.analyzer.sourcecode import SOURCECODE_REGEX_RULES, SOURCECODE_RULE_NAMES, SOURCECODE_RULE_TARGETS
+from guarddog.analyzer.targets import (
+    PackageTargets,
+    get_targets,
+    group_rules_by_targets,
+    list_files,
+    match_targets,
+    shard_targets,
+)
 from guarddog.ecosystems import ECOSYSTEM
+from guarddog.utils.parallelism import get_parallelism
 
 
-def get_rules(file_extension, path):
-    return set(rule.replace(file_extension, "") for rule in os.listdir(path) if rule.endswith(file_extension))
+SEMGREP_RULES_PATH = RULES_PATH
+SEMGREP_RULE_NAMES = SOURCECODE_RULE_NAMES
 
+# Target files are passed to Semgrep on its command line, which is bounded in size
+SEMGREP_MAX_TARGETS_PER_RUN = 1000
 
-SEMGREP_RULES_PATH = os.path.join(os.path.dirname(__file__), "sourcecode")
-SEMGREP_RULE_NAMES = get_rules(".yml", SEMGREP_RULES_PATH)
+# Packages are only split across several Semgrep processes when each of them gets at least this many bytes of code
+SEMGREP_MIN_SHARD_SIZE = 4 * 1024 * 1024
+
+# Bounds the number of Semgrep processes running at the same time, including across packages scanned in parallel
+SEMGREP_PROCESSES = threading.BoundedSemaphore(get_parallelism())
+
+# Seconds between two attempts of asynchronous analyses to get a slot in the budget of Semgrep processes
+SEMGREP_SLOT_POLL_INTERVAL = 0.05
+
+# Seconds after which a metadata detector, or the source code analysis of a package, is reported as failed. Threads
+# cannot be interrupted: a task that timed out keeps running in the background until it returns
+METADATA_DETECTOR_TIMEOUT = 5 * 60
+SOURCECODE_ANALYSIS_TIMEOUT = 30 * 60
 
 log = logging.getLogger("guarddog")
 
 
+@functools.cache
+def get_semgrep_version() -> Optional[str]:
+    """
+    Returns the version of the installed Semgrep package, or None if Semgrep is installed otherwise
+    """
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version("semgrep")
+    except PackageNotFoundError:
+        return None
+
+
+class SourceCodeAnalysis:
+    """
+    Source code analysis of a package, between the evaluation of its manifest rules and the end of its Semgrep runs
+
+    Attributes:
+        path (str): path to directory of package
+        targets (PackageTargets): files of the package
+        results (dict): map from each rule to its findings so far
+        errors (dict): map from each failed rule to its error
+        issues (int): number of rules with findings so far
+        timings (ScanTimings): time spent running each rule and analyzing each file
+        semgrep_rules (set): rules evaluated by Semgrep
+        semgrep_runs (list): (rule names, rule files, target paths) of each Semgrep run
+    """
+
+    def __init__(self, path: str, rules: Iterable[str], targets: PackageTargets) -> None:
+        self.path = path
+        self.targets = targets
+        self.results = {rule: {} for rule in rules}  # type: dict
+        self.errors = {}  # type: dict
+        self.issues = 0
+        self.timings = ScanTimings()
+        self.semgrep_rules = set()  # type: set[str]
+        self.semgrep_runs = []  # type: list[tuple[list[str], list[str], list[str]]]
+
+
 class Analyzer:
     """
     Analyzes a local directory for threats found by source code or metadata rules
@@ -27,23 +100,32 @@ class Analyzer:
         sourcecode_rules_path (str): path to source code rules
         ecosystem (str): name of the current ecosystem
         metadata_ruleset (list): list of metadata rule names
-        sourcecode_ruleset (list): list of source code rule names
+        sourcecode_ruleset (list): list of source code rule names, evaluated by Semgrep or by manifest rules
 
         exclude (list): list of directories to exclude from source code search
 
         metadata_detectors(list): list of metadata detectors
+
+        profile (bool): whether to report the time spent running each rule and analyzing each file, in a "timings"
+            section of the results
+
+        metadata_timeout (float): seconds after which a metadata detector is reported as failed
+        sourcecode_timeout (float): seconds after which the source code analysis is reported as failed
     """
 
-    def __init__(self, ecosystem=ECOSYSTEM.PYPI) -> None:
-        self.sourcecode_rules_path = os.path.join(os.path.dirname(__file__), "sourcecode")
+    def __init__(self, ecosystem=ECOSYSTEM.PYPI, profile: bool = False) -> None:
+        self.sourcecode_rules_path = SEMGREP_RULES_PATH
 
         self.ecosystem = ecosystem
+        self.profile = profile
+        self.metadata_timeout = METADATA_DETECTOR_TIMEOUT  # type: float
+        self.sourcecode_timeout = SOURCECODE_ANALYSIS_TIMEOUT  # type: float
 
         # Rules and associated detectors
         self.metadata_detectors = get_metadata_detectors(ecosystem)
 
         self.metadata_ruleset = self.metadata_detectors.keys()
-        self.sourcecode_ruleset = SEMGREP_RULE_NAMES
+        self.sourcecode_ruleset = SEMGREP_RULE_NAMES | set(MANIFEST_RULES.keys())
 
         # Define paths to exclude from sourcecode analysis
         self.exclude = [
@@ -61,7 +143,8 @@ class Analyzer:
             ".semgrep_logs",
         ]
 
-    def analyze(self, path, info=None, rules=None, name: Optional[str] = None, version: Optional[str] = None) -> dict:
+    def analyze(self, path, info=None, rules=None, name: Optional[str] = None, version: Optional[str] = None,
+                manifest: Optional[PackageManifest] = None) -> dict:
         """
         Analyzes a package in the given path
 
@@ -69,6 +152,8 @@ class Analyzer:
             path (str): path to package
             info (dict, optional): Any package information to analyze metadata. Defaults to None.
             rules (set, optional): Set of rules to analyze. Defaults to all rules.
+            manifest (PackageManifest, optional): manifest of the package, shared by the source code analysis and
+                the metadata detectors. Defaults to walking path once, if any of the rules reads files.
 
         Raises:
             Exception: "{rule} is not a valid rule."
@@ -77,140 +162,593 @@ class Analyzer:
             dict[str]: map from each rule and their corresponding output
         """
 
-        metadata_results = None
-        sourcecode_results = None
+        metadata_rules, sourcecode_rules = self._split_rules(rules)
+        if manifest is None and self._reads_files(metadata_rules, sourcecode_rules):
+            manifest = build_manifest(path)
 
-        # populate results, errors, and number of issues
-        metadata_rules = None
-        sourcecode_rules = None
-        if rules is not None:
-            # Only run specific rules
-            sourcecode_rules = set()
-            metadata_rules = set()
+        # Metadata detectors and the source code analysis are independent: they all run concurrently, so that
+        # whois lookups, repository clones and Semgrep overlap
+        metadata_count = len(metadata_rules if metadata_rules is not None else self.metadata_ruleset)
+        executor = ThreadPoolExecutor(max_workers=metadata_count + 1, thread_name_prefix="guarddog-analyzer")
+        try:
+            log.debug(f"Running source code rules against directory '{path}'")
+            sourcecode_deadline = time.monotonic() + self.sourcecode_timeout
+            # Semgrep processes still running at the deadline are killed, they must not outlive the package directory
+            sourcecode_future = executor.submit(self.analyze_sourcecode, path, sourcecode_rules, manifest,
+                                                sourcecode_deadline)
 
-            for rule in rules:
-                if rule in self.sourcecode_ruleset:
-                    log.debug(f"Using source code rule {rule}")
-                    sourcecode_rules.add(rule)
-                elif rule in self.metadata_ruleset:
-                    log.debug(f"Using metadata rule {rule}")
-                    metadata_rules.add(rule)
-                else:
-                    raise Exception(f"{rule} is not a valid rule.")
+            log.debug(f"Running metadata rules against package '{name}'")
+            metadata_results = self.analyze_metadata(path, info, metadata_rules, name, version, executor=executor,
+                                                     manifest=manifest)
 
-        log.debug(f"Running metadata rules against package '{name}'")
-        metadata_results = self.analyze_metadata(path, info, metadata_rules, name, version)
+            try:
+                sourcecode_results = sourcecode_future.result(timeout=max(0, sourcecode_deadline - time.monotonic()))
+            except FutureTimeoutError:
+                sourcecode_results = self._get_sourcecode_timeout_results(sourcecode_rules)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return self._merge_results(path, metadata_results, sourcecode_results)
+
+    async def analyze_async(self, path, info=None, rules=None, name: Optional[str] = None,
+                            version: Optional[str] = None, manifest: Optional[PackageManifest] = None) -> dict:
+        """
+        Asynchronous variant of analyze, for applications running an asyncio event loop. Metadata detectors and
+        Semgrep run concurrently, and cancelling the analysis kills the Semgrep processes it started.
+
+        Args:
+            path (str): path to package
+            info (dict, optional): Any package information to analyze metadata. Defaults to None.
+            rules (set, optional): Set of rules to analyze. Defaults to all rules.
+            manifest (PackageManifest, optional): manifest of the package, shared by the source code analysis and
+                the metadata detectors. Defaults to walking path once, if any of the rules reads files.
+
+        Raises:
+            Exception: "{rule} is not a valid rule."
 
-        log.debug(f"Running source code rules against directory '{path}'")
-        sourcecode_results = self.analyze_sourcecode(path, sourcecode_rules)
+        Returns:
+            dict[str]: map from each rule and their corresponding output
+        """
+        metadata_rules, sourcecode_rules = self._split_rules(rules)
+        if manifest is None and self._reads_files(metadata_rules, sourcecode_rules):
+            # Walking the package blocks, it is done in a thread
+            manifest = await asyncio.to_thread(build_manifest, path)
 
+        async def analyze_sourcecode() -> dict:
+            try:
+                return await asyncio.wait_for(self.analyze_sourcecode_async(path, sourcecode_rules, manifest),
+                                              timeout=self.sourcecode_timeout)
+            except asyncio.TimeoutError:
+                return self._get_sourcecode_timeout_results(sourcecode_rules)
+
+        metadata_results, sourcecode_results = await asyncio.gather(
+            self.analyze_metadata_async(path, info, metadata_rules, name, version, manifest),
+            analyze_sourcecode(),
+        )
+        return self._merge_results(path, metadata_results, sourcecode_results)
+
+    def _split_rules(self, rules) -> tuple[Optional[set], Optional[set]]:
+        """
+        Splits rules into metadata and source code rules, which are all rules of each kind if rules is None
+
+        Raises:
+            Exception: "{rule} is not a valid rule."
+        """
+        if rules is None:
+            return None, None
+
+        # Only run specific rules
+        sourcecode_rules = set()
+        metadata_rules = set()
+        for rule in rules:
+            if rule in self.sourcecode_ruleset:
+                log.debug(f"Using source code rule {rule}")
+                sourcecode_rules.add(rule)
+            elif rule in self.metadata_ruleset:
+                log.debug(f"Using metadata rule {rule}")
+                metadata_rules.add(rule)
+            else:
+                raise Exception(f"{rule} is not a valid rule.")
+        return metadata_rules, sourcecode_rules
+
+    def _reads_files(self, metadata_rules: Optional[set], sourcecode_rules: Optional[set]) -> bool:
+        """
+        Returns whether any of the rules reads the files of the package, which are then listed in a manifest
+        """
+        if sourcecode_rules is None or len(sourcecode_rules) > 0:
+            return True
+        return any(self.metadata_detectors.reads_files(rule)
+                   for rule in (metadata_rules if metadata_rules is not None else self.metadata_ruleset))
+
+    def get_ruleset_fingerprint(self, rules=None) -> str:
+        """
+        Returns a hash of the rules a scan runs, of the Semgrep rule files, of the excluded directories and of the
+        versions of GuardDog and Semgrep, which identifies the results of scans together with the versions of the
+        metadata detectors. The versions cover the rules evaluated by GuardDog itself and the rule engine.
+
+        Args:
+            rules (set, optional): Set of rules to analyze. Defaults to all rules.
+        """
+        self._split_rules(rules)
+        selected_rules = rules if rules is not None else set(self.metadata_ruleset) | self.sourcecode_ruleset
+        fingerprint = {
+            "catalog": get_catalog().key,
+            "rules": sorted(selected_rules),
+            "exclude": self.exclude,
+            "guarddog": guarddog.__version__,
+            "semgrep": get_semgrep_version(),
+        }
+        return hashlib.sha256(json.dumps(fingerprint).encode()).hexdigest()
+
+    def get_detector_versions(self, rules=None) -> dict[str, int]:
+        """
+        Returns the version of each metadata detector a scan runs
+        """
+        metadata_rules, _ = self._split_rules(rules)
+        return {
+            rule: self.metadata_detectors.get_version(rule)
+            for rule in sorted(metadata_rules if metadata_rules is not None else self.metadata_ruleset)
+        }
+
+    def get_detector_ttls(self, rules=None) -> dict[str, int]:
+        """
+        Returns the number of seconds the results of each time-sensitive metadata detector a scan runs are valid for
+        """
+        metadata_rules, _ = self._split_rules(rules)
+        ttls = {}
+        for rule in metadata_rules if metadata_rules is not None else self.metadata_ruleset:
+            ttl = self.metadata_detectors.get_ttl(rule)
+            if ttl is not None:
+                ttls[rule] = ttl
+        return ttls
+
+    def _get_sourcecode_timeout_results(self, rules) -> dict:
+        timed_out_rules = rules if rules is not None else self.sourcecode_ruleset
+        return {"results": {}, "issues": 0, "errors": {
+            rule: f"failed to run rule {rule}: timed out after {self.sourcecode_timeout} seconds"
+            for rule in timed_out_rules
+        }}
+
+    def _merge_results(self, path, metadata_results: dict, sourcecode_results: dict) -> dict:
         # Concatenate dictionaries together
         issues = metadata_results["issues"] + sourcecode_results["issues"]
         results = metadata_results["results"] | sourcecode_results["results"]
         errors = metadata_results["errors"] | sourcecode_results["errors"]
 
-        return {"issues": issues, "errors": errors, "results": results, "path": path}
+        output = {"issues": issues, "errors": errors, "results": results, "path": path,
+                  "targets": sourcecode_results.get("targets")}
+        if self.profile:
+            output["timings"] = metadata_results.get("timings", {}) | sourcecode_results.get("timings", {})
+        return output
 
-    def analyze_metadata(self, path: str, info, rules=None, name: Optional[str] = None,
-                         version: Optional[str] = None) -> dict:
+    def analyze_metadata(self, path: Optional[str], info, rules=None, name: Optional[str] = None,
+                         version: Optional[str] = None, executor: Optional[Executor] = None,
+                         manifest: Optional[PackageManifest] = None) -> dict:
         """
-        Analyzes the metadata of a given package
+        Analyzes the metadata of a given package, running the detectors concurrently
 
         Args:
-            path (str): path to package
+            path (str): path to package, None when only detectors not reading its files run
             info (dict): package information given by PyPI Json API
             rules (set, optional): Set of metadata rules to analyze. Defaults to all rules.
+            executor (Executor, optional): executor running the detectors. Defaults to a thread per detector.
+            manifest (PackageManifest, optional): manifest of the package. Defaults to detectors walking path.
 
         Returns:
             dict[str]: map from each metadata rule and their corresponding output
         """
 
-        all_rules = rules if rules is not None else self.metadata_ruleset
+        all_rules = list(rules if rules is not None else self.metadata_ruleset)
         results = {}
         errors = {}
         issues = 0
+        timings = ScanTimings()
 
-        for rule in all_rules:
-            try:
-                log.debug(f"Running rule {rule} against package '{name}'")
-                rule_matches, message = self.metadata_detectors[rule].detect(info, path, name, version)
+        own_executor = None
+        if executor is None:
+            executor = own_executor = ThreadPoolExecutor(max_workers=max(1, len(all_rules)),
+                                                         thread_name_prefix="guarddog-metadata")
+        try:
+            futures: list[tuple[str, float, Future]] = []
+            for rule in all_rules:
+                deadline = time.monotonic() + self.metadata_timeout
+                futures.append((rule, deadline, executor.submit(self._run_metadata_detector, rule, info, path, name,
+                                                                version, timings, manifest)))
+
+            # Results are merged in rule order, so that they are reported in a stable order
+            for rule, deadline, future in futures:
+                try:
+                    rule_matches, message = future.result(timeout=max(0, deadline - time.monotonic()))
+                    if rule_matches:
+                        issues += 1
+                        results[rule] = message
+                except FutureTimeoutError:
+                    errors[rule] = f"failed to run rule {rule}: timed out after {self.metadata_timeout} seconds"
+                except Exception as e:
+                    errors[rule] = f"failed to run rule {rule}: {str(e)}"
+        finally:
+            if own_executor is not None:
+                own_executor.shutdown(wait=False, cancel_futures=True)
+
+        output = {"results": results, "errors": errors, "issues": issues}
+        if self.profile:
+            output["timings"] = timings.get_metadata_timings()
+        return output
+
+    async def analyze_metadata_async(self, path: Optional[str], info, rules=None, name: Optional[str] = None,
+                                     version: Optional[str] = None,
+                                     manifest: Optional[PackageManifest] = None) -> dict:
+        """
+        Asynchronous variant of analyze_metadata, running the detect_async method of the detectors concurrently
+
+        Args:
+            path (str): path to package, None when only detectors not reading its files run
+            info (dict): package information given by PyPI Json API
+            rules (set, optional): Set of metadata rules to analyze. Defaults to all rules.
+            manifest (PackageManifest, optional): manifest of the package. Defaults to detectors walking path.
+
+        Returns:
+            dict[str]: map from each metadata rule and their corresponding output
+        """
+        all_rules = list(rules if rules is not None else self.metadata_ruleset)
+        results = {}
+        errors = {}
+        issues = 0
+        timings = ScanTimings()
+
+        outcomes = await asyncio.gather(
+            *(self._run_metadata_detector_async(rule, info, path, name, version, timings, manifest)
+              for rule in all_rules),
+            return_exceptions=True,
+        )
+        for rule, outcome in zip(all_rules, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                errors[rule] = f"failed to run rule {rule}: timed out after {self.metadata_timeout} seconds"
+            elif isinstance(outcome, Exception):
+                errors[rule] = f"failed to run rule {rule}: {str(outcome)}"
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                rule_matches, message = outcome
                 if rule_matches:
                     issues += 1
                     results[rule] = message
-            except Exception as e:
-                errors[rule] = f"failed to run rule {rule}: {str(e)}"
 
-        return {"results": results, "errors": errors, "issues": issues}
+        output = {"results": results, "errors": errors, "issues": issues}
+        if self.profile:
+            output["timings"] = timings.get_metadata_timings()
+        return output
 
-    def analyze_sourcecode(self, path, rules=None) -> dict:
+    async def _run_metadata_detector_async(self, rule: str, info, path: Optional[str], name: Optional[str],
+                                           version: Optional[str], timings: ScanTimings,
+                                           manifest: Optional[PackageManifest] = None) -> tuple[bool, Optional[str]]:
+        start = time.perf_counter()
+        try:
+            log.debug(f"Running rule {rule} against package '{name}'")
+            return await asyncio.wait_for(self.metadata_detectors[rule].detect_async(info, path, name, version,
+                                                                                     manifest),
+                                          timeout=self.metadata_timeout)
+        finally:
+            timings.add_metadata_time(rule, time.perf_counter() - start)
+
+    def _run_metadata_detector(self, rule: str, info, path: Optional[str], name: Optional[str], version: Optional[str],
+                               timings: ScanTimings,
+                               manifest: Optional[PackageManifest] = None) -> tuple[bool, Optional[str]]:
+        start = time.perf_counter()
+        try:
+            log.debug(f"Running rule {rule} against package '{name}'")
+            return self.metadata_detectors[rule].detect(info, path, name, version, manifest)
+        finally:
+            timings.add_metadata_time(rule, time.perf_counter() - start)
+
+    def analyze_sourcecode(self, path, rules=None, manifest: Optional[PackageManifest] = None,
+                           deadline: Optional[float] = None) -> dict:
         """
         Analyzes the source code of a given package
 
         Args:
             path (str): path to directory of package
             rules (set, optional): Set of source code rules to analyze. Defaults to all rules.
+            manifest (PackageManifest, optional): manifest of the package. Defaults to walking path.
+            deadline (float, optional): time.monotonic() value after which Semgrep processes are killed and their
+                rules reported as timed out. Defaults to no deadline.
 
         Returns:
             dict[str]: map from each source code rule and their corresponding output
         """
-        targetpath = Path(path)
+        analysis = self._prepare_sourcecode_analysis(path, rules, manifest)
+        if analysis is None:
+            return {"results": {}, "errors": {}, "issues": 0}
+
+        responses = []  # type: list[Union[dict, Exception]]
+        if len(analysis.semgrep_runs) > 0:
+            with ThreadPoolExecutor(max_workers=min(len(analysis.semgrep_runs), get_parallelism())) as executor:
+                futures = [
+                    executor.submit(self._invoke_semgrep_shard, target_paths, rules_path, deadline)
+                    for _, rules_path, target_paths in analysis.semgrep_runs
+                ]
+                for future in futures:
+                    try:
+                        responses.append(future.result())
+                    except Exception as e:
+                        responses.append(e)
+
+        return self._complete_sourcecode_analysis(analysis, responses)
+
+    async def analyze_sourcecode_async(self, path, rules=None, manifest: Optional[PackageManifest] = None) -> dict:
+        """
+        Asynchronous variant of analyze_sourcecode, running Semgrep as asyncio subprocesses. Cancelling the analysis
+        kills the Semgrep processes it started.
+
+        Args:
+            path (str): path to directory of package
+            rules (set, optional): Set of source code rules to analyze. Defaults to all rules.
+            manifest (PackageManifest, optional): manifest of the package. Defaults to walking path.
+
+        Returns:
+            dict[str]: map from each source code rule and their corresponding output
+        """
+        # Listing and reading files blocks, it is done in a thread
+        analysis = await asyncio.to_thread(self._prepare_sourcecode_analysis, path, rules, manifest)
+        if analysis is None:
+            return {"results": {}, "errors": {}, "issues": 0}
+
+        outcomes = await asyncio.gather(
+            *(self._invoke_semgrep_shard_async(target_paths, rules_path)
+              for _, rules_path, target_paths in analysis.semgrep_runs),
+            return_exceptions=True,
+        )
+        responses = []  # type: list[Union[dict, Exception]]
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                raise outcome
+            responses.append(outcome)
+
+        return await asyncio.to_thread(self._complete_sourcecode_analysis, analysis, responses)
+
+    def _prepare_sourcecode_analysis(self, path, rules=None,
+                                     manifest: Optional[PackageManifest] = None) -> Optional[SourceCodeAnalysis]:
+        """
+        Discovers the files of a package, evaluates manifest rules and plans the Semgrep runs of the remaining rules
+
+        Returns:
+            SourceCodeAnalysis: analysis waiting for the responses of its Semgrep runs, or None if there are no rules
+        """
         all_rules = rules if rules is not None else self.sourcecode_ruleset
-        results = {rule: {} for rule in all_rules}  # type: dict
+        if len(all_rules) == 0:
+            log.debug("No source code rules to run")
+            return None
+
+        targets = get_targets(manifest if manifest is not None else build_manifest(path), self.exclude)
+        files = targets.files
+        analysis = SourceCodeAnalysis(path, all_rules, targets)
+
+        # Manifest rules are evaluated in-process, Semgrep only runs the remaining rules
+        manifest_rules = set(rule for rule in all_rules if rule in MANIFEST_RULES)
+        if len(manifest_rules) > 0:
+            manifest_results = self.analyze_manifests(path, manifest_rules, files, analysis.timings)
+            analysis.issues += manifest_results["issues"]
+            analysis.results = analysis.results | manifest_results["results"]
+            analysis.errors = analysis.errors | manifest_results["errors"]
+
+        # Rules declaring the same targets share a Semgrep run, which only receives the files these rules can match.
+        # The files of large packages are split into shards of balanced size, analyzed by parallel Semgrep processes
+        analysis.semgrep_rules = set(all_rules) - manifest_rules
+        for rule_targets, group in group_rules_by_targets(analysis.semgrep_rules, SOURCECODE_RULE_TARGETS).items():
+            rules_path = [os.path.join(self.sourcecode_rules_path, f"{rule_name}.yml") for rule_name in group]
+            if rule_targets is None:
+                analysis.semgrep_runs.append((group, rules_path, [path]))
+                continue
+
+            group_files = [file for file in files if match_targets(file, rule_targets)]
+            if len(group_files) == 0:
+                log.debug(f"No file matching {', '.join(rule_targets)}, skipping rules {', '.join(group)}")
+                continue
+
+            shards = shard_targets(group_files, targets.sizes, get_parallelism(), SEMGREP_MIN_SHARD_SIZE,
+                                   SEMGREP_MAX_TARGETS_PER_RUN)
+            log.debug(f"Running source code rules {', '.join(group)} against {len(group_files)} targets "
+                      f"in {len(shards)} shards")
+            for shard in shards:
+                analysis.semgrep_runs.append((group, rules_path, [os.path.join(path, file) for file in shard]))
+
+        return analysis
+
+    def _complete_sourcecode_analysis(self, analysis: SourceCodeAnalysis,
+                                      responses: list[Union[dict, Exception]]) -> dict:
+        """
+        Merges the responses of the Semgrep runs of an analysis, in the order of the runs, and searches minified files
+
+        Args:
+            analysis (SourceCodeAnalysis): analysis the Semgrep runs belong to
+            responses (list): response of each Semgrep run, or the exception it raised
+        """
+        path = analysis.path
+        targetpath = Path(path)
+        targets = analysis.targets
+        errors = analysis.errors
+        timings = analysis.timings
+
+        semgrep_results = {}  # type: dict[str, list]
+        # Results are merged in submission order, so that findings are reported in a stable order
+        for (group, _, _), response in zip(analysis.semgrep_runs, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                rule_results = self._format_semgrep_response(response, targetpath=targetpath)
+            except Exception as e:
+                for rule_name in group:
+                    errors[rule_name] = f"failed to run rule {rule_name}: {str(e)}"
+                continue
+            if self.profile:
+                timings.add_semgrep_timings(response.get("time", {}), targetpath=str(targetpath))
+            for rule_name, findings in rule_results.items():
+                semgrep_results.setdefault(rule_name, []).extend(findings)
+
+        # Minified files are too expensive for Semgrep, only rules made of regexes search them
+        for rule_name in filter(lambda rule_name: rule_name in SOURCECODE_REGEX_RULES, analysis.semgrep_rules):
+            regex_rule = SOURCECODE_REGEX_RULES[rule_name]
+            regex_rule_targets = SOURCECODE_RULE_TARGETS.get(rule_name)
+            for file in targets.minified:
+                if regex_rule_targets is not None and not match_targets(file, regex_rule_targets):
+                    continue
+                start = time.perf_counter()
+                try:
+                    matches = regex_rule.analyze_file(os.path.join(path, file))
+                except Exception as e:
+                    errors[rule_name] = f"failed to run rule {rule_name}: {str(e)}"
+                    continue
+                finally:
+                    elapsed = time.perf_counter() - start
+                    timings.add_rule_time(rule_name, match_time=elapsed)
+                    timings.add_file_time(file, elapsed)
+                for line, code in matches:
+                    semgrep_results.setdefault(rule_name, []).append({
+                        'location': file + ":" + str(line),
+                        'code': self.trim_code_snippet(code),
+                        'message': regex_rule.message
+                    })
+
+        issues = analysis.issues + len(semgrep_results)
+        results = analysis.results | semgrep_results
+
+        output = {"results": results, "errors": errors, "issues": issues, "targets": targets.get_statistics()}
+        if self.profile:
+            output["timings"] = timings.get_sourcecode_timings()
+        return output
+
+    def analyze_manifests(self, path, rules=None, files: Optional[List[str]] = None,
+                          timings: Optional[ScanTimings] = None) -> dict:
+        """
+        Analyzes the manifests of a given package (package.json, setup.py, ...) without invoking Semgrep
+
+        Args:
+            path (str): path to directory of package
+            rules (set, optional): Set of manifest rules to analyze. Defaults to all manifest rules.
+            files (list, optional): paths of the package files relative to path. Defaults to listing path.
+            timings (ScanTimings, optional): records the time spent running each rule on each file
+
+        Returns:
+            dict[str]: map from each manifest rule and their corresponding output, in the same format as
+            analyze_sourcecode
+        """
+        all_rules = rules if rules is not None else MANIFEST_RULES.keys()
+        results = {}  # type: dict
         errors = {}
         issues = 0
 
-        rules_path: List[str]
-        if rules is None:
-            log.debug(f"No rules specified using full rules directory {self.sourcecode_rules_path}")
-            rules_path = [self.sourcecode_rules_path]
-        else:
-            rules_path = list(map(
-                lambda rule_name: os.path.join(self.sourcecode_rules_path, f"{rule_name}.yml"),
-                rules
-            ))
+        if files is None:
+            files = list_files(path, self.exclude)
+        if timings is None:
+            timings = ScanTimings()
+
+        for rule_name in all_rules:
+            rule = MANIFEST_RULES[rule_name]
+            for file in filter(lambda file: match_targets(file, rule.targets), files):
+                start = time.perf_counter()
+                try:
+                    matches = rule.analyze_manifest(os.path.join(path, file))
+                except Exception as e:
+                    errors[rule_name] = f"failed to run rule {rule_name}: {str(e)}"
+                    continue
+                finally:
+                    elapsed = time.perf_counter() - start
+                    timings.add_rule_time(rule_name, match_time=elapsed)
+                    timings.add_file_time(file, elapsed)
+                for line, code in matches:
+                    results.setdefault(rule_name, []).append({
+                        'location': file + ":" + str(line),
+                        'code': self.trim_code_snippet(code),
+                        'message': rule.get_message()
+                    })
+
+        issues += len(results)
+        return {"results": results, "errors": errors, "issues": issues}
 
-        if len(rules_path) == 0:
-            log.debug("No source code rules to run")
-            return {"results": {}, "errors": {}, "issues": 0}
+    def _invoke_semgrep_shard(self, targets: Iterable[str], rules: Iterable[str], deadline: Optional[float] = None):
+        """
+        Invokes Semgrep once a slot in the global budget of Semgrep processes is available
+        """
+        with SEMGREP_PROCESSES:
+            return self._invoke_semgrep(targets=targets, rules=rules, deadline=deadline)
 
+    async def _invoke_semgrep_shard_async(self, targets: Iterable[str], rules: Iterable[str]):
+        """
+        Invokes Semgrep asynchronously once a slot in the global budget of Semgrep processes is available. The budget
+        is shared with synchronous analyses, it is polled so that waiting for a slot can be cancelled.
+        """
+        while not SEMGREP_PROCESSES.acquire(blocking=False):
+            await asyncio.sleep(SEMGREP_SLOT_POLL_INTERVAL)
         try:
-            log.debug(f"Running source code rules against {path}")
-            response = self._invoke_semgrep(target=path, rules=rules_path)
-            rule_results = self._format_semgrep_response(response, targetpath=targetpath)
-            issues += len(rule_results)
-
-            results = results | rule_results
-        except Exception as e:
-            errors["rules-all"] = f"failed to run rule: {str(e)}"
+            return await self._invoke_semgrep_async(targets=targets, rules=rules)
+        finally:
+            SEMGREP_PROCESSES.release()
+
+    def _get_semgrep_command(self, targets: Iterable[str], rules: Iterable[str]) -> list[str]:
+        cmd = ["semgrep"]
+        for rule in rules:
+            cmd.extend(["--config", rule])
+
+        for excluded in self.exclude:
+            cmd.extend(["--exclude", excluded])
+        cmd.append("--no-git-ignore")
+        cmd.append("--json")
+        cmd.append("--quiet")
+        if self.profile:
+            cmd.append("--time")
+        cmd.extend(targets)
+        log.debug(f"Invoking semgrep with command line: {' '.join(cmd)}")
+        return cmd
+
+    @staticmethod
+    def _get_semgrep_error_message(cmd: list[str], returncode: Optional[int], output: str) -> str:
+        return f"""
+An error occurred when running Semgrep.
 
-        return {"results": results, "errors": errors, "issues": issues}
+command: {" ".join(cmd)}
+status code: {returncode}
+output: {output}
+"""
 
-    def _invoke_semgrep(self, target: str, rules: Iterable[str]):
+    def _invoke_semgrep(self, targets: Iterable[str], rules: Iterable[str], deadline: Optional[float] = None):
+        timeout = max(0, deadline - time.monotonic()) if deadline is not None else None
+        if timeout == 0:
+            raise Exception(f"timed out after {self.sourcecode_timeout} seconds")
         try:
-            cmd = ["semgrep"]
-            for rule in rules:
-                cmd.extend(["--config", rule])
-
-            for excluded in self.exclude:
-                cmd.append(f"--exclude='{excluded}'")
-            cmd.append("--no-git-ignore")
-            cmd.append("--json")
-            cmd.append("--quiet")
-            cmd.append(target)
-            log.debug(f"Invoking semgrep with command line: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, check=True, encoding="utf-8")
+            cmd = self._get_semgrep_command(targets, rules)
+            # Semgrep is killed once the timeout expires
+            result = subprocess.run(cmd, capture_output=True, check=True, encoding="utf-8", timeout=timeout)
             return json.loads(str(result.stdout))
+        except subprocess.TimeoutExpired:
+            raise Exception(f"timed out after {self.sourcecode_timeout} seconds")
         except FileNotFoundError:
             raise Exception("unable to find semgrep binary")
         except subprocess.CalledProcessError as e:
-            error_message = f"""
-An error occurred when running Semgrep.
+            raise Exception(self._get_semgrep_error_message(e.cmd, e.returncode, e.output))
+        except json.JSONDecodeError as e:
+            raise Exception("unable to parse semgrep JSON output: " + str(e))
 
-command: {" ".join(e.cmd)}
-status code: {e.returncode}
-output: {e.output}
-"""
-            raise Exception(error_message)
+    async def _invoke_semgrep_async(self, targets: Iterable[str], rules: Iterable[str]):
+        cmd = self._get_semgrep_command(targets, rules)
+        try:
+            process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE,
+                                                           stderr=asyncio.subprocess.PIPE)
+        except FileNotFoundError:
+            raise Exception("unable to find semgrep binary")
+
+        try:
+            stdout, _ = await process.communicate()
+        finally:
+            if process.returncode is None:
+                # The analysis was cancelled, Semgrep must not outlive it
+                process.kill()
+                await process.wait()
+
+        output = stdout.decode("utf-8", errors="replace")
+        if process.returncode != 0:
+            raise Exception(self._get_semgrep_error_message(cmd, process.returncode, output))
+        try:
+            return json.loads(output)
         except json.JSONDecodeError as e:
             raise Exception("unable to parse semgrep JSON output: " + str(e))
 
@@ -251,13 +789,13 @@ output: {e.output}
             location = file_path + ":" + str(line)
             code = self.trim_code_snippet(code_snippet)
 
-            if rule_name not in result:
+            if rule_name not in results:
                 results[rule_name] = []
-                results[rule_name].append({
-                    'location': location,
-                    'code': code,
-                    'message': result["extra"]["message"]
-                })
+            results[rule_name].append({
+                'location': location,
+                'code': code,
+                'message': result["extra"]["message"]
+            })
 
         return results
 
@@ -0,0 +1,19 @@
+from guarddog.analyzer.manifest.cmd_overwrite import CmdOverwriteRule
+from guarddog.analyzer.manifest.npm_install_script import NPMInstallScriptRule
+from guarddog.analyzer.manifest.rule import ManifestRule
+from guarddog.ecosystems import ECOSYSTEM
+
+MANIFEST_RULES = {}  # type: dict[str, ManifestRule]
+
+classes = [
+    CmdOverwriteRule,
+    NPMInstallScriptRule
+]
+
+for ruleClass in classes:
+    ruleInstance = ruleClass()  # type: ignore
+    MANIFEST_RULES[ruleInstance.get_name()] = ruleInstance
+
+
+def get_manifest_rules(ecosystem: ECOSYSTEM) -> dict[str, ManifestRule]:
+    return {name: rule for name, rule in MANIFEST_RULES.items() if rule.ecosystem == ecosystem}
@@ -0,0 +1,123 @@
+""" Command Overwrite Rule
+
+Detects when setuptools commands run at install time (install, develop, egg_info) are overwritten
+"""
+import ast
+import configparser
+import logging
+import os
+import re
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib  # type: ignore
+
+from guarddog.analyzer.manifest.rule import ManifestRule, find_line_number
+from guarddog.ecosystems import ECOSYSTEM
+
+OVERWRITTEN_COMMANDS_REGEX = re.compile(r"install|develop|egg_info")
+
+log = logging.getLogger("guarddog")
+
+
+def _is_setup_call(node: ast.Call) -> bool:
+    function = node.func
+    if isinstance(function, ast.Name):
+        return function.id == "setup"
+    if isinstance(function, ast.Attribute):
+        return function.attr == "setup" and isinstance(function.value, ast.Name) and function.value.id == "setuptools"
+    return False
+
+
+def _overwrites_install_command(commands) -> bool:
+    return any(isinstance(command, str) and OVERWRITTEN_COMMANDS_REGEX.match(command) for command in commands)
+
+
+class CmdOverwriteRule(ManifestRule):
+    """This package is overwriting the 'install' command in setup.py"""
+
+    def __init__(self) -> None:
+        super().__init__(
+            name="cmd-overwrite",
+            description="Identify when the 'install' command is overwritten in setup.py, indicating a piece of code "
+                        "automatically running when the package is installed",
+            message="This package is overwriting the 'install' command in setup.py",
+            ecosystem=ECOSYSTEM.PYPI,
+            targets=["setup.py", "setup.cfg", "pyproject.toml"],
+        )
+
+    def analyze_manifest(self, path: str) -> list[tuple[int, str]]:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            contents = f.read()
+
+        match os.path.basename(path):
+            case "setup.py":
+                return self._analyze_setup_py(path, contents)
+            case "setup.cfg":
+                return self._analyze_setup_cfg(path, contents)
+            case "pyproject.toml":
+                return self._analyze_pyproject_toml(path, contents)
+        return []
+
+    def _analyze_setup_py(self, path: str, contents: str) -> list[tuple[int, str]]:
+        """
+        Finds calls to setup(..., cmdclass={"install": ...}, ...) in a setup.py file
+        """
+        try:
+            tree = ast.parse(contents, filename=path)
+        except (SyntaxError, ValueError) as e:
+            log.debug(f"Unable to parse {path}, skipping: {str(e)}")
+            return []
+
+        matches = []
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call) or not _is_setup_call(node):
+                continue
+            for keyword in node.keywords:
+                if keyword.arg != "cmdclass" or not isinstance(keyword.value, ast.Dict):
+                    continue
+                commands = [key.value for key in keyword.value.keys if isinstance(key, ast.Constant)]
+                if _overwrites_install_command(commands):
+                    code = ast.get_source_segment(contents, node) or ""
+                    matches.append((node.lineno, code))
+        return matches
+
+    def _analyze_setup_cfg(self, path: str, contents: str) -> list[tuple[int, str]]:
+        """
+        Finds a cmdclass option overwriting an install command in the [options] section of a setup.cfg file
+        """
+        config = configparser.ConfigParser(interpolation=None)
+        try:
+            config.read_string(contents, source=path)
+        except configparser.Error as e:
+            log.debug(f"Unable to parse {path}, skipping: {str(e)}")
+            return []
+
+        raw_cmdclass = config.get("options", "cmdclass", fallback=None)
+        if raw_cmdclass is None:
+            return []
+
+        # cmdclass is a dangling list of "command = module.Class" entries
+        commands = [entry.split("=", 1)[0].strip() for entry in raw_cmdclass.splitlines() if "=" in entry]
+        if not _overwrites_install_command(commands):
+            return []
+        line = find_line_number(contents, re.compile(r"^\s*cmdclass\s*=", re.MULTILINE))
+        return [(line, f"cmdclass = {raw_cmdclass.strip()}")]
+
+    def _analyze_pyproject_toml(self, path: str, contents: str) -> list[tuple[int, str]]:
+        """
+        Finds a [tool.setuptools.cmdclass] table overwriting an install command in a pyproject.toml file
+        """
+        try:
+            pyproject = tomllib.loads(contents)
+        except tomllib.TOMLDecodeError as e:
+            log.debug(f"Unable to parse {path}, skipping: {str(e)}")
+            return []
+
+        cmdclass = pyproject.get("tool", {}).get("setuptools", {}).get("cmdclass")
+        if not isinstance(cmdclass, dict) or not _overwrites_install_command(cmdclass.keys()):
+            return []
+        line = find_line_number(contents, re.compile(r"cmdclass"))
+        code = ", ".join(f"{command} = {target}" for command, target in cmdclass.items())
+        return [(line, f"cmdclass = {{ {code} }}")]
@@ -0,0 +1,51 @@
+""" npm Install Script Rule
+
+Detects package.json scripts automatically running when the package is installed
+"""
+import json
+import logging
+import re
+
+from guarddog.analyzer.manifest.rule import ManifestRule, find_line_number
+from guarddog.ecosystems import ECOSYSTEM
+
+INSTALL_SCRIPTS = ["preinstall", "install", "postinstall", "prepare"]
+
+log = logging.getLogger("guarddog")
+
+
+class NPMInstallScriptRule(ManifestRule):
+    """This package.json has a script automatically running when the package is installed"""
+
+    def __init__(self) -> None:
+        super().__init__(
+            name="npm-install-script",
+            description="Identify when a package has a pre or post-install script automatically running commands",
+            message="The package.json has a script automatically running when the package is installed",
+            ecosystem=ECOSYSTEM.NPM,
+            targets=["package.json"],
+        )
+
+    def analyze_manifest(self, path: str) -> list[tuple[int, str]]:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            contents = f.read()
+
+        try:
+            package = json.loads(contents)
+        except json.JSONDecodeError as e:
+            log.debug(f"Unable to parse {path}, skipping: {str(e)}")
+            return []
+
+        scripts = package.get("scripts") if isinstance(package, dict) else None
+        if not isinstance(scripts, dict):
+            return []
+
+        scripts_offset = max(contents.find('"scripts"'), 0)
+        matches = []
+        for script in INSTALL_SCRIPTS:
+            command = scripts.get(script)
+            if not isinstance(command, str):
+                continue
+            line = find_line_number(contents, re.compile(r'"' + script + r'"\s*:'), scripts_offset)
+            matches.append((line, f'"{script}": {json.dumps(command)}'))
+        return matches
@@ -0,0 +1,50 @@
+import re
+from abc import abstractmethod
+
+from guarddog.ecosystems import ECOSYSTEM
+
+
+class ManifestRule:
+    """
+    Source code rule evaluated in-process against package manifests (package.json, setup.py, ...) instead of Semgrep
+
+    Attributes:
+        name (str): name of the rule, shared with the Semgrep rule it replaces
+        description (str): description of the rule
+        message (str): message attached to each finding
+        ecosystem (ECOSYSTEM): ecosystem the manifests belong to
+        targets (list): globs of the manifests this rule analyzes
+    """
+
+    def __init__(self, name: str, description: str, message: str, ecosystem: ECOSYSTEM,
+                 targets: list[str]) -> None:
+        self.name = name
+        self.description = description
+        self.message = message
+        self.ecosystem = ecosystem
+        self.targets = targets
+
+    # returns a list of (line number, matching code)
+    @abstractmethod
+    def analyze_manifest(self, path: str) -> list[tuple[int, str]]:
+        pass  # pragma: no cover
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_description(self) -> str:
+        return self.description
+
+    def get_message(self) -> str:
+        return self.message
+
+
+def find_line_number(contents: str, pattern: re.Pattern, start: int = 0) -> int:
+    """
+    Returns the 1-based line of the first match of a regex in a file contents, looking from the offset start.
+    Defaults to the first line if there is no match
+    """
+    match = pattern.search(contents, start)
+    if match is None:
+        return 1
+    return contents.count("\n", 0, match.start()) + 1
@@ -1,10 +1,10 @@
-from guarddog.analyzer.metadata.detector import Detector
 from guarddog.analyzer.metadata.npm import NPM_METADATA_RULES
 from guarddog.analyzer.metadata.pypi import PYPI_METADATA_RULES
+from guarddog.analyzer.metadata.registry import DetectorRegistry
 from guarddog.ecosystems import ECOSYSTEM
 
 
-def get_metadata_detectors(ecosystem: ECOSYSTEM) -> dict[str, Detector]:
+def get_metadata_detectors(ecosystem: ECOSYSTEM) -> DetectorRegistry:
     match (ecosystem):
         case ECOSYSTEM.PYPI:
             return PYPI_METADATA_RULES
@@ -1,6 +1,9 @@
+import asyncio
 from abc import abstractmethod
 from typing import Optional
 
+from guarddog.analyzer.package_manifest import PackageManifest
+
 
 class Detector:
     RULE_NAME = ""
@@ -9,12 +12,22 @@ class Detector:
         self.name = name
         self.description = description
 
-    # returns (ruleMatches, message)
+    # returns (ruleMatches, message). The manifest lists the files of the package at path, when the analyzer built one
     @abstractmethod
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, Optional[str]]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, Optional[str]]:
         pass  # pragma: no cover
 
+    async def detect_async(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
+                           version: Optional[str] = None,
+                           manifest: Optional[PackageManifest] = None) -> tuple[bool, Optional[str]]:
+        """
+        Asynchronous variant of detect, used by asynchronous analyses. Detectors waiting on I/O can override it, by
+        default detect runs in a thread so that it does not block the event loop
+        """
+        return await asyncio.to_thread(self.detect, package_info, path, name, version, manifest)
+
     def get_name(self) -> str:
         return self.name
 
@@ -0,0 +1,113 @@
+""" Well-known e-mail domains
+
+Domains of large e-mail providers and organizations, which will never lapse: the e-mail domain detectors trust them
+without looking them up with whois. The list is a resource, an updated copy in the user cache replaces the bundled one.
+"""
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Optional
+
+from guarddog.utils.resources import get_resource_path
+
+log = logging.getLogger("guarddog")
+
+WELL_KNOWN_EMAIL_DOMAINS_RESOURCE = "well_known_email_domains.json"
+
+# Markers of the trie nodes ending a well-known domain or a public suffix, labels never contain these characters
+WELL_KNOWN_MARKER = "+"
+PUBLIC_SUFFIX_MARKER = "!"
+
+
+def _normalize_domain(domain: str) -> list[str]:
+    """
+    Returns the labels of a domain, from the top-level domain down
+    """
+    return [label for label in reversed(domain.strip().rstrip(".").lower().split(".")) if label != ""]
+
+
+class WellKnownEmailDomains:
+    """
+    Suffix trie of well-known domains and public suffixes. A domain is well-known when the longest well-known
+    domain or public suffix it ends with is a well-known domain: subdomains of a well-known domain are well-known
+    too, unless they are public suffixes themselves (e.g. s3.amazonaws.com), whose subdomains belong to anyone.
+
+    Attributes:
+        hits (Counter): number of lookups avoided, by well-known domain
+    """
+
+    def __init__(self, domains: list[str], public_suffixes: list[str]) -> None:
+        self._trie = {}  # type: dict
+        self._lock = threading.Lock()
+        self.hits = Counter()  # type: Counter[str]
+
+        for public_suffix in public_suffixes:
+            self._add(public_suffix, PUBLIC_SUFFIX_MARKER)
+        for domain in domains:
+            if len(_normalize_domain(domain)) < 2:
+                log.debug(f"Ignoring well-known e-mail domain {domain}, top-level domains are public suffixes")
+                continue
+            self._add(domain, WELL_KNOWN_MARKER)
+
+    def _add(self, domain: str, marker: str) -> None:
+        node = self._trie
+        for label in _normalize_domain(domain):
+            node = node.setdefault(label, {})
+        node[marker] = domain
+
+    def get_well_known_domain(self, domain: str) -> Optional[str]:
+        """
+        Returns the well-known domain a domain belongs to, or None if the domain is not well-known
+
+        Args:
+            domain (str): e-mail domain
+        """
+        well_known_domain = None
+        node = self._trie
+        for label in _normalize_domain(domain):
+            if label not in node:
+                break
+            node = node[label]
+            # Public suffixes take precedence over a well-known domain on the same node
+            if PUBLIC_SUFFIX_MARKER in node:
+                well_known_domain = None
+            elif WELL_KNOWN_MARKER in node:
+                well_known_domain = node[WELL_KNOWN_MARKER]
+        return well_known_domain
+
+    def is_well_known(self, domain: str) -> bool:
+        """
+        Returns True if a domain is well-known, and counts the lookup it avoids
+        """
+        well_known_domain = self.get_well_known_domain(domain)
+        if well_known_domain is None:
+            return False
+        with self._lock:
+            self.hits[well_known_domain] += 1
+        return True
+
+    def get_hit_count(self) -> int:
+        """
+        Returns the number of lookups avoided since the domains were loaded
+        """
+        with self._lock:
+            return sum(self.hits.values())
+
+
+_well_known_email_domains = None  # type: Optional[WellKnownEmailDomains]
+_well_known_email_domains_lock = threading.Lock()
+
+
+def get_well_known_email_domains() -> WellKnownEmailDomains:
+    """
+    Returns the well-known e-mail domains, loading them on first use
+    """
+    global _well_known_email_domains
+    if _well_known_email_domains is None:
+        with _well_known_email_domains_lock:
+            if _well_known_email_domains is None:
+                with open(get_resource_path(WELL_KNOWN_EMAIL_DOMAINS_RESOURCE), "r") as f:
+                    data = json.load(f)
+                _well_known_email_domains = WellKnownEmailDomains(data["domains"], data["public_suffixes"])
+    return _well_known_email_domains
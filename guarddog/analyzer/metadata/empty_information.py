@@ -2,6 +2,7 @@ from abc import abstractmethod
 from typing import Optional
 
 from guarddog.analyzer.metadata.detector import Detector
+from guarddog.analyzer.package_manifest import PackageManifest
 
 MESSAGE = "This package has an empty description on PyPi"
 
@@ -20,7 +21,8 @@ class EmptyInfoDetector(Detector):
 
     @abstractmethod
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, str]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, str]:
         """
         Uses a package's information from PyPI's JSON API to determine
         if the package has an empty description
@@ -1,18 +1,34 @@
-from guarddog.analyzer.metadata.npm.empty_information import NPMEmptyInfoDetector
-from guarddog.analyzer.metadata.npm.potentially_compromised_email_domain import \
-    NPMPotentiallyCompromisedEmailDomainDetector
-from guarddog.analyzer.metadata.npm.release_zero import NPMReleaseZeroDetector
-from guarddog.analyzer.metadata.npm.typosquatting import NPMTyposquatDetector
+from guarddog.analyzer.metadata.registry import EMAIL_DOMAIN_RESULT_TTL, DetectorEntry, DetectorRegistry
 
-NPM_METADATA_RULES = {}
+# Detectors are imported and instantiated on first use, their descriptions must match the ones they declare
+NPM_METADATA_RULES = DetectorRegistry([
+    DetectorEntry(
+        "empty_information",
+        "Identify packages with an empty description field",
+        "guarddog.analyzer.metadata.npm.empty_information.NPMEmptyInfoDetector",
+        reads_files=True,
+    ),
+    DetectorEntry(
+        "release_zero",
+        "Identify packages with an release version that's 0.0 or 0.0.0",
+        "guarddog.analyzer.metadata.npm.release_zero.NPMReleaseZeroDetector",
+    ),
+    DetectorEntry(
+        "potentially_compromised_email_domain",
+        "Identify when a package maintainer e-mail domain (and therefore package manager account) might have been "
+        "compromised",
+        "guarddog.analyzer.metadata.npm.potentially_compromised_email_domain."
+        "NPMPotentiallyCompromisedEmailDomainDetector",
+        ttl=EMAIL_DOMAIN_RESULT_TTL,
+    ),
+    DetectorEntry(
+        "typosquatting",
+        "Identify packages that are named closely to an highly popular package",
+        "guarddog.analyzer.metadata.npm.typosquatting.NPMTyposquatDetector",
+    ),
+])
 
-classes = [
-    NPMEmptyInfoDetector,
-    NPMReleaseZeroDetector,
-    NPMPotentiallyCompromisedEmailDomainDetector,
-    NPMTyposquatDetector
-]
 
-for detectorClass in classes:
-    detectorInstance = detectorClass()  # type: ignore
-    NPM_METADATA_RULES[detectorInstance.get_name()] = detectorInstance
+def __getattr__(name: str) -> type:
+    # Keeps "from guarddog.analyzer.metadata.npm import NPMTyposquatDetector" working, importing the class lazily
+    return NPM_METADATA_RULES.get_class_by_class_name(name)
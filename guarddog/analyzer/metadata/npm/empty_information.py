@@ -6,6 +6,7 @@ import os.path
 from typing import Optional
 
 from guarddog.analyzer.metadata.empty_information import EmptyInfoDetector
+from guarddog.analyzer.package_manifest import PackageManifest
 
 MESSAGE = "This package has an empty description on PyPi"
 
@@ -13,12 +14,20 @@ MESSAGE = "This package has an empty description on PyPi"
 class NPMEmptyInfoDetector(EmptyInfoDetector):
 
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, str]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, str]:
         if path is None:
             raise TypeError("path must be a string")
         package_path = os.path.join(path, "package")
+        if manifest is not None:
+            prefix = os.path.relpath(package_path, manifest.path)
+            entries = [
+                os.path.basename(entry) for entry in manifest.paths if os.path.dirname(entry) == prefix
+            ]
+        else:
+            entries = os.listdir(package_path)
         content = map(
             lambda x: x.lower(),
-            os.listdir(package_path)
+            entries
         )
         return "readme.md" not in content, EmptyInfoDetector.MESSAGE_TEMPLATE % "npm"
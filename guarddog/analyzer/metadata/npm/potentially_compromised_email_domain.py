@@ -6,29 +6,27 @@ Detects if a maintainer's email domain might have been compromised.
 from datetime import datetime
 from typing import Optional
 
-from dateutil import parser
-
 from guarddog.analyzer.metadata.potentially_compromised_email_domain import PotentiallyCompromisedEmailDomainDetector
+from guarddog.utils.package_metadata import NpmPackageMetadata
 
 
 class NPMPotentiallyCompromisedEmailDomainDetector(PotentiallyCompromisedEmailDomainDetector):
     def __init__(self):
         super().__init__("npm")
 
-    def get_email_addresses(self, package_info: dict) -> list[str]:
-        return list(map(lambda x: x["email"], package_info["maintainers"]))
+    def get_email_addresses(self, package_info) -> list[str]:
+        return list(NpmPackageMetadata.get(package_info).emails)
 
     def get_project_latest_release_date(self, package_info) -> Optional[datetime]:
         """
-        Gets the most recent release date of a Python project
+        Gets the release date of the latest version of an npm package
 
         Args:
-            releases (dict): PyPI JSON API's representation field
+            package_info (NpmPackageMetadata): metadata of the package, or its packument
 
         Returns:
-            datetime: creation date of the most recent in releases
+            datetime: release date of the latest version, or None if unknown
         """
-        latest_release_version = package_info["dist-tags"]["latest"]
-        raw_date = package_info["time"][latest_release_version]
-        release_date = parser.isoparse(raw_date).replace(tzinfo=None)
-        return release_date
+        metadata = NpmPackageMetadata.get(package_info)
+        latest_release = metadata.get_release(metadata.version) if metadata.version is not None else None
+        return latest_release.upload_time if latest_release is not None else None
@@ -5,11 +5,15 @@ Detects when a package has its latest release version to 0.0.0
 from typing import Optional
 
 from guarddog.analyzer.metadata.release_zero import ReleaseZeroDetector
+from guarddog.analyzer.package_manifest import PackageManifest
+from guarddog.utils.package_metadata import NpmPackageMetadata
 
 
 class NPMReleaseZeroDetector(ReleaseZeroDetector):
 
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, str]:
-        return package_info["dist-tags"]["latest"] in ["0.0.0", "0.0", "0"], \
-            ReleaseZeroDetector.MESSAGE_TEMPLATE % package_info["dist-tags"]["latest"]
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, str]:
+        metadata = NpmPackageMetadata.get(package_info)
+        return metadata.version in ["0.0.0", "0.0", "0"], \
+            ReleaseZeroDetector.MESSAGE_TEMPLATE % metadata.version
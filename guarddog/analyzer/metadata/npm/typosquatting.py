@@ -1,8 +1,10 @@
 import json
-import os
 from typing import Optional
 
 from guarddog.analyzer.metadata.typosquatting import TyposquatDetector
+from guarddog.analyzer.package_manifest import PackageManifest
+from guarddog.utils.package_metadata import NpmPackageMetadata
+from guarddog.utils.resources import get_resource_path
 
 
 class NPMTyposquatDetector(TyposquatDetector):
@@ -14,16 +16,18 @@ class NPMTyposquatDetector(TyposquatDetector):
         popular_packages (list): list of top 5000 downloaded packages from npm
     """
 
+    def _get_top_packages_path(self) -> str:
+        return get_resource_path("top_npm_packages.json")
+
     def _get_top_packages(self) -> list:
-        top_packages_filename = "top_npm_packages.json"
-        resources_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "resources"))
-        with open(os.path.join(resources_dir, top_packages_filename)) as file:
+        with open(self._get_top_packages_path()) as file:
             top_packages_data = json.load(file)
 
         return list(map(lambda x: x["project"], top_packages_data))
 
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, Optional[str]]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, Optional[str]]:
         """
         Uses a package's information from PyPI's JSON API to determine the
         package is attempting a typosquatting attack
@@ -38,7 +42,7 @@ class NPMTyposquatDetector(TyposquatDetector):
             @param **kwargs:
         """
 
-        similar_package_names = self.get_typosquatted_package(package_info["name"])
+        similar_package_names = self.get_typosquatted_package(NpmPackageMetadata.get(package_info).name)
         if len(similar_package_names) > 0:
             return True, TyposquatDetector.MESSAGE_TEMPLATE % ", ".join(similar_package_names)
         return False, None
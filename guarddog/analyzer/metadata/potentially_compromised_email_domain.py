@@ -2,9 +2,10 @@ from abc import abstractmethod
 from datetime import datetime
 from typing import Optional
 
-import whois  # type: ignore
-
 from guarddog.analyzer.metadata.detector import Detector
+from guarddog.analyzer.metadata.email_domains import get_well_known_email_domains
+from guarddog.analyzer.package_manifest import PackageManifest
+from guarddog.utils.whois_cache import WhoisCache, get_whois_cache
 
 
 class PotentiallyCompromisedEmailDomainDetector(Detector):
@@ -16,6 +17,8 @@ class PotentiallyCompromisedEmailDomainDetector(Detector):
                         "might have been compromised",
         )
         self.ecosystem = ecosystem
+        # Lookups go through the whois cache shared by all detectors, unless another one is set
+        self.whois_cache: Optional[WhoisCache] = None
 
     def _get_domain_creation_date(self, email_domain) -> tuple[Optional[datetime], bool]:
         """
@@ -32,26 +35,18 @@ class PotentiallyCompromisedEmailDomainDetector(Detector):
             bool:     if the domain is currently registered
         """
 
-        try:
-            domain_information = whois.whois(email_domain)
-        except whois.parser.PywhoisError as e:
-            # The domain doesn't exist at all, if that's the case we consider it vulnerable
-            # since someone could register it
-            return None, (not str(e).lower().startswith('no match for'))
-
-        if domain_information.creation_date is None:
-            # No creation date in whois, so we can't know
-            return None, True
-
-        creation_dates = domain_information.creation_date
+        whois_cache = self.whois_cache if self.whois_cache is not None else get_whois_cache()
+        domain_information = whois_cache.lookup(email_domain)
+        return domain_information.creation_date, domain_information.registered
 
-        if type(creation_dates) is list:
-            return min(creation_dates), True
-
-        return creation_dates, True
+    @staticmethod
+    def _get_email_domain(email: str) -> str:
+        sanitized_email = email.strip().replace(">", "").replace("<", "")
+        return sanitized_email.split("@")[-1]
 
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, str]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, str]:
         """
         Uses a package's information from PyPI's JSON API to determine
         if the package's email domain might have been compromised
@@ -73,13 +68,18 @@ class PotentiallyCompromisedEmailDomainDetector(Detector):
             # No e-mail is set for this package, hence no risk
             return False, "No e-mail found for this package"
 
+        # Domains of large e-mail providers never lapse, they are trusted without any whois lookup
+        well_known_domains = get_well_known_email_domains()
+        emails = [email for email in emails if not well_known_domains.is_well_known(self._get_email_domain(email))]
+        if len(emails) == 0:
+            return False, "The e-mail domains of this package are well-known"
+
         latest_project_release = self.get_project_latest_release_date(package_info)
 
         has_issues = False
         messages = []
         for email in emails:
-            sanitized_email = email.strip().replace(">", "").replace("<", "")
-            email_domain = sanitized_email.split("@")[-1]
+            email_domain = self._get_email_domain(email)
             domain_creation_date, domain_exists = self._get_domain_creation_date(email_domain)
 
             if not domain_exists:
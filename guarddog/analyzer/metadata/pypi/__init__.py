@@ -1,23 +1,45 @@
-from guarddog.analyzer.metadata.pypi.empty_information import PypiEmptyInfoDetector
-from guarddog.analyzer.metadata.pypi.potentially_compromised_email_domain import \
-    PypiPotentiallyCompromisedEmailDomainDetector
-from guarddog.analyzer.metadata.pypi.release_zero import PypiReleaseZeroDetector
-from guarddog.analyzer.metadata.pypi.repository_integrity_mismatch import PypiIntegrityMismatchDetector
-from guarddog.analyzer.metadata.pypi.single_python_file import PypiSinglePythonFileDetector
-from guarddog.analyzer.metadata.pypi.typosquatting import PypiTyposquatDetector
+from guarddog.analyzer.metadata.registry import EMAIL_DOMAIN_RESULT_TTL, DetectorEntry, DetectorRegistry
 
-PYPI_METADATA_RULES = {}
+# Detectors are imported and instantiated on first use, their descriptions must match the ones they declare
+PYPI_METADATA_RULES = DetectorRegistry([
+    DetectorEntry(
+        "empty_information",
+        "Identify packages with an empty description field",
+        "guarddog.analyzer.metadata.pypi.empty_information.PypiEmptyInfoDetector",
+    ),
+    DetectorEntry(
+        "release_zero",
+        "Identify packages with an release version that's 0.0 or 0.0.0",
+        "guarddog.analyzer.metadata.pypi.release_zero.PypiReleaseZeroDetector",
+    ),
+    DetectorEntry(
+        "typosquatting",
+        "Identify packages that are named closely to an highly popular package",
+        "guarddog.analyzer.metadata.pypi.typosquatting.PypiTyposquatDetector",
+    ),
+    DetectorEntry(
+        "potentially_compromised_email_domain",
+        "Identify when a package maintainer e-mail domain (and therefore package manager account) might have been "
+        "compromised",
+        "guarddog.analyzer.metadata.pypi.potentially_compromised_email_domain."
+        "PypiPotentiallyCompromisedEmailDomainDetector",
+        ttl=EMAIL_DOMAIN_RESULT_TTL,
+    ),
+    DetectorEntry(
+        "repository_integrity_mismatch",
+        "Identify packages with a linked GitHub repository where the package has extra unexpected files",
+        "guarddog.analyzer.metadata.pypi.repository_integrity_mismatch.PypiIntegrityMismatchDetector",
+        reads_files=True,
+    ),
+    DetectorEntry(
+        "single_python_file",
+        "Identify packages that have only a single Python file",
+        "guarddog.analyzer.metadata.pypi.single_python_file.PypiSinglePythonFileDetector",
+        reads_files=True,
+    ),
+])
 
-classes = [
-    PypiEmptyInfoDetector,
-    PypiReleaseZeroDetector,
-    PypiTyposquatDetector,
-    PypiPotentiallyCompromisedEmailDomainDetector,
-    PypiIntegrityMismatchDetector,
-    PypiSinglePythonFileDetector
 
-]
-
-for detectorClass in classes:
-    detectorInstance = detectorClass()  # type: ignore
-    PYPI_METADATA_RULES[detectorInstance.get_name()] = detectorInstance
+def __getattr__(name: str) -> type:
+    # Keeps "from guarddog.analyzer.metadata.pypi import PypiTyposquatDetector" working, importing the class lazily
+    return PYPI_METADATA_RULES.get_class_by_class_name(name)
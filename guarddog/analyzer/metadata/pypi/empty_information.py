@@ -6,6 +6,8 @@ import logging
 from typing import Optional
 
 from guarddog.analyzer.metadata.empty_information import EmptyInfoDetector
+from guarddog.analyzer.package_manifest import PackageManifest
+from guarddog.utils.package_metadata import PypiPackageMetadata
 
 MESSAGE = "This package has an empty description on PyPi"
 
@@ -14,6 +16,8 @@ log = logging.getLogger("guarddog")
 
 class PypiEmptyInfoDetector(EmptyInfoDetector):
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, str]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, str]:
         log.debug(f"Running PyPI empty description heuristic on package {name} version {version}")
-        return len(package_info["info"]["description"].strip()) == 0, EmptyInfoDetector.MESSAGE_TEMPLATE % "PyPI"
+        metadata = PypiPackageMetadata.get(package_info)
+        return len(metadata.description.strip()) == 0, EmptyInfoDetector.MESSAGE_TEMPLATE % "PyPI"
@@ -6,6 +6,8 @@ import logging
 from typing import Optional
 
 from guarddog.analyzer.metadata.release_zero import ReleaseZeroDetector
+from guarddog.analyzer.package_manifest import PackageManifest
+from guarddog.utils.package_metadata import PypiPackageMetadata
 
 log = logging.getLogger("guarddog")
 
@@ -13,7 +15,9 @@ log = logging.getLogger("guarddog")
 class PypiReleaseZeroDetector(ReleaseZeroDetector):
 
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, str]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, str]:
         log.debug(f"Running zero version heuristic on PyPI package {name} version {version}")
-        return (package_info["info"]["version"] in ["0.0.0", "0.0"],
-                ReleaseZeroDetector.MESSAGE_TEMPLATE % package_info["info"]["version"])
+        metadata = PypiPackageMetadata.get(package_info)
+        return (metadata.version in ["0.0.0", "0.0"],
+                ReleaseZeroDetector.MESSAGE_TEMPLATE % metadata.version)
@@ -2,6 +2,7 @@
 
 Detects if a package contains an empty description
 """
+import concurrent.futures
 import configparser
 import hashlib
 import logging
@@ -11,12 +12,24 @@ from typing import Optional, Tuple
 
 import pygit2  # type: ignore
 import urllib3.util
+from packaging.version import InvalidVersion, Version
 
 from guarddog.analyzer.metadata.repository_integrity_mismatch import IntegrityMismatch
+from guarddog.analyzer.package_manifest import PackageManifest
+from guarddog.utils.git_mirrors import get_git_mirrors
+from guarddog.utils.package_metadata import PypiPackageMetadata
 
-GH_REPO_REGEX = r'(?:https?://)?(?:www\.)?github\.com/(?:[\w-]+/)(?:[\w-]+)'
 GH_REPO_OWNER_REGEX = r'(?:https?://)?(?:www\.)?github\.com/([\w-]+)/([\w-]+)'
 
+# Positions where the version can start in a tag name, e.g. "1.0", "v1.0", "mypackage-1.0" or "release/v1.0"
+TAG_VERSION_START_REGEX = re.compile(r'(?:^|[-_/@])[vV]?(?=\d)')
+
+# Size of the chunks package files are hashed by
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Maximum number of package files hashed at the same time
+HASH_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
 log = logging.getLogger("guarddog")
 
 
@@ -64,76 +77,52 @@ def find_best_github_candidate(all_candidates_and_highlighted_link, name):
     return None
 
 
-def dict_generator(indict, pre=None):
+def get_git_blob_hash(path):
     """
-    This generator recursively go through an arbitrary dict
-    Each iteration will be an array containing the path of all leaves of the dict
+    Returns the id git gives to the contents of a file, the SHA-1 of a blob header followed by the contents, which are
+    streamed rather than read fully in memory. Symbolic links are hashed like git does, by their target
     """
-    pre = pre[:] if pre else []
-    if isinstance(indict, dict):
-        for key, value in indict.items():
-            if isinstance(value, dict):
-                for d in dict_generator(value, pre + [key]):
-                    yield d
-            elif isinstance(value, list) or isinstance(value, tuple):
-                for v in value:
-                    for d in dict_generator(v, pre + [key]):
-                        yield d
-            else:
-                yield pre + [key, value]
-    else:
-        yield pre + [indict]
-
-
-def get_file_hash(path):
+    if os.path.islink(path):
+        target = os.fsencode(os.readlink(path))
+        return hashlib.sha1(b"blob %d\0" % len(target) + target).hexdigest()
     with open(path, 'rb') as f:
-        # Read the contents of the file
-        file_contents = f.read()
-        # Create a hash object
-        hash_object = hashlib.sha256()
-        # Feed the file contents to the hash object
-        hash_object.update(file_contents)
-        # Get the hexadecimal hash value
-        return hash_object.hexdigest(), str(file_contents).strip().splitlines()
+        hash_object = hashlib.sha1(b"blob %d\0" % os.fstat(f.fileno()).st_size)
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hash_object.update(chunk)
+        return hash_object.hexdigest()
 
 
-def _ensure_proper_url(url):
-    parsed = urllib3.util.parse_url(url)
-    if parsed.scheme is None:
-        url = f"https://{url}"
-    return url
+def get_checked_out_blob_hash(repo, commit, file_path: str) -> Optional[str]:
+    """
+    Returns the id git gives to a file of a commit as it is checked out, after the filters of the .gitattributes
+    files of the commit (e.g. "text eol=crlf") are applied, or None if the installed pygit2 cannot apply them
+
+    Args:
+        repo (pygit2.Repository): repository, which can be bare
+        commit (pygit2.Commit): commit the file and the attributes are read from
+        file_path (str): path of the file in the commit, separated by "/"
+    """
+    try:
+        from pygit2.enums import BlobFilter
+        blob_io = pygit2.BlobIO
+    except (ImportError, AttributeError):  # pygit2 < 1.15
+        return None
+    blob = repo[commit.tree[file_path].id]
+    flags = BlobFilter.CHECK_FOR_BINARY | BlobFilter.ATTRIBUTES_FROM_COMMIT
+    with blob_io(blob, as_path=file_path, flags=flags, commit_id=commit.id) as f:
+        data = f.read()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
 
 
 def find_github_candidates(package_info) -> Tuple[set[str], Optional[str]]:
-    infos = package_info["info"]
-    homepage = None
-
-    project_urls = infos.get("project_urls", {})
-    # In some cases, the "project_urls" key is set, but is set to None
-    if project_urls is None:
-        return set(), None
-
-    if "Homepage" in project_urls:
-        homepage = package_info["info"]["project_urls"]["Homepage"]
-    github_urls = set()
-    for dict_path in dict_generator(infos):
-        leaf = dict_path[-1]
-        if type(leaf) is not str:
-            continue
-        res = re.findall(GH_REPO_REGEX, leaf)
-        if len(res) > 0:
-            for cd in res:
-                github_urls.add(_ensure_proper_url(cd.strip()))
-    best = None
-    if homepage in github_urls:
-        best = _ensure_proper_url(homepage)
-    return github_urls, best
+    metadata = PypiPackageMetadata.get(package_info)
+    return set(metadata.repository_urls), metadata.homepage
 
 
 EXCLUDED_EXTENSIONS = [".rst", ".md", ".txt"]
 
 
-def exclude_result(file_name, repo_root, pkg_root):
+def exclude_result(file_name, repo_file_contents, pkg_root):
     """
     This method filters out some results that are known false positives:
     * if the file is a documentation file (based on its extension)
@@ -144,7 +133,7 @@ def exclude_result(file_name, repo_root, pkg_root):
             return True
     if file_name.endswith("setup.cfg"):
         repo_cfg = configparser.ConfigParser()
-        repo_cfg.read(os.path.join(repo_root, file_name))
+        repo_cfg.read_string(repo_file_contents.decode(errors="replace"))
         pkg_cfg = configparser.ConfigParser()
         pkg_cfg.read(os.path.join(pkg_root, file_name))
         repo_sections = list(repo_cfg.keys())
@@ -154,52 +143,127 @@ def exclude_result(file_name, repo_root, pkg_root):
     return False
 
 
-def find_mismatch_for_tag(repo, tag, base_path, repo_path):
-    repo.checkout(tag)
+def find_mismatch_for_tag(repo, tag, base_path, manifest: Optional[PackageManifest] = None):
+    """
+    Compares the files of a package with the ones of a tag of its repository, read from the git object database
+    without checking them out. Files which are not in both are ignored. Files differing from the blob of the
+    repository are compared again with the blob as checked out, since the attributes of the repository (e.g.
+    "text eol=crlf") may convert line endings.
+
+    Args:
+        repo (pygit2.Repository): repository, which can be bare
+        tag (str): tag reference
+        base_path (str): directory of the package files
+        manifest (PackageManifest, optional): manifest of a directory containing base_path, whose blob ids are used
+            instead of hashing the files again
+
+    Returns:
+        list[dict]: files which are different, with their path and the blob ids in the repository and the package
+    """
+    commit = repo.revparse_single(tag).peel(pygit2.Commit)
+    tree = commit.tree
+    if manifest is not None:
+        prefix = os.path.relpath(base_path, manifest.path)
+        files = [
+            (os.path.relpath(manifest.paths[index], prefix), manifest.get_blob_id(index))
+            for index in manifest.iter_files(prefix)
+        ]
+    else:
+        files = []
+        for root, _, file_names in os.walk(base_path):
+            relative_path = os.path.relpath(root, base_path)
+            for file_name in file_names:
+                files.append((os.path.normpath(os.path.join(relative_path, file_name)), None))
+
+    candidates = []
+    for file_path, pkg_hash in files:
+        try:
+            entry = tree[file_path.replace(os.sep, "/")]
+        except KeyError:  # ignore files we don't have in the repository
+            continue
+        if entry.type_str != "blob":
+            continue
+        candidates.append((file_path, pkg_hash, str(entry.id)))
+
+    def get_pkg_hash(candidate):
+        file_path, pkg_hash, _ = candidate
+        return pkg_hash if pkg_hash is not None else get_git_blob_hash(os.path.join(base_path, file_path))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=HASH_MAX_WORKERS) as executor:
+        pkg_hashes = list(executor.map(get_pkg_hash, candidates))
+
     mismatch = []
-    for root, dirs, files in os.walk(base_path):
-        relative_path = os.path.relpath(root, base_path)
-        repo_root = os.path.join(repo_path, relative_path)
-        if not os.path.exists(repo_root):
+    for (file_path, _, repo_hash), pkg_hash in zip(candidates, pkg_hashes):
+        if repo_hash == pkg_hash:
             continue
-        repo_files = list(filter(
-            lambda x: os.path.isfile(os.path.join(repo_root, x)),
-            os.listdir(repo_root)
-        ))
-        for file_name in repo_files:
-            if file_name not in files:  # ignore files we don't have in the distribution
-                continue
-            repo_hash, repo_content = get_file_hash(os.path.join(repo_root, file_name))
-            pkg_hash, pkg_content = get_file_hash(os.path.join(root, file_name))
-            if repo_hash != pkg_hash:
-                if exclude_result(file_name, repo_root, root):
-                    continue
-                res = {
-                    "file": os.path.join(relative_path, file_name),
-                    "repo_sha256": repo_hash,
-                    "pkg_sha256": pkg_hash
-                }
-                mismatch.append(res)
+        if get_checked_out_blob_hash(repo, commit, file_path.replace(os.sep, "/")) == pkg_hash:
+            continue
+        if exclude_result(file_path, repo[repo_hash].data, base_path):
+            continue
+        mismatch.append({
+            "file": file_path,
+            "repo_sha1": repo_hash,
+            "pkg_sha1": pkg_hash
+        })
     return mismatch
 
 
-def find_suitable_tags_in_list(tags, version):
-    tag_candidates = []
-    for tag_name in tags:
-        if tag_name.endswith(version):
-            tag_candidates.append(tag_name)
-    return tag_candidates
+def _parse_version(version: str) -> Optional[Version]:
+    try:
+        return Version(version)
+    except InvalidVersion:
+        return None
 
 
-def find_suitable_tags(repo, version):
-    tags_regex = re.compile('^refs/tags/(.*)')
-    tags = []
-    for ref in repo.references:
-        match = tags_regex.match(ref)
-        if match is not None:
-            tags.append(match.group(0))
+def _get_tag_version_prefix(tag_name: str, version: str) -> Optional[str]:
+    """
+    Returns what precedes the version in a tag name, or None if the tag is not for this version. Versions are
+    compared after PEP 440 normalization, so that e.g. the tag v1.0 matches the version 1.0.0
+    """
+    parsed_version = _parse_version(version)
+    for match in TAG_VERSION_START_REGEX.finditer(tag_name):
+        tag_version = tag_name[match.end():]
+        if parsed_version is not None:
+            if _parse_version(tag_version) == parsed_version:
+                return tag_name[:match.start()]
+        elif tag_version == version:
+            return tag_name[:match.start()]
+    return None
 
-    return find_suitable_tags_in_list(tags, version)
+
+def find_suitable_tags_in_list(tags, version, name=None):
+    """
+    Returns the tags of a version, the most likely first: bare version tags (e.g. v1.0), then tags with the name of
+    the package (e.g. mypackage-1.0) and finally other prefixed tags, e.g. of other packages of a monorepo
+
+    Args:
+        tags (Iterable[str]): tag names or refs, peeled refs (with a ^{} suffix) are ignored
+        version (str): version of the package
+        name (str, optional): name of the package
+    """
+    normalized_name = re.sub(r"[-_.]+", "-", name).lower() if name else None
+    tag_candidates = []
+    for tag in tags:
+        if tag.endswith("^{}"):
+            continue
+        prefix = _get_tag_version_prefix(tag.removeprefix("refs/tags/"), version)
+        if prefix is None:
+            continue
+        if prefix == "":
+            priority = 0
+        elif normalized_name is not None and normalized_name in re.sub(r"[-_.]+", "-", prefix).lower():
+            priority = 1
+        else:
+            priority = 2
+        tag_candidates.append((priority, tag))
+    return [tag for _, tag in sorted(tag_candidates, key=lambda candidate: candidate[0])]
+
+
+def find_suitable_tags(refs, version, name=None):
+    """
+    Returns the tag refs of a version among the refs of a repository, see find_suitable_tags_in_list
+    """
+    return find_suitable_tags_in_list(filter(lambda ref: ref.startswith("refs/tags/"), refs), version, name)
 
 
 # Note: we should have the GitHub related logic factored out as we will need it when we check for signed commits
@@ -212,12 +276,12 @@ class PypiIntegrityMismatchDetector(IntegrityMismatch):
 
     Current gaps:
     * Does not check for extraneous files in the release artifacts
-    * Does not run it parallel, so can be slow for large code bases
     """
     RULE_NAME = "repository_integrity_mismatch"
 
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, str]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, str]:
         if name is None:
             raise Exception("Detector needs the name of the package")
         if path is None:
@@ -238,41 +302,36 @@ class PypiIntegrityMismatchDetector(IntegrityMismatch):
         log.debug(f"Using GitHub URL {github_url}")
         # ok, now let's try to find the version! (I need to know which version we are scanning)
         if version is None:
-            version = package_info["info"]["version"]
+            version = PypiPackageMetadata.get(package_info).version
         if version is None:
             raise Exception("Could not find suitable version to scan")
-        tmp_dir = os.path.dirname(path)
-        if tmp_dir is None:
-            raise Exception("no current scanning directory")
-
-        repo_path = os.path.join(tmp_dir, "sources", name)
-        repo = pygit2.clone_repository(url=github_url, path=repo_path)
-
-        tag_candidates = find_suitable_tags(repo, version)
+        git_mirrors = get_git_mirrors()
+        # Listing the tags of the repository is a single small request, unlike cloning it
+        remote_refs = git_mirrors.list_remote_refs(github_url)
+        tag_candidates = find_suitable_tags(remote_refs, version, name)
 
         if len(tag_candidates) == 0:
             return False, "Could not find any suitable tag in repository"
 
-        target_tag = None
-        # TODO: this one is a bit weak. let's find something stronger - maybe use the closest string?
-        for tag in tag_candidates:
-            target_tag = tag
-
         # Idea: parse the code of the package to find the real version - we can grep the project files for
         #  the version, git biscect until we have a file with the same version? will not work if main has not
         #  been bumped yet in version so tags and releases are out only solutions here print(tag_candidates)
         #  Well, that works if we run integrity check for multiple commits
+        target_tag = tag_candidates[0]
 
         #  should be good, let's open the sources
         base_dir_name = None
-        for entry in os.listdir(path):
+        entries = os.listdir(path) if manifest is None else [entry for entry in manifest.paths if os.sep not in entry]
+        for entry in entries:
             if entry.lower().startswith(name.lower().replace('-', '_')) or entry.lower().startswith(name.lower()):
                 base_dir_name = entry
         if base_dir_name is None or base_dir_name == "sources":  # I am not sure how we can get there
             raise Exception("something went wrong when opening the package")
         base_path = os.path.join(path, base_dir_name)
 
-        mismatch = find_mismatch_for_tag(repo, target_tag, base_path, repo_path)
+        # Only the commit of the tag is fetched into the mirror of the repository, which later scans reuse
+        with git_mirrors.open(github_url, refs={target_tag: remote_refs[target_tag]}, depth=1) as repo:
+            mismatch = find_mismatch_for_tag(repo, target_tag, base_path, manifest)
         message = "\n".join(map(
             lambda x: "* " + x["file"],
             mismatch
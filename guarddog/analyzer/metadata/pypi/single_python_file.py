@@ -2,6 +2,7 @@ import os
 from typing import Optional
 
 from guarddog.analyzer.metadata.detector import Detector
+from guarddog.analyzer.package_manifest import PackageManifest
 
 THRESHOLD = 1
 
@@ -15,10 +16,14 @@ class PypiSinglePythonFileDetector(Detector):
         )
 
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, Optional[str]]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, Optional[str]]:
         if path is None:
             raise ValueError("path is needed to run heuristic " + self.get_name())
-        matches = self._has_fewer_than_threshold_python_files(path)
+        if manifest is not None:
+            matches = len(manifest.get_files(language="python")) <= THRESHOLD
+        else:
+            matches = self._has_fewer_than_threshold_python_files(path)
         return matches, f"This package has {THRESHOLD} or fewer Python source files"
 
     def _has_fewer_than_threshold_python_files(self, path: str) -> bool:
@@ -1,13 +1,13 @@
 import json
 import logging
-import os
-from datetime import datetime, timedelta
 from typing import Optional
 
-import requests
 import packaging.utils
 
 from guarddog.analyzer.metadata.typosquatting import TyposquatDetector
+from guarddog.analyzer.package_manifest import PackageManifest
+from guarddog.utils.package_metadata import PypiPackageMetadata
+from guarddog.utils.resources import get_resource_path
 
 
 log = logging.getLogger("guarddog")
@@ -23,13 +23,18 @@ class PypiTyposquatDetector(TyposquatDetector):
         popular_packages (list): list of top 5000 downloaded packages from PyPI
     """
 
-    def _get_top_packages(self) -> list:
+    def _get_top_packages_path(self) -> str:
+        """
+        Gets the path of the local copy of the top 5000 most downloaded PyPI packages, refreshed by
+        'guarddog update-resources'
         """
-        Gets the package information of the top 5000 most downloaded PyPI packages
+        return get_resource_path("top_pypi_packages.json")
 
-        Returns:
-            list: list of package data in the format:
-                [
+    def _get_top_packages(self) -> list:
+        """
+        Gets the names of the top 5000 most downloaded PyPI packages, read from a file in the format:
+            {
+                rows: [
                     ...
                     {
                         download_count: ...
@@ -37,37 +42,26 @@ class PypiTyposquatDetector(TyposquatDetector):
                     }
                     ...
                 ]
-        """
-
-        popular_packages_url = "https://hugovk.github.io/top-pypi-packages/top-pypi-packages-30-days.min.json"
+            }
 
-        top_packages_filename = "top_pypi_packages.json"
-        resources_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "resources"))
-        top_packages_path = os.path.join(resources_dir, top_packages_filename)
-
-        top_packages_information = None
-
-        if top_packages_filename in os.listdir(resources_dir):
-            update_time = datetime.fromtimestamp(os.path.getmtime(top_packages_path))
-
-            if datetime.now() - update_time <= timedelta(days=30):
-                top_packages_file = open(top_packages_path, "r")
-                top_packages_information = json.load(top_packages_file)["rows"]
-
-        if top_packages_information is None:
-            response = requests.get(popular_packages_url).json()
-            with open(top_packages_path, "w+") as f:
-                json.dump(response, f, ensure_ascii=False, indent=4)
+        Returns:
+            list: normalized names of the packages
+        """
 
-            top_packages_information = response["rows"]
+        with open(self._get_top_packages_path(), "r") as top_packages_file:
+            top_packages_information = json.load(top_packages_file)["rows"]
 
         def get_safe_name(package):
             return packaging.utils.canonicalize_name(package["project"])
 
         return list(map(get_safe_name, top_packages_information))
 
+    def normalize_name(self, package_name: str) -> str:
+        return packaging.utils.canonicalize_name(package_name)
+
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, Optional[str]]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, Optional[str]]:
         """
         Uses a package's information from PyPI's JSON API to determine the
         package is attempting a typosquatting attack
@@ -82,7 +76,7 @@ class PypiTyposquatDetector(TyposquatDetector):
             @param **kwargs:
         """
         log.debug(f"Running typosquatting heuristic on PyPI package {name}")
-        normalized_name = packaging.utils.canonicalize_name(package_info["info"]["name"])
+        normalized_name = self.normalize_name(PypiPackageMetadata.get(package_info).name)
         similar_package_names = self.get_typosquatted_package(normalized_name)
         if len(similar_package_names) > 0:
             return True, TyposquatDetector.MESSAGE_TEMPLATE % ", ".join(similar_package_names)
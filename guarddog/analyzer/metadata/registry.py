@@ -0,0 +1,100 @@
+""" Detector registry
+
+Lists the metadata detectors of an ecosystem without importing nor instantiating them: their dependencies (whois,
+pygit2, lists of popular packages, ...) are only loaded when a detector is first used
+"""
+import importlib
+import threading
+from typing import Iterator, Mapping, NamedTuple, Optional
+
+from guarddog.analyzer.metadata.detector import Detector
+
+# Seconds the results of detectors depending on the registration of e-mail domains are reused for, since domains may
+# expire and be registered by anyone in the meantime
+EMAIL_DOMAIN_RESULT_TTL = 24 * 60 * 60
+
+
+class DetectorEntry(NamedTuple):
+    """
+    Registered detector
+
+    Attributes:
+        name (str): name of the rule implemented by the detector
+        description (str): description of the rule, identical to the one of the detector
+        class_path (str): module and name of the detector class, e.g. "guarddog.analyzer.metadata.pypi.Detector"
+        version (int): version of the detector, bumped whenever its findings change for the same package, which
+            invalidates cached scan results
+        ttl (int): seconds cached results of the detector are reused for, or None if they only depend on the package.
+            Detectors with a TTL are run again without downloading the package, they must not read its files
+        reads_files (bool): whether the detector reads the files of the package, which the analyzer then lists once
+            in a manifest shared with the source code analysis
+    """
+    name: str
+    description: str
+    class_path: str
+    version: int = 1
+    ttl: Optional[int] = None
+    reads_files: bool = False
+
+    def get_class_name(self) -> str:
+        return self.class_path.rsplit(".", 1)[1]
+
+
+class DetectorRegistry(Mapping[str, Detector]):
+    """
+    Read-only map from rule names to metadata detectors, each detector being instantiated on first access
+    """
+
+    def __init__(self, entries: list[DetectorEntry]) -> None:
+        self.entries = {entry.name: entry for entry in entries}
+        self._detectors = {}  # type: dict[str, Detector]
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Detector:
+        detector = self._detectors.get(name)
+        if detector is not None:
+            return detector
+
+        if name not in self.entries:
+            raise KeyError(name)
+        with self._lock:
+            if name not in self._detectors:
+                self._detectors[name] = self.get_class(name)()
+            return self._detectors[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_description(self, name: str) -> str:
+        return self.entries[name].description
+
+    def get_version(self, name: str) -> int:
+        return self.entries[name].version
+
+    def get_ttl(self, name: str) -> Optional[int]:
+        return self.entries[name].ttl
+
+    def reads_files(self, name: str) -> bool:
+        return self.entries[name].reads_files
+
+    def get_class(self, name: str) -> type:
+        """
+        Imports the class of a detector, without instantiating it
+        """
+        module_name, class_name = self.entries[name].class_path.rsplit(".", 1)
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def get_class_by_class_name(self, class_name: str) -> type:
+        """
+        Imports a detector class from its name, e.g. PypiTyposquatDetector
+
+        Raises:
+            AttributeError: no registered detector has this class name
+        """
+        for entry in self.entries.values():
+            if entry.get_class_name() == class_name:
+                return self.get_class(entry.name)
+        raise AttributeError(class_name)
@@ -2,6 +2,7 @@ from abc import abstractmethod
 from typing import Optional
 
 from guarddog.analyzer.metadata.detector import Detector
+from guarddog.analyzer.package_manifest import PackageManifest
 
 
 class IntegrityMismatch(Detector):
@@ -16,5 +17,6 @@ class IntegrityMismatch(Detector):
 
     @abstractmethod
     def detect(self, package_info, path: Optional[str] = None, name: Optional[str] = None,
-               version: Optional[str] = None) -> tuple[bool, str]:
+               version: Optional[str] = None,
+               manifest: Optional[PackageManifest] = None) -> tuple[bool, str]:
         pass
@@ -1,7 +1,179 @@
 import abc
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from itertools import permutations
+from typing import Iterable, Iterator, Optional
 
 from guarddog.analyzer.metadata.detector import Detector
+from guarddog.utils.cache import get_cache_dir
+
+log = logging.getLogger("guarddog")
+
+# Stands for the substituted character of a name, package names never contain it
+WILDCARD = "\x00"
+
+# Number of names checked at once by each process of a batch typosquatting check
+BATCH_CHUNK_SIZE = 10000
+
+# Changed whenever the indexes are built differently, so that indexes persisted by other versions are rebuilt
+INDEX_FORMAT_VERSION = 1
+
+
+def _add_to_index(index: dict, key, popular_package: str) -> None:
+    # Tuples are much faster to persist and load than sets, and very few keys map to several popular packages
+    popular_packages = index.get(key, ())
+    if popular_package not in popular_packages:
+        index[key] = popular_packages + (popular_package,)
+
+
+class TyposquatIndex:
+    """
+    Maps every name within one typo edit of a set of names back to the popular packages they derive from, so that
+    looking up a candidate takes a handful of hash probes instead of comparing it to every popular package.
+    This is the deletion-neighborhood approach of SymSpell, with substitutions keyed by position to match exactly
+    the distance one Levenshtein and adjacent swap checks of TyposquatDetector.
+
+    Attributes:
+        forms (dict): map from indexed names to the popular packages they derive from
+        deletions (dict): map from indexed names with one character removed to the popular packages
+        substitutions (dict): map from indexed names with one character replaced by WILDCARD to the popular packages
+    """
+
+    def __init__(self) -> None:
+        self.forms = {}  # type: dict[str, tuple[str, ...]]
+        self.deletions = {}  # type: dict[str, tuple[str, ...]]
+        self.substitutions = {}  # type: dict[str, tuple[str, ...]]
+
+    def add(self, name: str, popular_package: str) -> None:
+        """
+        Indexes a name, looking up any name within one typo edit of it returns popular_package
+        """
+        _add_to_index(self.forms, name, popular_package)
+        for i in range(len(name)):
+            _add_to_index(self.deletions, name[:i] + name[i + 1:], popular_package)
+            _add_to_index(self.substitutions, name[:i] + WILDCARD + name[i + 1:], popular_package)
+
+    def lookup(self, name: str) -> set[str]:
+        """
+        Returns the popular packages of the indexed names within one typo edit of name: one addition, removal or
+        substitution of a character, or a swap of adjacent characters
+        """
+        matches = set()  # type: set[str]
+        # A character was removed from an indexed name
+        matches.update(self.deletions.get(name, ()))
+        for i in range(len(name)):
+            # A character was added to an indexed name
+            matches.update(self.forms.get(name[:i] + name[i + 1:], ()))
+            # A character of an indexed name was substituted
+            matches.update(self.substitutions.get(name[:i] + WILDCARD + name[i + 1:], ()))
+        for i in range(len(name) - 1):
+            # Two adjacent characters of an indexed name were swapped
+            matches.update(self.forms.get(name[:i] + name[i + 1] + name[i] + name[i + 2:], ()))
+        return matches
+
+
+class PermutationIndex:
+    """
+    Finds the names within one typo edit of any ordering of the hyphen-separated components of popular packages,
+    without enumerating the orderings: all the orderings of a name share the sorted tuple of its components, which
+    is what the index is keyed by. Looking up a candidate takes a number of probes proportional to its length,
+    however many components popular packages have.
+
+    Attributes:
+        components (dict): map from sorted components to the popular packages made of them
+        deletions (dict): map from (sorted other components, component with one character removed) to the popular
+            packages
+        substitutions (dict): map from (sorted other components, component with one character replaced by WILDCARD)
+            to the popular packages
+    """
+
+    def __init__(self) -> None:
+        self.components = {}  # type: dict[tuple[str, ...], tuple[str, ...]]
+        self.deletions = {}  # type: dict[tuple[tuple[str, ...], str], tuple[str, ...]]
+        self.substitutions = {}  # type: dict[tuple[tuple[str, ...], str], tuple[str, ...]]
+
+    def add(self, name: str, popular_package: str) -> None:
+        """
+        Indexes all the orderings of the hyphen-separated components of name
+        """
+        components = name.split("-")
+        _add_to_index(self.components, tuple(sorted(components)), popular_package)
+        for j, component in enumerate(components):
+            others = tuple(sorted(components[:j] + components[j + 1:]))
+            for i in range(len(component)):
+                _add_to_index(self.deletions, (others, component[:i] + component[i + 1:]), popular_package)
+                _add_to_index(self.substitutions, (others, component[:i] + WILDCARD + component[i + 1:]),
+                              popular_package)
+
+    def lookup(self, name: str) -> set[str]:
+        """
+        Returns the popular packages having an ordering of their components within one typo edit of name
+        """
+        matches = set()  # type: set[str]
+
+        def probe(components: list[str]) -> None:
+            matches.update(self.components.get(tuple(sorted(components)), ()))
+
+        components = name.split("-")
+        probe(components)
+        for k, component in enumerate(components):
+            others = components[:k] + components[k + 1:]
+            sorted_others = tuple(sorted(others))
+            # A character was removed from a component
+            matches.update(self.deletions.get((sorted_others, component), ()))
+            for i in range(len(component)):
+                # A character was added to a component
+                probe(others + [component[:i] + component[i + 1:]])
+                # A character of a component was substituted
+                matches.update(self.substitutions.get((sorted_others, component[:i] + WILDCARD + component[i + 1:]),
+                                                      ()))
+                # A hyphen was substituted by a character
+                probe(others + [component[:i], component[i + 1:]])
+            for i in range(len(component) - 1):
+                # Two adjacent characters of a component were swapped
+                probe(others + [component[:i] + component[i + 1] + component[i] + component[i + 2:]])
+            for i in range(len(component) + 1):
+                # A hyphen was removed, joining two components
+                probe(others + [component[:i], component[i:]])
+
+        for k in range(len(components) - 1):
+            left, right = components[k], components[k + 1]
+            others = components[:k] + components[k + 2:]
+            # A hyphen was added, splitting a component
+            probe(others + [left + right])
+            # A character was substituted by a hyphen
+            matches.update(self.substitutions.get((tuple(sorted(others)), left + WILDCARD + right), ()))
+            # A hyphen was swapped with an adjacent character
+            if len(left) > 0:
+                probe(others + [left[:-1], left[-1] + right])
+            if len(right) > 0:
+                probe(others + [left + right[0], right[1:]])
+
+        return matches
+
+
+class TyposquatIndexes:
+    """
+    Popular packages and the indexes used to look up their typosquats
+
+    Attributes:
+        popular_packages (list): names of the popular packages
+        popular_package_names (set): same names, for membership tests
+        index (TyposquatIndex): popular packages and their confused forms
+        permutation_index (PermutationIndex): popular packages made of several hyphen-separated components
+    """
+
+    def __init__(self, popular_packages: list[str]) -> None:
+        self.popular_packages = popular_packages
+        self.popular_package_names = set(popular_packages)
+        self.index = TyposquatIndex()
+        self.permutation_index = PermutationIndex()
 
 
 class TyposquatDetector(Detector):
@@ -9,7 +181,9 @@ class TyposquatDetector(Detector):
                        "attempt: %s"
 
     def __init__(self) -> None:
-        self.popular_packages = self._get_top_packages()  # Find top PyPI packages
+        # Loading the popular packages and their indexes is deferred to the first lookup
+        self._indexes = None  # type: Optional[TyposquatIndexes]
+        self._indexes_lock = threading.Lock()
         super().__init__(
             name="typosquatting",
             description="Identify packages that are named closely to an highly popular package"
@@ -19,6 +193,94 @@ class TyposquatDetector(Detector):
     def _get_top_packages(self) -> list:
         pass
 
+    def _get_top_packages_path(self) -> Optional[str]:
+        """
+        Returns the path of the file _get_top_packages reads, if any. The indexes built out of the popular packages
+        are persisted in the user cache, and rebuilt only when its contents change.
+        """
+        return None
+
+    @property
+    def popular_packages(self) -> list[str]:
+        return self._get_indexes().popular_packages
+
+    def _get_indexes(self) -> TyposquatIndexes:
+        if self._indexes is None:
+            with self._indexes_lock:
+                if self._indexes is None:
+                    self._indexes = self._load_indexes()
+        return self._indexes
+
+    def _load_indexes(self) -> TyposquatIndexes:
+        """
+        Loads the indexes persisted in the user cache if they were built out of the current contents of the popular
+        packages file, or builds and persists them otherwise
+        """
+        source_path = self._get_top_packages_path()
+        if source_path is None:
+            return self._build_indexes(self._get_top_packages())
+
+        with open(source_path, "rb") as f:
+            key = f"{INDEX_FORMAT_VERSION}:{hashlib.sha256(f.read()).hexdigest()}"
+        try:
+            index_path = os.path.join(get_cache_dir("resources"),
+                                      os.path.splitext(os.path.basename(source_path))[0] + ".index.pickle")
+        except OSError as e:
+            log.debug(f"Unable to create the user cache, building the typosquatting indexes in memory: {str(e)}")
+            return self._build_indexes(self._get_top_packages())
+
+        # The file holds two pickles, the key of the indexes and the indexes, which are only loaded if up to date.
+        # The garbage collector is paused meanwhile, since the many tuples being loaded would trigger it repeatedly
+        gc_enabled = gc.isenabled()
+        try:
+            with open(index_path, "rb") as f:
+                if pickle.load(f) == key:
+                    gc.disable()
+                    indexes = pickle.load(f)
+                    if isinstance(indexes, TyposquatIndexes):
+                        return indexes
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.debug(f"Unable to load the typosquatting indexes from {index_path}, rebuilding them: {str(e)}")
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        indexes = self._build_indexes(self._get_top_packages())
+        try:
+            fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(index_path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    pickle.dump(indexes, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temporary_path, index_path)
+            except BaseException:
+                os.remove(temporary_path)
+                raise
+        except OSError as e:
+            log.debug(f"Unable to persist the typosquatting indexes to {index_path}: {str(e)}")
+        return indexes
+
+    def normalize_name(self, package_name: str) -> str:
+        """
+        Normalizes a package name the way the package registry does, before comparing it to popular packages
+        """
+        return package_name
+
+    def _build_indexes(self, popular_packages: list[str]) -> TyposquatIndexes:
+        """
+        Indexes the popular packages and their confused forms, so that each lookup is a few hash probes
+        """
+        indexes = TyposquatIndexes(popular_packages)
+        for popular_package in popular_packages:
+            indexes.index.add(popular_package, popular_package)
+            for name in self._get_confused_forms(popular_package):
+                indexes.index.add(name, popular_package)
+            if "-" in popular_package:
+                indexes.permutation_index.add(popular_package, popular_package)
+        return indexes
+
     def _is_distance_one_Levenshtein(self, name1, name2) -> bool:
         """
         Returns True if two names have a Levenshtein distance of one
@@ -162,20 +424,66 @@ class TyposquatDetector(Detector):
             typosquatting from
         """
 
-        if package_name in self.popular_packages:
+        indexes = self._get_indexes()
+        if package_name in indexes.popular_package_names:
             return []
 
-        # Go through popular packages and find length one edit typosquats
-        typosquatted = set()
-        for popular_package in self.popular_packages:
-            if self._is_length_one_edit_away(package_name, popular_package):
-                typosquatted.add(popular_package)
+        # Find length one edit typosquats of popular packages, of their confused forms and of their permutations
+        typosquatted = indexes.index.lookup(package_name) | indexes.permutation_index.lookup(package_name)
 
-            alternate_popular_names = self._get_confused_forms(popular_package)
-            swapped_popular_names = self._generate_permutations(popular_package)
+        return list(typosquatted)
 
-            for name in alternate_popular_names + swapped_popular_names:
-                if self._is_length_one_edit_away(package_name, name):
-                    typosquatted.add(popular_package)
+    def get_typosquatted_packages(self, package_names: Iterable[str],
+                                  processes: int = 1) -> Iterator[tuple[str, list[str]]]:
+        """
+        Checks many package names at once, without downloading nor analyzing the packages
 
-        return list(typosquatted)
+        Args:
+            package_names (list): names of the packages to check, normalized before being checked
+            processes (int): number of processes to split the names across
+
+        Returns:
+            iterator: (name, names of the packages it could be typosquatting from) for each name, in order
+        """
+        chunks = _chunks(package_names, BATCH_CHUNK_SIZE)
+        if processes <= 1:
+            for chunk in chunks:
+                yield from _check_names(self, chunk)
+            return
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_batch_worker,
+                                 initargs=(type(self),)) as executor:
+            for results in executor.map(_check_batch, chunks):
+                yield from results
+
+
+# Detector of the current process of a batch typosquatting check
+_batch_detector: Optional[TyposquatDetector] = None
+
+
+def _init_batch_worker(detector_class: type) -> None:
+    global _batch_detector
+    _batch_detector = detector_class()
+
+
+def _check_batch(package_names: list[str]) -> list[tuple[str, list[str]]]:
+    assert _batch_detector is not None
+    return _check_names(_batch_detector, package_names)
+
+
+def _check_names(detector: TyposquatDetector, package_names: list[str]) -> list[tuple[str, list[str]]]:
+    return [
+        (name, sorted(detector.get_typosquatted_package(detector.normalize_name(name))))
+        for name in package_names
+    ]
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    chunk = []  # type: list[str]
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
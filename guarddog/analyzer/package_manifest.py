@@ -0,0 +1,282 @@
+""" Package manifest
+
+Lists the entries of a package once per scan, with their size, mode, git blob id, language and kind, so that the
+source code analysis and the metadata detectors share a single pass over the package instead of each walking and
+reading it again. Entries are stored in parallel arrays, which stay compact for packages of many files.
+"""
+import codecs
+import hashlib
+import logging
+import os
+import stat
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+log = logging.getLogger("guarddog")
+
+# Number of bytes read at the beginning of each file to find out what it contains
+SNIFF_SIZE = 8192
+
+# Size of the chunks files are hashed by
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Maximum number of files read at the same time
+MANIFEST_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+# Lines longer than this are only found in minified or generated code
+MINIFIED_LINE_LENGTH = 1000
+
+# Only JavaScript is shipped minified, long lines in other languages (e.g. Python payloads) are analyzed as usual
+BUNDLE_EXTENSIONS = (".js", ".mjs", ".cjs")
+MINIFIED_SUFFIXES = (".min.js", ".min.mjs", ".min.cjs", ".bundle.js")
+
+# Magic numbers which cannot start a text file, short ones which can (e.g. "MZ" or "%PDF") would let a source file
+# opt out of the analysis
+BINARY_MAGIC_NUMBERS = (
+    b"\x7fELF",  # ELF executables and shared libraries
+    b"\xca\xfe\xba\xbe",  # Java classes, Mach-O universal binaries
+    b"\xcf\xfa\xed\xfe",  # Mach-O 64-bit
+    b"\xce\xfa\xed\xfe",  # Mach-O 32-bit
+    b"\x00asm",  # WebAssembly
+    b"PK\x03\x04",  # zip archives, wheels, jars
+    b"\x1f\x8b",  # gzip archives
+    b"\xfd7zXZ\x00",  # xz archives
+    b"\x89PNG",
+    b"\xff\xd8\xff",  # JPEG
+)
+
+# Values of the languages and kinds arrays are indexes in these tuples
+LANGUAGES = (None, "python", "javascript", "typescript", "json")
+KINDS = (None, "source", "minified", "binary")
+
+LANGUAGE_EXTENSIONS = {
+    ".py": "python",
+    ".js": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".mts": "typescript",
+    ".cts": "typescript",
+    ".tsx": "typescript",
+    ".json": "json",
+}
+
+BLOB_ID_SIZE = 20
+EMPTY_BLOB_ID = bytes(BLOB_ID_SIZE)
+
+
+def _is_text(head: bytes) -> bool:
+    try:
+        # The sniffed buffer may end in the middle of a character
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def classify(file_name: str, head: bytes, size: int) -> str:
+    """
+    Classifies a file as "binary", "minified" or "source" from its name, its first bytes and its size. Files with the
+    extension of a language rules apply to are always analyzed, unless they cannot be read as text.
+    """
+    if get_language(file_name) is None:
+        if b"\x00" in head or head.startswith(BINARY_MAGIC_NUMBERS):
+            return "binary"
+    elif b"\x00" in head and not _is_text(head):
+        return "binary"
+    if file_name.endswith(".map"):
+        return "minified"
+    if not file_name.endswith(BUNDLE_EXTENSIONS):
+        return "source"
+    # A line longer than the sniffed buffer is necessarily longer than MINIFIED_LINE_LENGTH
+    if any(len(line) > MINIFIED_LINE_LENGTH for line in head.splitlines()):
+        return "minified"
+    # Every line of short files was checked, they are analyzed as usual whatever their name
+    if size > SNIFF_SIZE and file_name.endswith(MINIFIED_SUFFIXES):
+        return "minified"
+    return "source"
+
+
+def get_language(file_name: str) -> Optional[str]:
+    """
+    Returns the language of a file from its extension, or None if it is not a language rules apply to
+    """
+    return LANGUAGE_EXTENSIONS.get(os.path.splitext(file_name)[1].lower())
+
+
+class PackageManifest:
+    """
+    Entries of a package, directories included, sorted by relative path
+
+    Attributes:
+        path (str): path to directory of package
+        paths (list): paths of the entries, relative to path
+        sizes (array): size in bytes of each entry
+        modes (array): st_mode of each entry, symbolic links are not followed
+        blob_ids (bytearray): git blob id of each file, BLOB_ID_SIZE bytes per entry, zeros for directories and
+            unreadable files
+        languages (array): index in LANGUAGES of the language of each entry
+        kinds (array): index in KINDS of the kind of each regular file, 0 for other entries
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.paths = []  # type: list[str]
+        self.sizes = array("q")
+        self.modes = array("I")
+        self.blob_ids = bytearray()
+        self.languages = array("B")
+        self.kinds = array("B")
+        self._indexes = None  # type: Optional[dict[str, int]]
+
+    def add(self, relative_path: str, size: int, mode: int, blob_id: bytes = EMPTY_BLOB_ID,
+            kind: Optional[str] = None) -> None:
+        self.paths.append(relative_path)
+        self.sizes.append(size)
+        self.modes.append(mode)
+        self.blob_ids += blob_id
+        self.languages.append(LANGUAGES.index(get_language(relative_path)) if stat.S_ISREG(mode) else 0)
+        self.kinds.append(KINDS.index(kind))
+        self._indexes = None
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __contains__(self, relative_path: object) -> bool:
+        return relative_path in self._get_indexes()
+
+    def _get_indexes(self) -> dict[str, int]:
+        if self._indexes is None:
+            self._indexes = {relative_path: index for index, relative_path in enumerate(self.paths)}
+        return self._indexes
+
+    def get_index(self, relative_path: str) -> int:
+        """
+        Returns the index of an entry in the arrays of the manifest
+
+        Raises:
+            KeyError: if the package has no such entry
+        """
+        return self._get_indexes()[os.path.normpath(relative_path)]
+
+    def is_file(self, index: int) -> bool:
+        return stat.S_ISREG(self.modes[index])
+
+    def is_dir(self, index: int) -> bool:
+        return stat.S_ISDIR(self.modes[index])
+
+    def get_blob_id(self, index: int) -> Optional[str]:
+        """
+        Returns the git blob id of a file in hexadecimal, or None for directories and unreadable files
+        """
+        blob_id = bytes(self.blob_ids[index * BLOB_ID_SIZE:(index + 1) * BLOB_ID_SIZE])
+        return blob_id.hex() if blob_id != EMPTY_BLOB_ID else None
+
+    def get_language(self, index: int) -> Optional[str]:
+        return LANGUAGES[self.languages[index]]
+
+    def get_kind(self, index: int) -> Optional[str]:
+        return KINDS[self.kinds[index]]
+
+    def iter_files(self, prefix: Optional[str] = None) -> Iterator[int]:
+        """
+        Iterates over the indexes of the regular files, optionally only the ones in a directory of the package
+
+        Args:
+            prefix (str, optional): path of the directory, relative to the package directory
+        """
+        prefix = os.path.normpath(prefix) + os.sep if prefix is not None else ""
+        if prefix == os.curdir + os.sep:
+            prefix = ""
+        for index, relative_path in enumerate(self.paths):
+            if relative_path.startswith(prefix) and self.is_file(index):
+                yield index
+
+    def get_files(self, language: Optional[str] = None) -> list[str]:
+        """
+        Returns the paths of the regular files, optionally only the ones of a language
+
+        Args:
+            language (str, optional): language of the files, see LANGUAGES
+        """
+        language_index = LANGUAGES.index(language) if language is not None else None
+        return [
+            self.paths[index] for index in self.iter_files()
+            if language_index is None or self.languages[index] == language_index
+        ]
+
+
+def _read_file(path: str) -> tuple[int, bytes, bytes]:
+    """
+    Reads a file once, returning its size, its first SNIFF_SIZE bytes and its git blob id
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        hash_object = hashlib.sha1(b"blob %d\0" % size)
+        head = f.read(SNIFF_SIZE)
+        hash_object.update(head)
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hash_object.update(chunk)
+    return size, head, hash_object.digest()
+
+
+def build_manifest(path: str) -> PackageManifest:
+    """
+    Walks a package once, reading each of its files once
+
+    Args:
+        path (str): path to directory of package
+
+    Returns:
+        PackageManifest: entries of the package, relative to path
+    """
+    entries = []  # type: list[tuple[str, os.DirEntry]]
+    directories = [""]
+    while len(directories) > 0:
+        relative_root = directories.pop()
+        try:
+            scanned_entries = list(os.scandir(os.path.join(path, relative_root)))
+        except OSError as e:
+            log.debug(f"Unable to list {relative_root or path}, skipping: {str(e)}")
+            continue
+        for entry in scanned_entries:
+            relative_path = os.path.join(relative_root, entry.name)
+            entries.append((relative_path, entry))
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(relative_path)
+    entries.sort(key=lambda entry: entry[0])
+
+    def read_entry(entry: os.DirEntry) -> Optional[tuple[int, bytes, bytes]]:
+        try:
+            if entry.is_symlink():
+                # Git hashes symbolic links by their target
+                target = os.fsencode(os.readlink(entry.path))
+                return len(target), b"", hashlib.sha1(b"blob %d\0" % len(target) + target).digest()
+            if entry.is_file(follow_symlinks=False):
+                return _read_file(entry.path)
+        except OSError as e:
+            log.debug(f"Unable to read {entry.path}, skipping: {str(e)}")
+        return None
+
+    with ThreadPoolExecutor(max_workers=MANIFEST_MAX_WORKERS) as executor:
+        contents = list(executor.map(lambda entry: read_entry(entry[1]), entries))
+
+    manifest = PackageManifest(path)
+    for (relative_path, entry), content in zip(entries, contents):
+        try:
+            mode = entry.stat(follow_symlinks=False).st_mode
+        except OSError:
+            continue
+        if content is None:
+            if stat.S_ISREG(mode):
+                continue  # unreadable files are skipped, like the ones which disappeared
+            manifest.add(relative_path, 0, mode)
+            continue
+        size, head, blob_id = content
+        kind = classify(entry.name, head, size) if stat.S_ISREG(mode) else None
+        manifest.add(relative_path, size, mode, blob_id, kind)
+
+    log.debug(f"Listed {len(manifest)} entries in {path}")
+    return manifest
@@ -0,0 +1,69 @@
+""" Profiling
+
+Records where the time of a scan goes, per rule and per file, so that expensive rules can be found and fixed
+"""
+import os
+from typing import Optional
+
+# Number of files reported in the profile, slowest first
+PROFILE_SLOWEST_FILES = 10
+
+
+class ScanTimings:
+    """
+    Time spent running each rule and analyzing each file of a package, in seconds
+
+    Attributes:
+        metadata (dict): wall time of each metadata detector
+        rules (dict): parse and match time of each source code rule
+        files (dict): analysis time of each file, relative to the package directory
+    """
+
+    def __init__(self) -> None:
+        self.metadata = {}  # type: dict[str, float]
+        self.rules = {}  # type: dict[str, dict[str, float]]
+        self.files = {}  # type: dict[str, float]
+
+    def add_metadata_time(self, rule: str, seconds: float) -> None:
+        self.metadata[rule] = self.metadata.get(rule, 0.0) + seconds
+
+    def add_rule_time(self, rule: str, parse_time: float = 0.0, match_time: float = 0.0) -> None:
+        timings = self.rules.setdefault(rule, {"parse_time": 0.0, "match_time": 0.0})
+        timings["parse_time"] += parse_time
+        timings["match_time"] += match_time
+
+    def add_file_time(self, file: str, seconds: float) -> None:
+        self.files[file] = self.files.get(file, 0.0) + seconds
+
+    def add_semgrep_timings(self, timings: dict, targetpath: Optional[str] = None) -> None:
+        """
+        Records the timings Semgrep reports when invoked with --time
+
+        Args:
+            timings (dict): "time" section of the Semgrep JSON output
+            targetpath (str, optional): root directory of scan, file paths are made relative to it
+        """
+        rules = [rule.split(".")[-1] for rule in timings.get("rules", [])]
+        for target in timings.get("targets", []):
+            for rule, parse_time, match_time in zip(rules, target.get("parse_times", []),
+                                                    target.get("match_times", [])):
+                self.add_rule_time(rule, parse_time=parse_time, match_time=match_time)
+
+            file_path = os.path.abspath(target["path"])
+            if targetpath:
+                file_path = os.path.relpath(file_path, targetpath)
+            self.add_file_time(file_path, target.get("run_time", 0.0))
+
+    def get_metadata_timings(self) -> dict:
+        return {"metadata": dict(self.metadata)}
+
+    def get_sourcecode_timings(self, slowest_files: int = PROFILE_SLOWEST_FILES) -> dict:
+        """
+        Returns:
+            dict: timings of the source code rules, and the slowest files of the package
+        """
+        files = sorted(self.files.items(), key=lambda item: item[1], reverse=True)[:slowest_files]
+        return {
+            "rules": {rule: dict(timings) for rule, timings in self.rules.items()},
+            "slowest_files": [{"path": file, "time": seconds} for file, seconds in files],
+        }
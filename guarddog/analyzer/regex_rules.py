@@ -0,0 +1,96 @@
+""" Regex rules
+
+Evaluates Semgrep rules only made of regexes in-process. This is used on minified or generated files, which are too
+expensive for Semgrep to parse but can still be searched line by line.
+"""
+import re
+from typing import Optional
+
+REGEX_OPERATORS = {"pattern-regex", "pattern-not-regex", "pattern-either"}
+
+
+class RegexRule:
+    """
+    Semgrep rule made of pattern-regex and pattern-not-regex operators only
+
+    Attributes:
+        name (str): name of the rule
+        message (str): message attached to each finding
+        patterns (list): compiled regexes, a finding is reported for each match of any of them
+        excluded_patterns (list): compiled regexes, matches located within a match of these are discarded
+    """
+
+    def __init__(self, name: str, message: str, patterns: list[re.Pattern], excluded_patterns: list[re.Pattern]):
+        self.name = name
+        self.message = message
+        self.patterns = patterns
+        self.excluded_patterns = excluded_patterns
+
+    @staticmethod
+    def from_semgrep_rule(rule: dict) -> Optional["RegexRule"]:
+        """
+        Builds a RegexRule out of a Semgrep rule, or returns None if the rule uses anything else than regexes
+        """
+        if "pattern-regex" in rule:
+            operators = [{"pattern-regex": rule["pattern-regex"]}]
+        elif "pattern-either" in rule:
+            operators = [{"pattern-either": rule["pattern-either"]}]
+        elif "patterns" in rule:
+            operators = rule["patterns"]
+        else:
+            return None
+
+        patterns = []
+        excluded_patterns = []
+        positive_operators = 0
+        for operator in operators:
+            if len(operator) != 1 or next(iter(operator)) not in REGEX_OPERATORS:
+                return None
+            if "pattern-not-regex" in operator:
+                excluded_patterns.append(operator["pattern-not-regex"])
+                continue
+
+            positive_operators += 1
+            if "pattern-regex" in operator:
+                patterns.append(operator["pattern-regex"])
+            else:
+                alternatives = operator["pattern-either"]
+                if any(list(alternative.keys()) != ["pattern-regex"] for alternative in alternatives):
+                    return None
+                patterns.extend(alternative["pattern-regex"] for alternative in alternatives)
+
+        # Several positive operators would need to be intersected, which is not worth supporting for now
+        if positive_operators != 1:
+            return None
+
+        try:
+            return RegexRule(
+                rule["id"],
+                rule["message"],
+                [re.compile(pattern, re.MULTILINE) for pattern in patterns],
+                [re.compile(pattern, re.MULTILINE) for pattern in excluded_patterns],
+            )
+        except re.error:  # PCRE syntax unsupported by Python
+            return None
+
+    def analyze_file(self, path: str) -> list[tuple[int, str]]:
+        """
+        Searches a file for the rule regexes
+
+        Returns:
+            list: (line number, matching code) of each finding
+        """
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            contents = f.read()
+
+        excluded_ranges = [match.span() for pattern in self.excluded_patterns for match in pattern.finditer(contents)]
+        findings = {}  # type: dict[tuple[int, int], str]
+        for pattern in self.patterns:
+            for match in pattern.finditer(contents):
+                start, end = match.span()
+                if any(excluded_start <= start and end <= excluded_end
+                       for excluded_start, excluded_end in excluded_ranges):
+                    continue
+                findings[(start, end)] = match.group(0)
+
+        return [(contents.count("\n", 0, start) + 1, code) for (start, _), code in sorted(findings.items())]
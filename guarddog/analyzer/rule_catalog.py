@@ -0,0 +1,198 @@
+""" Rule catalog
+
+Single source of the Semgrep rules shipped with GuardDog, used by the analyzer, the CLI, the reporters and the
+documentation. Rule files are parsed with the C-accelerated YAML loader when it is available, and the parsed catalog
+is serialized in the user cache, keyed by a hash of the rule files, so that later runs do not need YAML at all.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Iterator, Optional
+
+from guarddog.ecosystems import ECOSYSTEM
+from guarddog.utils.cache import get_cache_dir
+
+log = logging.getLogger("guarddog")
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), "sourcecode")
+
+# Bumped whenever the serialized catalog changes, which invalidates catalogs cached by previous versions
+CATALOG_FORMAT_VERSION = 2
+
+LANGUAGE_ECOSYSTEMS = {
+    "python": ECOSYSTEM.PYPI,
+    "javascript": ECOSYSTEM.NPM,
+    "typescript": ECOSYSTEM.NPM,
+    "json": ECOSYSTEM.NPM,
+}
+
+
+def get_rule_names(rules_path: str = RULES_PATH) -> set[str]:
+    """
+    Lists the rules without parsing them, since rule files are named after the rule they define
+    """
+    return set(file_name.removesuffix(".yml") for file_name in _list_rule_files(rules_path))
+
+
+def _list_rule_files(rules_path: str) -> list[str]:
+    return sorted(file_name for file_name in os.listdir(rules_path) if file_name.endswith(".yml"))
+
+
+class CatalogRule:
+    """
+    Semgrep rule of the catalog
+
+    Attributes:
+        id (str): name of the rule
+        message (str): message attached to each finding
+        description (str): description of the rule, defaulting to its message
+        languages (list): languages the rule is written for
+        targets (list): target globs of the rule, or None if it applies to all files
+        definition (dict): Semgrep definition of the rule
+    """
+
+    def __init__(self, definition: dict):
+        self.definition = definition
+        self.id = definition["id"]  # type: str
+        self.message = definition.get("message", "")  # type: str
+        metadata = definition.get("metadata", {})
+        self.description = metadata.get("description") or self.message  # type: str
+        self.languages = definition.get("languages", [])  # type: list[str]
+        self.targets = metadata.get("targets")  # type: Optional[list[str]]
+
+    def get_ecosystems(self) -> list[ECOSYSTEM]:
+        ecosystems = []  # type: list[ECOSYSTEM]
+        for language in self.languages:
+            ecosystem = LANGUAGE_ECOSYSTEMS.get(language)
+            if ecosystem is not None and ecosystem not in ecosystems:
+                ecosystems.append(ecosystem)
+        return ecosystems
+
+
+class RuleCatalog:
+    """
+    Semgrep rules, in the order of their rule files
+
+    Attributes:
+        rules (dict): map from rule names to rules
+        key (str): hash of the rule files the catalog was loaded from, empty if unknown
+    """
+
+    def __init__(self, rules: list[CatalogRule], key: str = "") -> None:
+        self.rules = {rule.id: rule for rule in rules}
+        self.key = key
+
+    def __iter__(self) -> Iterator[CatalogRule]:
+        return iter(self.rules.values())
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __getitem__(self, rule_name: str) -> CatalogRule:
+        return self.rules[rule_name]
+
+    def get_rules(self, ecosystem: ECOSYSTEM) -> list[CatalogRule]:
+        """
+        Returns the rules written in a language of an ecosystem
+        """
+        return [rule for rule in self.rules.values() if ecosystem in rule.get_ecosystems()]
+
+
+def _get_catalog_key(rules_path: str, file_names: list[str]) -> str:
+    digest = hashlib.sha256(f"{CATALOG_FORMAT_VERSION}\n".encode())
+    for file_name in file_names:
+        with open(os.path.join(rules_path, file_name), "rb") as f:
+            contents = f.read()
+        digest.update(f"{file_name}\n{len(contents)}\n".encode())
+        digest.update(contents)
+    return digest.hexdigest()
+
+
+def _get_catalog_cache_path(rules_path: str) -> str:
+    # Each installation of GuardDog gets its own catalog, named after the location of its rules
+    name = hashlib.sha256(os.path.realpath(rules_path).encode()).hexdigest()[:16]
+    return os.path.join(get_cache_dir("rules"), f"catalog-{name}.json")
+
+
+def _parse_rule_files(rules_path: str, file_names: list[str]) -> list[dict]:
+    import yaml
+
+    try:
+        loader = yaml.CSafeLoader  # type: type
+    except AttributeError:  # PyYAML built without libyaml
+        loader = yaml.SafeLoader
+
+    definitions = []  # type: list[dict]
+    for file_name in file_names:
+        with open(os.path.join(rules_path, file_name), "r") as fd:
+            definitions.extend(yaml.load(fd, Loader=loader)["rules"])
+    return definitions
+
+
+def _write_catalog(cache_path: str, serialized: dict) -> None:
+    directory = os.path.dirname(cache_path)
+    fd, temporary_path = tempfile.mkstemp(dir=directory, prefix=".catalog-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(serialized, f)
+        os.replace(temporary_path, cache_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def load_catalog(rules_path: str = RULES_PATH) -> RuleCatalog:
+    """
+    Loads the rules of a directory, from the cached catalog if the rule files did not change since it was written
+
+    Args:
+        rules_path (str): directory of the rule files
+
+    Returns:
+        RuleCatalog: rules of the directory
+    """
+    file_names = _list_rule_files(rules_path)
+    key = _get_catalog_key(rules_path, file_names)
+
+    cache_path = None
+    try:
+        cache_path = _get_catalog_cache_path(rules_path)
+        with open(cache_path, "r") as f:
+            serialized = json.load(f)
+        if serialized.get("key") == key:
+            return RuleCatalog([CatalogRule(definition) for definition in serialized["rules"]], key)
+        log.debug(f"Rule catalog {cache_path} is outdated, parsing rules again")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        log.debug(f"Unable to read the rule catalog, parsing rules again: {str(e)}")
+
+    rules = [CatalogRule(definition) for definition in _parse_rule_files(rules_path, file_names)]
+    if cache_path is not None:
+        try:
+            _write_catalog(cache_path, {
+                "key": key,
+                "rules": [rule.definition for rule in rules],
+            })
+        except OSError as e:
+            log.debug(f"Unable to write the rule catalog to {cache_path}: {str(e)}")
+    return RuleCatalog(rules, key)
+
+
+_catalog: Optional[RuleCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> RuleCatalog:
+    """
+    Returns the catalog of the rules shipped with GuardDog, loading it on first use
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+    return _catalog
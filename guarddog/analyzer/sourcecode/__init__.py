@@ -1,31 +1,48 @@
-import os
-import pathlib
-
-import yaml
-from yaml.loader import SafeLoader
+from typing import Optional
 
+from guarddog.analyzer.manifest import MANIFEST_RULES
+from guarddog.analyzer.regex_rules import RegexRule
+from guarddog.analyzer.rule_catalog import get_catalog, get_rule_names
 from guarddog.ecosystems import ECOSYSTEM
 
-current_dir = pathlib.Path(__file__).parent.resolve()
-rule_file_names = list(
-    filter(
-        lambda x: x.endswith('yml'),
-        os.listdir(current_dir)
-    )
-)
-
-SOURCECODE_RULES = {
-    ECOSYSTEM.PYPI: list(),
-    ECOSYSTEM.NPM: list()
-}  # type: dict[ECOSYSTEM, list[dict]]
-
-for file_name in rule_file_names:
-    with open(os.path.join(current_dir, file_name), "r") as fd:
-        data = yaml.load(fd, Loader=SafeLoader)
-        for rule in data["rules"]:
-            for lang in rule["languages"]:
-                match lang:
-                    case "python":
-                        SOURCECODE_RULES[ECOSYSTEM.PYPI].append(rule)
-                    case "javascript" | "typescript" | "json":
-                        SOURCECODE_RULES[ECOSYSTEM.NPM].append(rule)
+SOURCECODE_RULE_NAMES = get_rule_names()
+
+
+def _load_rules() -> None:
+    """
+    Builds the rules from the rule catalog, which is deferred to the first access to SOURCECODE_RULES,
+    SOURCECODE_RULE_TARGETS or SOURCECODE_REGEX_RULES
+    """
+    rules = {
+        ECOSYSTEM.PYPI: list(),
+        ECOSYSTEM.NPM: list()
+    }  # type: dict[ECOSYSTEM, list[dict]]
+    rule_targets: dict[str, Optional[list[str]]] = {}
+    regex_rules: dict[str, RegexRule] = {}
+
+    for rule in get_catalog():
+        rule_targets[rule.id] = rule.targets
+        regex_rule = RegexRule.from_semgrep_rule(rule.definition)
+        if regex_rule is not None:
+            regex_rules[rule.id] = regex_rule
+        for ecosystem in rule.get_ecosystems():
+            rules[ecosystem].append(rule.definition)
+
+    # Rules on package manifests are evaluated in-process rather than by Semgrep, but are listed alongside Semgrep
+    # rules
+    for manifest_rule in MANIFEST_RULES.values():
+        rule_targets[manifest_rule.get_name()] = manifest_rule.targets
+        rules[manifest_rule.ecosystem].append({
+            "id": manifest_rule.get_name(),
+            "message": manifest_rule.get_message(),
+            "metadata": {"description": manifest_rule.get_description(), "targets": manifest_rule.targets}
+        })
+
+    globals().update(SOURCECODE_RULES=rules, SOURCECODE_RULE_TARGETS=rule_targets, SOURCECODE_REGEX_RULES=regex_rules)
+
+
+def __getattr__(name: str):
+    if name in ("SOURCECODE_RULES", "SOURCECODE_RULE_TARGETS", "SOURCECODE_REGEX_RULES"):
+        _load_rules()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
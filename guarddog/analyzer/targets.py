@@ -0,0 +1,176 @@
+""" Target selection
+
+Discovers the files of a package worth analyzing, and resolves the files each source code rule applies to, based
+on the globs rules declare in metadata.targets
+"""
+import fnmatch
+import heapq
+import logging
+import math
+import os
+from typing import Iterable, Optional
+
+from guarddog.analyzer.package_manifest import PackageManifest, build_manifest
+
+log = logging.getLogger("guarddog")
+
+
+class PackageTargets:
+    """
+    Files of a package, sorted by how they should be analyzed
+
+    Attributes:
+        files (list): paths of the source files, relative to the package directory
+        minified (list): paths of the minified or generated files, only worth a regex pass
+        sizes (dict): size in bytes of each source and minified file
+        skipped (dict): number of excluded directories and of skipped binary files
+    """
+
+    def __init__(self) -> None:
+        self.files = []  # type: list[str]
+        self.minified = []  # type: list[str]
+        self.sizes = {}  # type: dict[str, int]
+        self.skipped = {"excluded_directories": 0, "binary_files": 0}
+
+    def get_statistics(self) -> dict[str, int]:
+        return {"source_files": len(self.files), "minified_files": len(self.minified)} | self.skipped
+
+
+def get_targets(manifest: PackageManifest, exclude: Iterable[str]) -> PackageTargets:
+    """
+    Sorts the files of a package from its manifest, skipping excluded directories and binary files, and setting
+    minified files aside
+
+    Args:
+        manifest (PackageManifest): entries of the package
+        exclude (list): names of directories to skip
+
+    Returns:
+        PackageTargets: files of the package, relative to its directory
+    """
+    excluded = set(exclude)
+    targets = PackageTargets()
+    for index, relative_path in enumerate(manifest.paths):
+        parts = relative_path.split(os.sep)
+        if any(part in excluded for part in parts[:-1]):
+            continue
+        if manifest.is_dir(index):
+            if parts[-1] in excluded:
+                targets.skipped["excluded_directories"] += 1
+            continue
+        match manifest.get_kind(index):
+            case "binary":
+                targets.skipped["binary_files"] += 1
+            case "minified":
+                targets.minified.append(relative_path)
+                targets.sizes[relative_path] = manifest.sizes[index]
+            case "source":
+                targets.files.append(relative_path)
+                targets.sizes[relative_path] = manifest.sizes[index]
+
+    log.debug(f"Discovered files in {manifest.path}: {targets.get_statistics()}")
+    return targets
+
+
+def discover_targets(path: str, exclude: Iterable[str]) -> PackageTargets:
+    """
+    Walks a package, skipping excluded directories and binary files, and setting minified files aside
+
+    Args:
+        path (str): path to directory of package
+        exclude (list): names of directories to skip
+
+    Returns:
+        PackageTargets: files of the package, relative to path
+    """
+    return get_targets(build_manifest(path), exclude)
+
+
+def list_files(path: str, exclude: Iterable[str]) -> list[str]:
+    """
+    Lists the source files of a package, skipping excluded directories, binary and minified files
+
+    Args:
+        path (str): path to directory of package
+        exclude (list): names of directories to skip
+
+    Returns:
+        list[str]: paths of the files, relative to path
+    """
+    return discover_targets(path, exclude).files
+
+
+def match_targets(relative_path: str, targets: Iterable[str]) -> bool:
+    """
+    Returns True if a file matches one of the target globs of a rule.
+    Globs without a path separator are matched against the file name only, wherever the file is in the package
+
+    Args:
+        relative_path (str): path of the file, relative to the package directory
+        targets (list): target globs of a rule
+    """
+    file_name = os.path.basename(relative_path)
+    for target in targets:
+        if "/" in target:
+            if fnmatch.fnmatch(relative_path, target):
+                return True
+        elif fnmatch.fnmatch(file_name, target):
+            return True
+    return False
+
+
+def group_rules_by_targets(rules: Iterable[str],
+                           rule_targets: dict[str, Optional[list[str]]]) -> dict[Optional[tuple[str, ...]], list[str]]:
+    """
+    Groups rules declaring the same target globs together, so that each group can be evaluated in a single pass
+
+    Args:
+        rules (list): names of the rules to group
+        rule_targets (dict): map from rule names to their target globs, or None if a rule applies to all files
+
+    Returns:
+        dict: map from a sorted tuple of target globs (or None) to the names of the rules declaring them
+    """
+    groups = {}  # type: dict[Optional[tuple[str, ...]], list[str]]
+    for rule in sorted(rules):
+        targets = rule_targets.get(rule)
+        key = tuple(sorted(set(targets))) if targets is not None else None
+        groups.setdefault(key, []).append(rule)
+    return groups
+
+
+def shard_targets(files: list[str], sizes: dict[str, int], max_shards: int, min_shard_size: int,
+                  max_shard_files: int) -> list[list[str]]:
+    """
+    Splits files into shards of balanced total size, so that a large package can be analyzed by several processes.
+    Files are placed largest first, each one into the shard with the lowest total size so far.
+
+    Args:
+        files (list): files to split
+        sizes (dict): size in bytes of each file
+        max_shards (int): maximum number of shards, unless more are needed to respect max_shard_files
+        min_shard_size (int): total size in bytes under which splitting files further is not worth it
+        max_shard_files (int): maximum number of files in a shard
+
+    Returns:
+        list[list[str]]: non-empty shards of files
+    """
+    if len(files) == 0:
+        return []
+
+    total_size = sum(sizes.get(file, 0) for file in files)
+    shard_count = min(max_shards, math.ceil(total_size / max(min_shard_size, 1)))
+    shard_count = max(shard_count, math.ceil(len(files) / max_shard_files), 1)
+    shard_count = min(shard_count, len(files))
+
+    shards = [[] for _ in range(shard_count)]  # type: list[list[str]]
+    heap = [(0, index) for index in range(shard_count)]  # (total size, shard index)
+    for file in sorted(files, key=lambda file: sizes.get(file, 0), reverse=True):
+        shard_size, index = heapq.heappop(heap)
+        # Full shards are dropped from the heap, there is always one left since shard_count * max_shard_files >= files
+        while len(shards[index]) >= max_shard_files:
+            shard_size, index = heapq.heappop(heap)
+        shards[index].append(file)
+        heapq.heappush(heap, (shard_size + sizes.get(file, 0), index))
+
+    return shards
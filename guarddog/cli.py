@@ -2,27 +2,27 @@
 
 CLI command that scans a PyPI package version for user-specified malware flags.
 Includes rules based on package registry metadata and source code analysis.
+
+Modules only needed by some commands (scanners, reporters, table and color formatting, ...) are imported by these
+commands, so that starting the CLI stays fast.
 """
+import json
 import logging
+import math
 import os
 import sys
 from typing import cast, Optional
 
 import click
-from prettytable import PrettyTable
-from termcolor import colored
 
-from guarddog.analyzer.analyzer import SEMGREP_RULE_NAMES
+from guarddog.analyzer.manifest import MANIFEST_RULES
 from guarddog.analyzer.metadata import get_metadata_detectors
-from guarddog.analyzer.sourcecode import SOURCECODE_RULES
+from guarddog.analyzer.sourcecode import SOURCECODE_RULE_NAMES
 from guarddog.ecosystems import ECOSYSTEM
-from guarddog.reporters.sarif import report_verify_sarif
-from guarddog.scanners import get_scanner
-from guarddog.scanners.scanner import PackageScanner
 
 ALL_RULES = \
     set(get_metadata_detectors(ECOSYSTEM.NPM).keys()) \
-    | set(get_metadata_detectors(ECOSYSTEM.PYPI).keys()) | SEMGREP_RULE_NAMES
+    | set(get_metadata_detectors(ECOSYSTEM.PYPI).keys()) | SOURCECODE_RULE_NAMES | set(MANIFEST_RULES.keys())
 EXIT_CODE_ISSUES_FOUND = 1
 
 AVAILABLE_LOG_LEVELS = {
@@ -41,6 +41,10 @@ def common_options(fn):
                       help="Exit with a non-zero status code if at least one issue is identified")(fn)
     fn = click.option("-r", "--rules", multiple=True, type=click.Choice(ALL_RULES, case_sensitive=False))(fn)
     fn = click.option("-x", "--exclude-rules", multiple=True, type=click.Choice(ALL_RULES, case_sensitive=False))(fn)
+    fn = click.option("--profile", default=False, is_flag=True,
+                      help="Report the time spent running each rule and analyzing the slowest files")(fn)
+    fn = click.option("--no-cache", default=False, is_flag=True,
+                      help="Analyze packages again instead of reusing the results of previous scans")(fn)
     fn = click.argument("target")(fn)
     return fn
 
@@ -94,18 +98,26 @@ def _get_rule_pram(rules, exclude_rules):
     return rule_param
 
 
-def _verify(path, rules, exclude_rules, output_format, exit_non_zero_on_finding, ecosystem):
+def _verify(path, rules, exclude_rules, output_format, exit_non_zero_on_finding, ecosystem, profile=False,
+            no_cache=False):
     """Verify a requirements.txt file
 
     Args:
         path (str): path to requirements.txt file
     """
+    from guarddog.reporters.sarif import report_verify_sarif
+    from guarddog.scanners import get_scanner
+
     return_value = None
     rule_param = _get_rule_pram(rules, exclude_rules)
     scanner = get_scanner(ecosystem, True)
     if scanner is None:
         sys.stderr.write(f"Command verify is not supported for ecosystem {ecosystem}")
         exit(1)
+    if profile:
+        scanner.enable_profiling()
+    elif not no_cache:
+        scanner.enable_result_cache()
 
     def display_result(result: dict) -> None:
         identifier = result['dependency'] if result['version'] is None \
@@ -151,7 +163,8 @@ def is_local_target(identifier: str) -> bool:
     return False
 
 
-def _scan(identifier, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, ecosystem: ECOSYSTEM):
+def _scan(identifier, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, ecosystem: ECOSYSTEM,
+          profile=False, no_cache=False):
     """Scan a package
 
     Args:
@@ -160,11 +173,18 @@ def _scan(identifier, version, rules, exclude_rules, output_format, exit_non_zer
         rules (list[str]): specific rules to run, defaults to all
     """
 
+    from guarddog.scanners import get_scanner
+    from guarddog.scanners.scanner import PackageScanner
+
     rule_param = _get_rule_pram(rules, exclude_rules)
     scanner = cast(Optional[PackageScanner], get_scanner(ecosystem, False))
     if scanner is None:
         sys.stderr.write(f"Command scan is not supported for ecosystem {ecosystem}")
         exit(1)
+    if profile:
+        scanner.enable_profiling()
+    elif not no_cache:
+        scanner.enable_result_cache()
     results = {}
     if is_local_target(identifier):
         log.debug(f"Considering that '{identifier}' is a local target, scanning filesystem")
@@ -188,7 +208,34 @@ def _scan(identifier, version, rules, exclude_rules, output_format, exit_non_zer
         exit_with_status_code(results)
 
 
+def _typosquat_check(names_file, exit_non_zero_on_finding, ecosystem: ECOSYSTEM):
+    """Checks a list of package names for typosquatting, without downloading the packages
+
+    Args:
+        names_file (file): file with one package name per line
+    """
+    from guarddog.analyzer.metadata.typosquatting import BATCH_CHUNK_SIZE, TyposquatDetector
+    from guarddog.utils.parallelism import get_parallelism
+
+    detector = cast(TyposquatDetector, get_metadata_detectors(ecosystem)["typosquatting"])
+    names = [line.strip() for line in names_file if line.strip() != "" and not line.startswith("#")]
+    processes = min(get_parallelism(), math.ceil(len(names) / BATCH_CHUNK_SIZE))
+
+    issues = 0
+    for name, similar_package_names in detector.get_typosquatted_packages(names, processes):
+        if len(similar_package_names) > 0:
+            issues += 1
+            print(json.dumps({"name": name, "similar_packages": similar_package_names}))
+
+    if exit_non_zero_on_finding:
+        exit_with_status_code({"issues": issues})
+
+
 def _list_rules(ecosystem):
+    from prettytable import PrettyTable
+
+    from guarddog.analyzer.sourcecode import SOURCECODE_RULES
+
     table = PrettyTable()
     table.align = "l"
     table.field_names = ["Rule type", "Rule name", "Description"]
@@ -198,8 +245,7 @@ def _list_rules(ecosystem):
 
     metadata_rules = get_metadata_detectors(ecosystem)
     for ruleName in metadata_rules:
-        rule = metadata_rules[ruleName]
-        table.add_row(["Package metadata", rule.get_name(), rule.get_description()])
+        table.add_row(["Package metadata", ruleName, metadata_rules.get_description(ruleName)])
 
     print(table)
 
@@ -221,37 +267,61 @@ def pypi(**kwargs):
 @npm.command("scan")
 @common_options
 @scan_options
-def scan_npm(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding):
+def scan_npm(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, profile, no_cache):
     """ Scan a given npm package
     """
-    return _scan(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.NPM)
+    return _scan(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.NPM,
+                 profile, no_cache)
 
 
 @npm.command("verify")
 @common_options
 @verify_options
-def verify_npm(target, rules, exclude_rules, output_format, exit_non_zero_on_finding):
+def verify_npm(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, profile, no_cache):
     """ Verify a given npm project
     """
-    return _verify(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.NPM)
+    return _verify(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.NPM,
+                   profile, no_cache)
 
 
 @pypi.command("scan")
 @common_options
 @scan_options
-def scan_pypi(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding):
+def scan_pypi(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, profile, no_cache):
     """ Scan a given PyPI package
     """
-    return _scan(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.PYPI)
+    return _scan(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.PYPI,
+                 profile, no_cache)
 
 
 @pypi.command("verify")
 @common_options
 @verify_options
-def verify_pypi(target, rules, exclude_rules, output_format, exit_non_zero_on_finding):
+def verify_pypi(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, profile, no_cache):
     """ Verify a given Pypi project
     """
-    return _verify(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.PYPI)
+    return _verify(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.PYPI,
+                   profile, no_cache)
+
+
+@npm.command("typosquat-check")
+@click.argument("names_file", type=click.File("r"))
+@click.option("--exit-non-zero-on-finding", default=False, is_flag=True,
+              help="Exit with a non-zero status code if at least one name is flagged")
+def typosquat_check_npm(names_file, exit_non_zero_on_finding):
+    """ Check a list of npm package names for typosquatting, one JSON line is printed per flagged name
+    """
+    return _typosquat_check(names_file, exit_non_zero_on_finding, ECOSYSTEM.NPM)
+
+
+@pypi.command("typosquat-check")
+@click.argument("names_file", type=click.File("r"))
+@click.option("--exit-non-zero-on-finding", default=False, is_flag=True,
+              help="Exit with a non-zero status code if at least one name is flagged")
+def typosquat_check_pypi(names_file, exit_non_zero_on_finding):
+    """ Check a list of PyPI package names for typosquatting, one JSON line is printed per flagged name
+    """
+    return _typosquat_check(names_file, exit_non_zero_on_finding, ECOSYSTEM.PYPI)
 
 
 @pypi.command("list-rules")
@@ -268,22 +338,40 @@ def list_rules_npm():
     return _list_rules(ECOSYSTEM.NPM)
 
 
+@cli.command("update-resources")
+def update_resources_command():
+    """ Download the latest lists of popular packages used by the heuristics into the user cache
+    """
+    from guarddog.utils.resources import update_resources
+
+    try:
+        for path in update_resources():
+            print(f"Updated {path}")
+    except Exception as e:
+        sys.stderr.write(f"Unable to update resources: {str(e)}\n")
+        exit(1)
+
+
 @cli.command("verify", deprecated=True)
 @common_options
 @verify_options
-def verify(target, rules, exclude_rules, output_format, exit_non_zero_on_finding):
-    return _verify(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.PYPI)
+def verify(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, profile, no_cache):
+    return _verify(target, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.PYPI,
+                   profile, no_cache)
 
 
 @cli.command("scan", deprecated=True)
 @common_options
 @scan_options
-def scan(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding):
-    return _scan(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.PYPI)
+def scan(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, profile, no_cache):
+    return _scan(target, version, rules, exclude_rules, output_format, exit_non_zero_on_finding, ECOSYSTEM.PYPI,
+                 profile, no_cache)
 
 
 # Pretty prints scan results for the console
 def print_scan_results(results, identifier):
+    from termcolor import colored
+
     num_issues = results.get('issues')
     errors = results.get('errors', [])
 
@@ -315,8 +403,13 @@ def print_scan_results(results, identifier):
         print_errors(errors, identifier)
         print('\n')
 
+    if 'timings' in results:
+        print_timings(results['timings'])
+
 
 def print_errors(errors, identifier):
+    from termcolor import colored
+
     print(colored("Some rules failed to run while scanning " + identifier + ":", "yellow"))
     print()
     for rule in errors:
@@ -324,7 +417,29 @@ def print_errors(errors, identifier):
     print()
 
 
+def print_timings(timings):
+    from prettytable import PrettyTable
+
+    table = PrettyTable()
+    table.align = "l"
+    table.field_names = ["Rule", "Parse time (s)", "Match time (s)"]
+    for rule, seconds in sorted(timings.get('metadata', {}).items(), key=lambda item: item[1], reverse=True):
+        table.add_row([rule, "-", f"{seconds:.3f}"])
+    rules = sorted(timings.get('rules', {}).items(), key=lambda item: sum(item[1].values()), reverse=True)
+    for rule, rule_timings in rules:
+        table.add_row([rule, f"{rule_timings['parse_time']:.3f}", f"{rule_timings['match_time']:.3f}"])
+    print(table)
+
+    if len(timings.get('slowest_files', [])) > 0:
+        print("Slowest files:")
+        for file in timings['slowest_files']:
+            print(f"* {file['path']}: {file['time']:.3f}s")
+        print()
+
+
 def format_code_line_for_output(code):
+    from termcolor import colored
+
     return '    ' + colored(code.strip().replace('\n', '\n    ').replace('\t', '  '), None, 'on_red', attrs=['bold'])
 
 
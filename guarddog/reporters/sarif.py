@@ -1,10 +1,9 @@
 import hashlib
 import json
-import os.path
-
-import yaml
 
+from guarddog.analyzer.manifest import MANIFEST_RULES
 from guarddog.analyzer.metadata import get_metadata_detectors
+from guarddog.analyzer.rule_catalog import get_catalog
 from guarddog.ecosystems import ECOSYSTEM
 
 
@@ -16,19 +15,13 @@ def build_rules_help_list() -> dict:
     rules_documentation = {}
     for ecosystem in ECOSYSTEM:
         rules = get_metadata_detectors(ecosystem)
-        for name, instance in rules.items():
-            detector_class = instance.__class__.__base__
+        for name in rules:
+            detector_class = rules.get_class(name).__base__
             rules_documentation[name] = detector_class.__doc__
-    dir_path = os.path.dirname(os.path.realpath(__file__))
-    semgrep_rules_base_dir = os.path.join(dir_path, "..", "analyzer", "sourcecode")
-    for file in os.listdir(semgrep_rules_base_dir):
-        if not file.endswith('.yml') and not file.endswith('.yaml'):
-            continue
-        with open(os.path.join(semgrep_rules_base_dir, file), "r") as fd:
-            content = yaml.safe_load(fd)
-            for rule in content["rules"]:
-                text = rule["description"] if "description" in rule else rule["message"]
-                rules_documentation[rule["id"]] = text
+    for name, manifest_rule in MANIFEST_RULES.items():
+        rules_documentation[name] = manifest_rule.__class__.__doc__
+    for rule in get_catalog():
+        rules_documentation[rule.id] = rule.message
     return rules_documentation
 
 
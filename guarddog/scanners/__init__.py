@@ -1,21 +1,40 @@
 from typing import Optional
 
-from .npm_package_scanner import NPMPackageScanner
-from .npm_project_scanner import NPMRequirementsScanner
-from .pypi_package_scanner import PypiPackageScanner
-from .pypi_project_scanner import PypiRequirementsScanner
 from .scanner import Scanner
 from ..ecosystems import ECOSYSTEM
 
 
 def get_scanner(ecosystem: ECOSYSTEM, project: bool) -> Optional[Scanner]:
+    # Each scanner is imported when needed, project scanners notably depend on modules slow to import
     match (ecosystem, project):
         case (ECOSYSTEM.PYPI, False):
+            from .pypi_package_scanner import PypiPackageScanner
             return PypiPackageScanner()
         case (ECOSYSTEM.PYPI, True):
+            from .pypi_project_scanner import PypiRequirementsScanner
             return PypiRequirementsScanner()
         case (ECOSYSTEM.NPM, False):
+            from .npm_package_scanner import NPMPackageScanner
             return NPMPackageScanner()
         case (ECOSYSTEM.NPM, True):
+            from .npm_project_scanner import NPMRequirementsScanner
             return NPMRequirementsScanner()
     return None
+
+
+def __getattr__(name: str) -> type:
+    # Keeps "from guarddog.scanners import PypiPackageScanner" working, importing the scanner lazily
+    match name:
+        case "NPMPackageScanner":
+            from .npm_package_scanner import NPMPackageScanner
+            return NPMPackageScanner
+        case "NPMRequirementsScanner":
+            from .npm_project_scanner import NPMRequirementsScanner
+            return NPMRequirementsScanner
+        case "PypiPackageScanner":
+            from .pypi_package_scanner import PypiPackageScanner
+            return PypiPackageScanner
+        case "PypiRequirementsScanner":
+            from .pypi_project_scanner import PypiRequirementsScanner
+            return PypiRequirementsScanner
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,209 @@
+""" Lockfiles
+
+Reads the exact versions of the dependencies a project installs, and the digests of their artifacts, from its
+lockfile: package-lock.json, npm-shrinkwrap.json and yarn.lock for npm, poetry.lock, Pipfile.lock and requirements
+files pinning hashes for PyPI. Verifying a lockfile scans one version per dependency, instead of every version
+matching the ranges of the project manifest.
+"""
+import json
+import logging
+import re
+from typing import Callable, Iterator, NamedTuple, Optional
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib  # type: ignore
+
+from guarddog.utils.package_metadata import normalize_digest
+
+log = logging.getLogger("guarddog")
+
+# Versions which are not published on a registry: local directories, git repositories, tarball URLs, ...
+NON_REGISTRY_VERSION_REGEX = re.compile(r"[:/]")
+
+# Fields of an entry are indented by two spaces, the dependencies of the entry by four
+YARN_ENTRY_FIELD_REGEX = re.compile(r'^  "?([\w-]+)"?:?\s+"?([^"]*)"?\s*$')
+
+REQUIREMENT_PIN_REGEX = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*===?\s*([^\s;\\]+)")
+REQUIREMENT_HASH_REGEX = re.compile(r"--hash[=\s]+(\w+:[0-9a-fA-F]+)")
+
+
+class LockedPackage(NamedTuple):
+    """
+    Package version installed by a lockfile
+
+    Attributes:
+        name (str): name of the package
+        version (str): exact version of the package
+        digests (tuple): digests of the artifacts of the version, see normalize_digest
+    """
+    name: str
+    version: str
+    digests: tuple[str, ...]
+
+
+def _get_digests(raw_digests) -> tuple[str, ...]:
+    digests = []
+    for raw_digest in raw_digests:
+        digest = normalize_digest(raw_digest) if isinstance(raw_digest, str) else None
+        if digest is not None and digest not in digests:
+            digests.append(digest)
+    return tuple(digests)
+
+
+def _is_registry_version(version) -> bool:
+    return isinstance(version, str) and len(version) > 0 and NON_REGISTRY_VERSION_REGEX.search(version) is None
+
+
+def _is_registry_entry(entry: dict) -> bool:
+    """
+    Returns whether an entry of a package-lock.json file was installed from a registry, rather than from git or from
+    the file system
+    """
+    resolved = entry.get("resolved")
+    return _is_registry_version(entry.get("version")) and (resolved is None or resolved.startswith(("https:", "http:")))
+
+
+def _iter_package_lock_v1(dependencies: dict) -> Iterator[LockedPackage]:
+    for name, entry in dependencies.items():
+        if _is_registry_entry(entry):
+            yield LockedPackage(name, entry["version"], _get_digests([entry.get("integrity") or ""]))
+        yield from _iter_package_lock_v1(entry.get("dependencies") or {})
+
+
+def parse_package_lock(contents: str) -> list[LockedPackage]:
+    """
+    Parses a package-lock.json or npm-shrinkwrap.json file, of any lockfile version
+    """
+    lockfile = json.loads(contents)
+    if "packages" not in lockfile:
+        return list(_iter_package_lock_v1(lockfile.get("dependencies") or {}))
+
+    packages = []
+    for path, entry in lockfile["packages"].items():
+        # The root project is listed under "", and workspaces are linked rather than installed
+        if path == "" or entry.get("link"):
+            continue
+        # Aliased dependencies are installed under their alias, the name of the package is recorded separately
+        name = entry.get("name") or path.rsplit("node_modules/", 1)[-1]
+        if _is_registry_entry(entry):
+            packages.append(LockedPackage(name, entry["version"], _get_digests([entry.get("integrity") or ""])))
+    return packages
+
+
+def parse_yarn_lock(contents: str) -> list[LockedPackage]:
+    """
+    Parses a yarn.lock file, of Yarn 1 or of later versions. Only Yarn 1 records the digests published by the
+    registry, later versions record the digests of their own archives.
+    """
+    packages = []
+
+    def add_entry(descriptor: Optional[str], fields: dict[str, str]) -> None:
+        if descriptor is None or "@" not in descriptor[1:]:
+            return
+        # Descriptors are "name@range", scoped package names start with "@", and aliases have a range of the form
+        # "npm:package@range"
+        separator = descriptor.index("@", 1)
+        name, version_range = descriptor[:separator], descriptor[separator + 1:]
+        if version_range.startswith("npm:"):
+            version_range = version_range[len("npm:"):]
+            if "@" in version_range[1:]:
+                separator = version_range.index("@", 1)
+                name, version_range = version_range[:separator], version_range[separator + 1:]
+        version = fields.get("version")
+        # Workspaces, patches, git repositories and tarball URLs are not installed from the registry
+        if _is_registry_version(version) and NON_REGISTRY_VERSION_REGEX.search(version_range) is None:
+            packages.append(LockedPackage(name, version, _get_digests([fields.get("integrity") or ""])))  # type: ignore
+
+    descriptor = None  # type: Optional[str]
+    fields = {}  # type: dict[str, str]
+    for line in contents.splitlines():
+        if len(line.strip()) == 0 or line.lstrip().startswith("#"):
+            continue
+        if not line[0].isspace():
+            add_entry(descriptor, fields)
+            descriptor = line.rstrip(":").split(",")[0].strip().strip('"')
+            fields = {}
+            continue
+        match = YARN_ENTRY_FIELD_REGEX.match(line)
+        if match is not None and match.group(1) not in fields:
+            fields[match.group(1)] = match.group(2)
+    add_entry(descriptor, fields)
+    return packages
+
+
+def parse_poetry_lock(contents: str) -> list[LockedPackage]:
+    """
+    Parses a poetry.lock file, which lists the artifacts of each package either with the package or, in lockfiles
+    written by Poetry < 1.2, in a separate [metadata.files] table
+    """
+    lockfile = tomllib.loads(contents)
+    legacy_files = lockfile.get("metadata", {}).get("files", {})
+
+    packages = []
+    for package in lockfile.get("package", []):
+        if package.get("source", {}).get("type") not in (None, "legacy"):
+            continue  # git repositories, local directories and files
+        name = package.get("name")
+        version = package.get("version")
+        files = package.get("files") or legacy_files.get(name) or []
+        if isinstance(name, str) and _is_registry_version(version):
+            packages.append(LockedPackage(name, version, _get_digests(file.get("hash") for file in files)))
+    return packages
+
+
+def parse_pipfile_lock(contents: str) -> list[LockedPackage]:
+    """
+    Parses a Pipfile.lock file, both its default and development packages
+    """
+    lockfile = json.loads(contents)
+    packages = []
+    for section in ("default", "develop"):
+        for name, entry in (lockfile.get(section) or {}).items():
+            version = entry.get("version") or ""
+            # Versions are recorded as exact pins, packages installed from git or paths have none
+            if version.startswith("==") and _is_registry_version(version[2:]):
+                packages.append(LockedPackage(name, version[2:], _get_digests(entry.get("hashes") or [])))
+    return packages
+
+
+def is_hash_pinned(contents: str) -> bool:
+    """
+    Returns whether a requirements file pins hashes, in which case pip installs exactly the versions it pins
+    """
+    return REQUIREMENT_HASH_REGEX.search(contents) is not None
+
+
+def parse_hash_pinned_requirements(contents: str) -> list[LockedPackage]:
+    """
+    Parses a requirements file pinning the version and the hashes of each requirement, e.g. generated by
+    "pip-compile --generate-hashes". Requirements which are not pinned to a version are ignored.
+    """
+    packages = []
+    # Hashes are usually listed on continuation lines
+    for line in contents.replace("\\\n", " ").splitlines():
+        line = line.split(" #", 1)[0].strip()
+        if len(line) == 0 or line.startswith(("#", "-")):
+            continue
+        match = REQUIREMENT_PIN_REGEX.match(line)
+        if match is None or not _is_registry_version(match.group(2)):
+            log.debug(f"Ignoring requirement not pinned to a version: {line}")
+            continue
+        packages.append(LockedPackage(match.group(1), match.group(2),
+                                      _get_digests(REQUIREMENT_HASH_REGEX.findall(line))))
+    return packages
+
+
+LockfileParser = Callable[[str], list[LockedPackage]]
+
+NPM_LOCKFILE_PARSERS: dict[str, LockfileParser] = {
+    "package-lock.json": parse_package_lock,
+    "npm-shrinkwrap.json": parse_package_lock,
+    "yarn.lock": parse_yarn_lock,
+}
+
+PYPI_LOCKFILE_PARSERS: dict[str, LockfileParser] = {
+    "poetry.lock": parse_poetry_lock,
+    "Pipfile.lock": parse_pipfile_lock,
+}
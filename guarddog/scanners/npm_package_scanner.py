@@ -1,7 +1,6 @@
 import logging
 import os
 import pathlib
-import typing
 from urllib.parse import urlparse
 
 import requests
@@ -9,6 +8,7 @@ import requests
 from guarddog.analyzer.analyzer import Analyzer
 from guarddog.ecosystems import ECOSYSTEM
 from guarddog.scanners.scanner import PackageScanner
+from guarddog.utils.packument import PACKUMENT_CHUNK_SIZE, read_packument
 
 log = logging.getLogger("guarddog")
 
@@ -17,7 +17,7 @@ class NPMPackageScanner(PackageScanner):
     def __init__(self) -> None:
         super().__init__(Analyzer(ECOSYSTEM.NPM))
 
-    def download_and_get_package_info(self, directory: str, package_name: str, version=None) -> typing.Tuple[dict, str]:
+    def get_package_info(self, package_name: str, version=None) -> dict:
         git_target = None
         if urlparse(package_name).hostname is not None and package_name.endswith('.git'):
             git_target = package_name
@@ -30,13 +30,17 @@ class NPMPackageScanner(PackageScanner):
 
         url = f"https://registry.npmjs.org/{package_name}"
         log.debug(f"Downloading NPM package from {url}")
-        response = requests.get(url)
-
-        if response.status_code != 200:
-            raise Exception("Received status code: " + str(response.status_code) + " from npm")
-        data = response.json()
+        # Packuments list the manifest of every version, only the fields used are decoded while it is downloaded
+        with requests.get(url, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception("Received status code: " + str(response.status_code) + " from npm")
+            data = read_packument(response.iter_content(chunk_size=PACKUMENT_CHUNK_SIZE), version)
         if "name" not in data:
             raise Exception(f"Error retrieving package: {package_name}")
+        return data
+
+    def download_package(self, package_name: str, directory: str, version=None, package_info=None) -> str:
+        data = package_info if package_info is not None else self.get_package_info(package_name, version)
         # if version is none, we only scan the last package
         # TODO: figure logs and log it when we do that
         version = data["dist-tags"]["latest"] if version is None else version
@@ -49,4 +53,4 @@ class NPMPackageScanner(PackageScanner):
         unzippedpath = zippath.removesuffix(file_extension)
         self.download_compressed(tarball_url, zippath, unzippedpath)
 
-        return data, unzippedpath
+        return unzippedpath
@@ -1,11 +1,14 @@
 import json
 import logging
+import typing
 
 import requests
 from semantic_version import NpmSpec, Version  # type:ignore
 
+from guarddog.scanners.lockfiles import NPM_LOCKFILE_PARSERS, LockedPackage
 from guarddog.scanners.npm_package_scanner import NPMPackageScanner
 from guarddog.scanners.scanner import ProjectScanner
+from guarddog.utils.packument import PACKUMENT_CHUNK_SIZE, read_packument_versions
 
 log = logging.getLogger("guarddog")
 
@@ -13,13 +16,11 @@ log = logging.getLogger("guarddog")
 def find_all_versions(package_name: str, semver_range: str) -> set[str]:
     url = f"https://registry.npmjs.org/{package_name}"
     log.debug(f"Retrieving npm package metadata from {url}")
-    response = requests.get(url)
-    if response.status_code != 200:
-        log.debug(f"No version available, status code {response.status_code}")
-        return set()
-
-    data = response.json()
-    versions = list(data["versions"].keys())
+    with requests.get(url, stream=True) as response:
+        if response.status_code != 200:
+            log.debug(f"No version available, status code {response.status_code}")
+            return set()
+        versions = read_packument_versions(response.iter_content(chunk_size=PACKUMENT_CHUNK_SIZE))
     log.debug(f"Retrieved versions {', '.join(versions)}")
     result = set()
     try:
@@ -35,7 +36,8 @@ def find_all_versions(package_name: str, semver_range: str) -> set[str]:
 
 class NPMRequirementsScanner(ProjectScanner):
     """
-    Scans all packages in the package.json file of a project
+    Scans all packages in the package.json file of a project, or the exact versions installed by its
+    package-lock.json, npm-shrinkwrap.json or yarn.lock file
 
     Attributes:
         package_scanner (PackageScanner): Scanner for individual packages
@@ -63,3 +65,7 @@ class NPMRequirementsScanner(ProjectScanner):
             if len(versions) > 0:
                 results[package] = versions
         return results
+
+    def parse_lockfile(self, contents: str, file_name: str) -> typing.Optional[list[LockedPackage]]:
+        parser = NPM_LOCKFILE_PARSERS.get(file_name)
+        return parser(contents) if parser is not None else None
@@ -1,5 +1,4 @@
 import os
-import typing
 
 from guarddog.analyzer.analyzer import Analyzer
 from guarddog.ecosystems import ECOSYSTEM
@@ -11,17 +10,17 @@ class PypiPackageScanner(PackageScanner):
     def __init__(self) -> None:
         super().__init__(Analyzer(ECOSYSTEM.PYPI))
 
-    def download_and_get_package_info(self, directory: str, package_name: str, version=None) -> typing.Tuple[dict, str]:
-        extract_dir = self.download_package(package_name, directory, version)
-        return get_package_info(package_name), extract_dir
+    def get_package_info(self, package_name: str, version=None) -> dict:
+        return get_package_info(package_name)
 
-    def download_package(self, package_name, directory, version=None) -> str:
+    def download_package(self, package_name, directory, version=None, package_info=None) -> str:
         """Downloads the PyPI distribution for a given package and version
 
         Args:
             package_name (str): name of the package
             directory (str): directory to download package to
             version (str): version of the package
+            package_info (dict, optional): metadata of the package from the PyPI JSON API. Defaults to fetching it
 
         Raises:
             Exception: "Received status code: " + <not 200> + " from PyPI"
@@ -32,7 +31,7 @@ class PypiPackageScanner(PackageScanner):
             Path where the package was extracted
         """
 
-        data = get_package_info(package_name)
+        data = package_info if package_info is not None else get_package_info(package_name)
         releases = data["releases"]
 
         if version is None:
@@ -1,10 +1,17 @@
 import logging
 import re
 import sys
+import typing
 
 import pkg_resources
 import requests
 
+from guarddog.scanners.lockfiles import (
+    PYPI_LOCKFILE_PARSERS,
+    LockedPackage,
+    is_hash_pinned,
+    parse_hash_pinned_requirements,
+)
 from guarddog.scanners.pypi_package_scanner import PypiPackageScanner
 from guarddog.scanners.scanner import ProjectScanner
 
@@ -13,7 +20,8 @@ log = logging.getLogger("guarddog")
 
 class PypiRequirementsScanner(ProjectScanner):
     """
-    Scans all packages in the requirements.txt file of a project
+    Scans all packages in the requirements.txt file of a project, or the exact versions installed by its poetry.lock
+    or Pipfile.lock file, or by a requirements file pinning hashes
 
     Attributes:
         package_scanner (PackageScanner): Scanner for individual packages
@@ -47,6 +55,15 @@ class PypiRequirementsScanner(ProjectScanner):
 
         return sanitized_lines
 
+    def parse_lockfile(self, contents: str, file_name: str) -> typing.Optional[list[LockedPackage]]:
+        parser = PYPI_LOCKFILE_PARSERS.get(file_name)
+        if parser is not None:
+            return parser(contents)
+        # pip only installs requirements pinned to a version when hashes are pinned
+        if is_hash_pinned(contents):
+            return parse_hash_pinned_requirements(contents)
+        return None
+
     # FIXME: type return value properly to dict[str, set[str]]
     def parse_requirements(self, raw_requirements: str) -> dict:
         """
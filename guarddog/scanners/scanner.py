@@ -1,20 +1,40 @@
+import asyncio
 import concurrent.futures
+import copy
 import json
 import logging
-import multiprocessing
 import os
 import sys
 import tempfile
+import threading
+import time
 import typing
 from abc import abstractmethod
 from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 
 import requests
 
+from guarddog.scanners.lockfiles import LockedPackage
 from guarddog.utils.archives import safe_extract
+from guarddog.utils.package_metadata import PackageMetadata, get_package_metadata
+from guarddog.utils.parallelism import get_parallelism
+from guarddog.utils.result_cache import (
+    CachedScanResult,
+    ScanResultCache,
+    ScanResultKey,
+    get_result_cache,
+    get_scan_result_key,
+)
 
 log = logging.getLogger("guarddog")
 
+# Package archives are downloaded in chunks of this many bytes, between which a download can be cancelled
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Set by download_and_get_package_info_async, cancelling the asynchronous task sets the event which aborts downloads
+_download_cancelled: ContextVar[typing.Optional[threading.Event]] = ContextVar("download_cancelled", default=None)
+
 
 def noop(arg: typing.Any) -> None:
     pass
@@ -28,12 +48,36 @@ class Scanner:
     def scan_local(self, path, rules=None, callback: typing.Callable[[dict], None] = noop):
         pass
 
+    @abstractmethod
+    def enable_profiling(self) -> None:
+        """
+        Reports the time spent running each rule and analyzing each file in a "timings" section of the results
+        """
+        pass
+
+    @abstractmethod
+    def enable_result_cache(self, result_cache: typing.Optional[ScanResultCache] = None) -> None:
+        """
+        Reuses the results of previous scans of the same package artifacts with the same rules, instead of
+        downloading and analyzing packages again
+
+        Args:
+            result_cache (ScanResultCache, optional): cache of the results. Defaults to the one of the user cache
+        """
+        pass
+
 
 class ProjectScanner(Scanner):
     def __init__(self, package_scanner):
         super().__init__()
         self.package_scanner = package_scanner
 
+    def enable_profiling(self) -> None:
+        self.package_scanner.enable_profiling()
+
+    def enable_result_cache(self, result_cache: typing.Optional[ScanResultCache] = None) -> None:
+        self.package_scanner.enable_result_cache(result_cache)
+
     def _authenticate_by_access_token(self) -> tuple[str, str]:
         """
         Gives Github authentication through access token
@@ -53,15 +97,18 @@ class ProjectScanner(Scanner):
             exit(1)
         return (user, personal_access_token)
 
-    def scan_requirements(self, requirements: str, rules=None, callback: typing.Callable[[dict], None] = noop) -> dict:
+    def scan_requirements(self, requirements: str, rules=None, callback: typing.Callable[[dict], None] = noop,
+                          file_name: typing.Optional[str] = None) -> dict:
         """
         Reads the requirements.txt file and scans each possible
-        dependency and version
+        dependency and version. Lockfiles are scanned for the exact version
+        they install of each dependency.
 
         Args:
             requirements (str): contents of requirements.txt file
             rules: list of rules to apply
             callback: callback to call for each result
+            file_name (str, optional): name of the file, which tells lockfiles apart
 
         Returns:
             dict: mapping of dependencies to scan results
@@ -79,20 +126,30 @@ class ProjectScanner(Scanner):
             }
         """
 
+        locked_digests = {}  # type: dict[tuple[str, str], tuple[str, ...]]
+
         def scan_single_dependency(dependency, version):
             log.debug(f"Scanning {dependency} version {version}")
-            result = self.package_scanner.scan_remote(dependency, version, rules)
+            result = self.package_scanner.scan_remote(dependency, version, rules,
+                                                      digests=locked_digests.get((dependency, version)) or None)
             return {
                 'dependency': dependency,
                 'version': version,
                 'result': result
             }
 
-        dependencies = self.parse_requirements(requirements)
+        locked_packages = self.parse_lockfile(requirements, os.path.basename(file_name)) \
+            if file_name is not None else None
+        if locked_packages is not None:
+            # The lockfile records the exact version installed of each dependency, and the digests of its artifacts
+            dependencies = {}  # type: dict[str, set[str]]
+            for package in locked_packages:
+                dependencies.setdefault(package.name, set()).add(package.version)
+                locked_digests[(package.name, package.version)] = package.digests
+        else:
+            dependencies = self.parse_requirements(requirements)
 
-        num_workers = multiprocessing.cpu_count()
-        if os.environ.get("GUARDDOG_PARALLELISM") is not None:
-            num_workers = int(os.environ["GUARDDOG_PARALLELISIM"])
+        num_workers = get_parallelism()
 
         sys.stderr.write(f"Scanning using at most {num_workers} parallel worker threads\n")
         sys.stderr.flush()
@@ -155,7 +212,7 @@ class ProjectScanner(Scanner):
         resp = requests.get(url=req_url, auth=token)
 
         if resp.status_code == 200:
-            return self.scan_requirements(resp.content.decode())
+            return self.scan_requirements(resp.content.decode(), file_name=requirements_name)
         else:
             sys.stdout.write(f"{req_url} does not exist. Check your link or branch name.")
             sys.exit(255)
@@ -187,7 +244,7 @@ class ProjectScanner(Scanner):
 
         try:
             with open(path, "r") as f:
-                return self.scan_requirements(f.read(), rules, callback)
+                return self.scan_requirements(f.read(), rules, callback, path)
         except Exception as e:
             sys.stdout.write(f"Received {e}")
             sys.exit(255)
@@ -196,6 +253,19 @@ class ProjectScanner(Scanner):
     def parse_requirements(self, param: str) -> dict[str, set[str]]:  # returns { package: version }
         pass
 
+    def parse_lockfile(self, contents: str, file_name: str) -> typing.Optional[list[LockedPackage]]:
+        """
+        Parses a lockfile of the project
+
+        Args:
+            contents (str): contents of the file
+            file_name (str): name of the file
+
+        Returns:
+            list[LockedPackage]: package versions installed by the lockfile, or None if the file is not a lockfile
+        """
+        return None
+
 
 class PackageScanner(Scanner):
     """
@@ -203,11 +273,19 @@ class PackageScanner(Scanner):
 
     Attributes:
         analyzer (Analyzer): Analyzer for source code and metadata rules
+        result_cache (ScanResultCache): cache of the results of remote scans, or None to always analyze packages
     """
 
     def __init__(self, analyzer):
         super().__init__()
         self.analyzer = analyzer
+        self.result_cache = None  # type: typing.Optional[ScanResultCache]
+
+    def enable_profiling(self) -> None:
+        self.analyzer.profile = True
+
+    def enable_result_cache(self, result_cache: typing.Optional[ScanResultCache] = None) -> None:
+        self.result_cache = result_cache if result_cache is not None else get_result_cache()
 
     def scan_local(self, path, rules=None, callback: typing.Callable[[dict], None] = noop) -> dict:
         """
@@ -240,30 +318,239 @@ class PackageScanner(Scanner):
                 raise Exception(f"Path {path} is not a directory nor an archive type supported by GuardDog.")
         raise Exception(f"Path {path} does not exist.")
 
-    @abstractmethod
+    def get_package_info(self, package_name: str, version=None) -> dict:
+        """
+        Fetches the registry document of a package, without downloading the package
+
+        Args:
+            package_name (str): name of the package
+            version (str, optional): version of the package. Defaults to the latest version
+        """
+        raise NotImplementedError('get_package_info is not implemented')
+
+    def download_package(self, package_name: str, directory: str, version=None, package_info=None) -> str:
+        """
+        Downloads and extracts a package
+
+        Args:
+            package_name (str): name of the package
+            directory (str): directory to download package to
+            version (str, optional): version of the package. Defaults to the latest version
+            package_info (dict, optional): registry document of the package. Defaults to fetching it
+
+        Returns:
+            Path where the package was extracted
+        """
+        raise NotImplementedError('download_package is not implemented')
+
     def download_and_get_package_info(self, directory: str, package_name: str, version=None) -> typing.Tuple[dict, str]:
-        raise NotImplementedError('download_and_get_package_info is not implemented')
+        package_info = self.get_package_info(package_name, version)
+        return package_info, self.download_package(package_name, directory, version, package_info)
+
+    def _get_result_cache(self, write_package_info: bool) -> typing.Optional[ScanResultCache]:
+        # Timings and registry documents are only reported by actual analyses
+        if write_package_info or self.analyzer.profile:
+            return None
+        return self.result_cache
+
+    def _get_result_key(self, name: str, version: typing.Optional[str], rules,
+                        digests: typing.Iterable[str]) -> typing.Optional[ScanResultKey]:
+        if version is None:
+            return None
+        return get_scan_result_key(self.analyzer.ecosystem.value, name, version, digests,
+                                   self.analyzer.get_ruleset_fingerprint(rules),
+                                   self.analyzer.get_detector_versions(rules))
+
+    def _get_locked_results(self, result_cache: typing.Optional[ScanResultCache], name: str, version, rules,
+                            digests) -> tuple[typing.Optional[ScanResultKey], typing.Optional[CachedScanResult]]:
+        """
+        Looks up the results of a package version from the digests recorded in a lockfile, which identify its
+        artifacts without fetching the registry document
+        """
+        if result_cache is None or digests is None:
+            return None, None
+        key = self._get_result_key(name, version, rules, digests)
+        return key, result_cache.get(key) if key is not None else None
+
+    @staticmethod
+    def _check_locked_digests(name: str, version, metadata: PackageMetadata,
+                              digests: typing.Iterable[str]) -> typing.Optional[str]:
+        """
+        Checks that an artifact of a package version published on the registry matches the digests of a lockfile,
+        returning an error otherwise. Digests of algorithms the registry does not publish cannot be checked.
+        """
+        published_digests = set(metadata.digests.values())
+        algorithms = {digest.split("-", 1)[0] for digest in published_digests}
+        locked_digests = {digest for digest in digests if digest.split("-", 1)[0] in algorithms}
+        if len(locked_digests) > 0 and published_digests.isdisjoint(locked_digests):
+            return f"no artifact of {name} version {version} published on the registry matches the lockfile digests"
+        return None
+
+    def _get_expired_rules(self, cached: CachedScanResult, rules) -> set[str]:
+        """
+        Returns the time-sensitive metadata rules whose cached results are older than their TTL
+        """
+        now = time.time()
+        return {
+            rule for rule, ttl in self.analyzer.get_detector_ttls(rules).items()
+            if now - cached.detector_times.get(rule, 0) >= ttl
+        }
+
+    def _refresh_cached_results(self, key: ScanResultKey, cached: CachedScanResult, expired_rules: set[str],
+                                metadata_results: dict, analyzed_at: float) -> dict:
+        """
+        Replaces the cached results of the metadata rules run again, storing the refreshed results unless a rule failed
+        """
+        results = copy.deepcopy(cached.results)
+        detector_times = dict(cached.detector_times)
+        for rule in expired_rules:
+            if rule in results["results"]:
+                results["issues"] -= 1
+            results["results"].pop(rule, None)
+            results["errors"].pop(rule, None)
+            detector_times[rule] = analyzed_at
+        results["results"].update(metadata_results["results"])
+        results["errors"].update(metadata_results["errors"])
+        results["issues"] += metadata_results["issues"]
+
+        if len(metadata_results["errors"]) == 0:
+            self.result_cache.store(key, results, detector_times)  # type: ignore
+        return results
+
+    def _store_results(self, key: ScanResultKey, results: dict, rules, analyzed_at: float) -> None:
+        # Failures, e.g. timeouts or unreachable repositories, are not cached
+        if len(results["errors"]) > 0:
+            return
+        detector_times = {rule: analyzed_at for rule in self.analyzer.get_detector_ttls(rules)}
+        self.result_cache.store(key, results | {"path": None}, detector_times)  # type: ignore
+
+    def _scan_remote(self, name, base_dir, version=None, rules=None, write_package_info=False, digests=None):
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), base_dir)
+        result_cache = self._get_result_cache(write_package_info)
 
-    def _scan_remote(self, name, base_dir, version=None, rules=None, write_package_info=False):
+        key, cached = self._get_locked_results(result_cache, name, version, rules, digests)
+        if cached is not None and len(self._get_expired_rules(cached, rules)) == 0:
+            log.debug(f"Reusing the cached results of {name} {version}")
+            return copy.deepcopy(cached.results)
+
+        file_path = None
+        package_info = None
+        try:
+            if result_cache is None:
+                package_info, file_path = self.download_and_get_package_info(directory, name, version)
+            else:
+                # The registry document gives the digests of the artifacts, results are looked up before downloading
+                package_info = self.get_package_info(name, version)
+        except Exception as e:
+            log.debug("Unable to download package, ignoring: " + str(e))
+            return {'issues': 0, 'errors': {'download-package': str(e)}}
+
+        metadata = get_package_metadata(self.analyzer.ecosystem, package_info, version)
+        if digests is not None:
+            error = self._check_locked_digests(name, version, metadata, digests)
+            if error is not None:
+                return {'issues': 0, 'errors': {'lockfile-digest': error}}
+        if result_cache is not None:
+            if key is None:
+                key = self._get_result_key(name, version if version is not None else metadata.version, rules,
+                                           metadata.digests.values())
+                cached = result_cache.get(key) if key is not None else None
+            if cached is not None:
+                log.debug(f"Reusing the cached results of {name} {key.version}")
+                expired_rules = self._get_expired_rules(cached, rules)
+                analyzed_at = time.time()
+                metadata_results = {"results": {}, "errors": {}, "issues": 0}
+                if len(expired_rules) > 0:
+                    # Time-sensitive detectors only read the metadata, they run again without downloading the package
+                    metadata_results = self.analyzer.analyze_metadata(None, metadata, expired_rules, name, version)
+                return self._refresh_cached_results(key, cached, expired_rules, metadata_results, analyzed_at)
+            try:
+                file_path = self.download_package(name, directory, version, package_info)
+            except Exception as e:
+                log.debug("Unable to download package, ignoring: " + str(e))
+                return {'issues': 0, 'errors': {'download-package': str(e)}}
+
+        if not write_package_info:
+            # Detectors only read the normalized metadata, the registry document is released before the analysis
+            package_info = None
+
+        analyzed_at = time.time()
+        results = self.analyzer.analyze(file_path, metadata, rules, name, version)
+        if write_package_info:
+            self._write_package_info(results["path"], package_info, name, version)
+        if key is not None:
+            self._store_results(key, results, rules, analyzed_at)
+
+        return results
+
+    async def _scan_remote_async(self, name, base_dir, version=None, rules=None, write_package_info=False,
+                                 digests=None):
         directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), base_dir)
+        result_cache = self._get_result_cache(write_package_info)
+
+        key, cached = await asyncio.to_thread(self._get_locked_results, result_cache, name, version, rules, digests)
+        if cached is not None and len(self._get_expired_rules(cached, rules)) == 0:
+            log.debug(f"Reusing the cached results of {name} {version}")
+            return copy.deepcopy(cached.results)
 
         file_path = None
         package_info = None
         try:
-            package_info, file_path = self.download_and_get_package_info(directory, name, version)
+            if result_cache is None:
+                package_info, file_path = await self.download_and_get_package_info_async(directory, name, version)
+            else:
+                package_info = await asyncio.to_thread(self.get_package_info, name, version)
         except Exception as e:
             log.debug("Unable to download package, ignoring: " + str(e))
             return {'issues': 0, 'errors': {'download-package': str(e)}}
 
-        results = self.analyzer.analyze(file_path, package_info, rules, name, version)
+        metadata = get_package_metadata(self.analyzer.ecosystem, package_info, version)
+        if digests is not None:
+            error = self._check_locked_digests(name, version, metadata, digests)
+            if error is not None:
+                return {'issues': 0, 'errors': {'lockfile-digest': error}}
+        if result_cache is not None:
+            if key is None:
+                key = self._get_result_key(name, version if version is not None else metadata.version, rules,
+                                           metadata.digests.values())
+                cached = await asyncio.to_thread(result_cache.get, key) if key is not None else None
+            if cached is not None:
+                log.debug(f"Reusing the cached results of {name} {key.version}")
+                expired_rules = self._get_expired_rules(cached, rules)
+                analyzed_at = time.time()
+                metadata_results = {"results": {}, "errors": {}, "issues": 0}
+                if len(expired_rules) > 0:
+                    metadata_results = await self.analyzer.analyze_metadata_async(None, metadata, expired_rules, name,
+                                                                                  version)
+                return await asyncio.to_thread(self._refresh_cached_results, key, cached, expired_rules,
+                                               metadata_results, analyzed_at)
+            try:
+                file_path = await self._run_download_async(self.download_package, name, directory, version,
+                                                           package_info)
+            except Exception as e:
+                log.debug("Unable to download package, ignoring: " + str(e))
+                return {'issues': 0, 'errors': {'download-package': str(e)}}
+
+        if not write_package_info:
+            # Detectors only read the normalized metadata, the registry document is released before the analysis
+            package_info = None
+
+        analyzed_at = time.time()
+        results = await self.analyzer.analyze_async(file_path, metadata, rules, name, version)
         if write_package_info:
-            suffix = f"{name}-{version}" if version is not None else name
-            with open(os.path.join(results["path"], f'package_info-{suffix}.json'), "w") as file:
-                file.write(json.dumps(package_info))
+            self._write_package_info(results["path"], package_info, name, version)
+        if key is not None:
+            await asyncio.to_thread(self._store_results, key, results, rules, analyzed_at)
 
         return results
 
-    def scan_remote(self, name, version=None, rules=None, base_dir=None, write_package_info=False):
+    @staticmethod
+    def _write_package_info(path: str, package_info, name, version=None) -> None:
+        suffix = f"{name}-{version}" if version is not None else name
+        with open(os.path.join(path, f'package_info-{suffix}.json'), "w") as file:
+            file.write(json.dumps(package_info))
+
+    def scan_remote(self, name, version=None, rules=None, base_dir=None, write_package_info=False, digests=None):
         """
         Scans a remote package
 
@@ -276,6 +563,40 @@ class PackageScanner(Scanner):
             scan.
             * `write_package_info` (bool, default False): if set to true, the result of the PyPI metadata API is written
              to a json file
+            * `digests` (Iterable, optional): digests of the artifacts of the version recorded in a lockfile, see
+            normalize_digest. The package is only scanned if one of its published artifacts matches them, and its
+            cached results are looked up by them
+
+        Raises:
+            Exception: Analyzer exception
+
+        Returns:
+            dict: Analyzer output with rules to results mapping
+        """
+        if (base_dir is not None):
+            return self._scan_remote(name, base_dir, version, rules, write_package_info, digests)
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            # Directory to download compressed and uncompressed package
+            return self._scan_remote(name, tmpdirname, version, rules, write_package_info, digests)
+
+    async def scan_remote_async(self, name, version=None, rules=None, base_dir=None, write_package_info=False,
+                                digests=None):
+        """
+        Asynchronous variant of scan_remote, for applications running an asyncio event loop. Cancelling the scan
+        aborts the download of the package and kills the Semgrep processes it started.
+
+        Args:
+            * `name` (str): name of the package on PyPI
+            * `version` (str, optional): version of package (ex. 0.0.1). If not specified, the latest version is assumed
+            * `rules` (set, optional): Set of rule names to use. Defaults to all rules.
+            * `base_dir` (str, optional): directory to use to download package to. If not specified, a temporary folder
+            is created and cleaned up automatically.
+            * `write_package_info` (bool, default False): if set to true, the result of the PyPI metadata API is written
+             to a json file
+            * `digests` (Iterable, optional): digests of the artifacts of the version recorded in a lockfile, see
+            normalize_digest. The package is only scanned if one of its published artifacts matches them, and its
+            cached results are looked up by them
 
         Raises:
             Exception: Analyzer exception
@@ -284,11 +605,39 @@ class PackageScanner(Scanner):
             dict: Analyzer output with rules to results mapping
         """
         if (base_dir is not None):
-            return self._scan_remote(name, base_dir, version, rules, write_package_info)
+            return await self._scan_remote_async(name, base_dir, version, rules, write_package_info, digests)
 
         with tempfile.TemporaryDirectory() as tmpdirname:
             # Directory to download compressed and uncompressed package
-            return self._scan_remote(name, tmpdirname, version, rules, write_package_info)
+            return await self._scan_remote_async(name, tmpdirname, version, rules, write_package_info, digests)
+
+    async def download_and_get_package_info_async(self, directory: str, package_name: str,
+                                                  version=None) -> typing.Tuple[dict, str]:
+        """
+        Asynchronous variant of download_and_get_package_info, which runs it in a thread. Cancelling it aborts the
+        download of the package archive at its next chunk.
+        """
+        return await self._run_download_async(self.download_and_get_package_info, directory, package_name, version)
+
+    async def _run_download_async(self, function: typing.Callable, *args):
+        """
+        Runs a download in a thread, cancelling it when the asynchronous task is cancelled
+        """
+        cancelled = threading.Event()
+        token = _download_cancelled.set(cancelled)
+        try:
+            # The thread runs in a copy of the current context, which holds the cancellation event
+            download = asyncio.ensure_future(asyncio.to_thread(function, *args))
+        finally:
+            _download_cancelled.reset(token)
+
+        try:
+            return await asyncio.shield(download)
+        except asyncio.CancelledError:
+            cancelled.set()
+            # Waits for the download to stop, so that its files are not removed while it is still writing them
+            await asyncio.wait([download])
+            raise
 
     def download_compressed(self, url, archive_path, target_path):
         """Downloads a compressed file and extracts it
@@ -300,10 +649,12 @@ class PackageScanner(Scanner):
         """
 
         log.debug(f"Downloading package archive from {url} into {target_path}")
-        response = requests.get(url, stream=True)
-
-        with open(archive_path, "wb") as f:
-            f.write(response.raw.read())
+        cancelled = _download_cancelled.get()
+        with requests.get(url, stream=True) as response, open(archive_path, "wb") as f:
+            while chunk := response.raw.read(DOWNLOAD_CHUNK_SIZE):
+                if cancelled is not None and cancelled.is_set():
+                    raise Exception(f"Download of {url} was cancelled")
+                f.write(chunk)
 
         try:
             safe_extract(archive_path, target_path)
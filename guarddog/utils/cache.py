@@ -0,0 +1,30 @@
+import os
+
+import platformdirs
+
+
+def get_cache_path(*subdirectories: str) -> str:
+    """
+    Returns the path of a directory of the user cache of GuardDog, which may not exist. The cache is located in the
+    platform user cache directory, unless the GUARDDOG_CACHE_DIR environment variable points somewhere else.
+
+    Args:
+        subdirectories (str): path of the directory within the cache
+    """
+    cache_dir = os.environ.get("GUARDDOG_CACHE_DIR") or platformdirs.user_cache_dir("guarddog")
+    return os.path.join(cache_dir, *subdirectories)
+
+
+def get_cache_dir(*subdirectories: str) -> str:
+    """
+    Returns a directory of the user cache of GuardDog, creating it if needed
+
+    Args:
+        subdirectories (str): path of the directory within the cache
+
+    Raises:
+        OSError: the directory cannot be created, e.g. on a read-only file system
+    """
+    path = get_cache_path(*subdirectories)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,265 @@
+""" Git mirrors
+
+Keeps bare mirrors of source repositories in the user cache, so that scanning several packages or versions of the
+same project clones it once and then only fetches new commits and tags. Mirrors are locked while they are updated
+or read, also across processes, and the least recently used ones are evicted when they grow too large.
+
+Callers which only need a few refs list the refs of the remote first, which costs a single small request, and then
+fetch only these refs, shallowly if the transport allows it.
+"""
+import contextlib
+import hashlib
+import inspect
+import logging
+import os
+import shutil
+import threading
+from typing import Iterator, Optional
+
+import pygit2  # type: ignore
+
+from guarddog.utils.cache import get_cache_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows, mirrors are only locked within the process
+    fcntl = None  # type: ignore
+
+log = logging.getLogger("guarddog")
+
+# Total size in bytes of the mirrors above which the least recently used ones are evicted
+GIT_MIRRORS_MAX_SIZE = 5 * 1024 * 1024 * 1024
+
+# Only branches and tags are mirrored, GitHub repositories also have a ref for each pull request
+MIRROR_REFSPECS = ["+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+
+LOCK_FILE_SUFFIX = ".lock"
+
+# Empty repository used to list the refs of remotes which are not mirrored yet, it doesn't end with .git so that it is
+# never evicted
+REMOTE_REFS_REPOSITORY = "remote-refs"
+
+
+def _normalize_url(url: str) -> str:
+    return url.strip().rstrip("/").removesuffix(".git").lower()
+
+
+def _get_directory_size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            try:
+                size += os.lstat(os.path.join(root, file_name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def _fetch(remote: pygit2.Remote, refspecs: Optional[list[str]], depth: int) -> None:
+    """
+    Fetches refspecs from a remote, or its configured refspecs if None. Falls back to a full fetch when shallow
+    fetches are not supported, by older versions of pygit2 or by the transport (e.g. local repositories).
+    """
+    if depth > 0 and "depth" in inspect.signature(remote.fetch).parameters:
+        try:
+            remote.fetch(refspecs, depth=depth)
+            return
+        except pygit2.GitError as e:
+            if "shallow" not in str(e).lower():
+                raise
+            log.debug(f"Shallow fetches are not supported for {remote.url}, fetching full history: {str(e)}")
+    remote.fetch(refspecs)
+
+
+class GitMirrors:
+    """
+    Bare mirrors of git repositories, keyed by repository URL
+
+    Attributes:
+        root (str): directory of the mirrors
+        max_size (int): total size in bytes of the mirrors above which the least recently used ones are evicted
+    """
+
+    def __init__(self, root: str, max_size: int = GIT_MIRRORS_MAX_SIZE) -> None:
+        self.root = root
+        self.max_size = max_size
+        self._locks = {}  # type: dict[str, threading.Lock]
+        self._locks_lock = threading.Lock()
+
+    def get_mirror_path(self, url: str) -> str:
+        name = hashlib.sha256(_normalize_url(url).encode()).hexdigest()[:32]
+        return os.path.join(self.root, f"{name}.git")
+
+    @contextlib.contextmanager
+    def _lock(self, mirror_path: str, blocking: bool = True) -> Iterator[bool]:
+        """
+        Locks a mirror against other threads and processes, yields whether the lock was acquired
+        """
+        with self._locks_lock:
+            thread_lock = self._locks.setdefault(mirror_path, threading.Lock())
+        if not thread_lock.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            with open(mirror_path + LOCK_FILE_SUFFIX, "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            thread_lock.release()
+
+    def list_remote_refs(self, url: str) -> dict[str, str]:
+        """
+        Lists the refs of a repository without fetching any object, like git ls-remote
+
+        Args:
+            url (str): URL of the repository
+
+        Returns:
+            dict[str, str]: object id advertised by the remote for each of its refs. Annotated tags are also listed
+                peeled, with a ^{} suffix
+        """
+        repository_path = os.path.join(self.root, REMOTE_REFS_REPOSITORY)
+        with self._locks_lock:
+            if not os.path.exists(os.path.join(repository_path, "HEAD")):
+                os.makedirs(self.root, exist_ok=True)
+                pygit2.init_repository(repository_path, bare=True)
+        remote = pygit2.Repository(repository_path).remotes.create_anonymous(url)
+        log.debug(f"Listing the refs of {url}")
+        if hasattr(remote, "list_heads"):
+            return {head.name: str(head.oid) for head in remote.list_heads() if head.name is not None}
+        # pygit2 < 1.15
+        return {head["name"]: str(head["oid"]) for head in remote.ls_remotes()}  # type: ignore[attr-defined]
+
+    def _update(self, url: str, mirror_path: str, refs: Optional[dict[str, str]] = None,
+                depth: int = 0) -> pygit2.Repository:
+        """
+        Fetches the new commits and tags of a mirror, or only the given refs, cloning it first if needed. Must be
+        called with the lock held
+        """
+        if os.path.exists(os.path.join(mirror_path, "HEAD")):
+            repo = pygit2.Repository(mirror_path)
+        else:
+            shutil.rmtree(mirror_path, ignore_errors=True)  # leftovers of an interrupted clone
+            log.debug(f"Creating the mirror of {url} in {mirror_path}")
+            repo = pygit2.init_repository(mirror_path, bare=True)
+            repo.remotes.create("origin", url, MIRROR_REFSPECS[0])
+            for refspec in MIRROR_REFSPECS[1:]:
+                repo.remotes.add_fetch("origin", refspec)
+            # Tags are mirrored by the refspecs, they must not be fetched automatically along with other refs
+            repo.config["remote.origin.tagopt"] = "--no-tags"
+            repo = pygit2.Repository(mirror_path)
+
+        refspecs = None  # type: Optional[list[str]]
+        if refs is not None:
+            missing_refs = []
+            for ref, oid in refs.items():
+                reference = repo.references.get(ref)
+                if reference is None or str(reference.target) != oid:
+                    missing_refs.append(ref)
+            if len(missing_refs) == 0:
+                log.debug(f"The mirror {mirror_path} of {url} already has {', '.join(refs)}")
+                return repo
+            refspecs = [f"+{ref}:{ref}" for ref in missing_refs]
+
+        log.debug(f"Fetching {url} into its mirror {mirror_path}")
+        try:
+            _fetch(repo.remotes["origin"], refspecs, depth)
+        except Exception:
+            if len(list(repo.references)) == 0:
+                # Nothing was ever fetched, the mirror is useless
+                shutil.rmtree(mirror_path, ignore_errors=True)
+            raise
+        return repo
+
+    @contextlib.contextmanager
+    def open(self, url: str, refs: Optional[dict[str, str]] = None,
+             depth: int = 0) -> Iterator[pygit2.Repository]:
+        """
+        Updates the mirror of a repository and locks it while it is used
+
+        Args:
+            url (str): URL of the repository
+            refs (dict[str, str], optional): refs to fetch, with the object ids the remote advertises for them (see
+                list_remote_refs). Refs the mirror already has are not fetched again. All branches and tags are
+                fetched by default
+            depth (int): number of commits of history to fetch, 0 for the full history
+
+        Returns:
+            pygit2.Repository: bare mirror of the repository, up to date with the remote
+        """
+        os.makedirs(self.root, exist_ok=True)
+        mirror_path = self.get_mirror_path(url)
+        with self._lock(mirror_path):
+            repo = self._update(url, mirror_path, refs, depth)
+            # The modification time of the lock file tracks when the mirror was last used
+            with open(mirror_path + LOCK_FILE_SUFFIX, "a"):
+                os.utime(mirror_path + LOCK_FILE_SUFFIX)
+            yield repo
+        self.evict(keep=mirror_path)
+
+    def evict(self, keep: Optional[str] = None) -> list[str]:
+        """
+        Removes the least recently used mirrors until the mirrors fit in max_size. Mirrors in use are kept.
+
+        Args:
+            keep (str, optional): path of a mirror to keep
+
+        Returns:
+            list[str]: paths of the removed mirrors
+        """
+        mirrors = []  # type: list[tuple[float, str, int]]
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(".git") or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                last_used = os.path.getmtime(entry.path + LOCK_FILE_SUFFIX)
+            except OSError:
+                last_used = entry.stat().st_mtime
+            mirrors.append((last_used, entry.path, _get_directory_size(entry.path)))
+
+        total_size = sum(size for _, _, size in mirrors)
+        evicted = []
+        for _, mirror_path, size in sorted(mirrors):
+            if total_size <= self.max_size:
+                break
+            if mirror_path == keep:
+                continue
+            with self._lock(mirror_path, blocking=False) as locked:
+                if not locked:
+                    continue
+                log.debug(f"Evicting the git mirror {mirror_path} ({size} bytes)")
+                shutil.rmtree(mirror_path, ignore_errors=True)
+            total_size -= size
+            evicted.append(mirror_path)
+        return evicted
+
+
+_git_mirrors = None  # type: Optional[GitMirrors]
+_git_mirrors_lock = threading.Lock()
+
+
+def get_git_mirrors() -> GitMirrors:
+    """
+    Returns the git mirrors of the user cache. The GUARDDOG_GIT_MIRRORS_MAX_SIZE environment variable overrides their
+    maximum total size, in bytes.
+    """
+    global _git_mirrors
+    if _git_mirrors is None:
+        with _git_mirrors_lock:
+            if _git_mirrors is None:
+                max_size = os.environ.get("GUARDDOG_GIT_MIRRORS_MAX_SIZE")
+                _git_mirrors = GitMirrors(
+                    get_cache_dir("git"),
+                    int(max_size) if max_size is not None else GIT_MIRRORS_MAX_SIZE,
+                )
+    return _git_mirrors
@@ -0,0 +1,161 @@
+""" Streaming JSON reader
+
+Reads a JSON document incrementally from chunks of text or bytes, e.g. an HTTP response being downloaded, so that
+selected values can be decoded while all others are skipped without being materialized as Python objects. Memory
+stays proportional to the chunks and to the values read, rather than to the document.
+"""
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, Optional, Union
+
+# Characters skipping a value stops at: strings and nested containers are skipped by regex searches, not char by char
+_STRUCTURE_REGEX = re.compile(r'["{}\[\]]')
+_STRING_REGEX = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR_REGEX = re.compile(r'[^\s,\]}]*')
+_WHITESPACE_REGEX = re.compile(r'[ \t\n\r]*')
+
+
+class JsonStream:
+    """
+    Incremental reader of a JSON document. Objects are iterated key by key with iter_object, and the caller then either
+    decodes the value of each key with read_value, skips it with skip_value, or iterates it with iter_object.
+    """
+
+    def __init__(self, chunks: Iterable[Union[str, bytes]]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._mark = None  # type: Optional[int]
+        self._eof = False
+
+    def _fill(self, size: int = 1) -> bool:
+        """
+        Appends at least size characters to the buffer, discarding what was consumed. Returns False at the end of the
+        document
+        """
+        if self._eof:
+            return False
+        discarded = self._position if self._mark is None else self._mark
+        texts = [self._buffer[discarded:]]
+        self._position -= discarded
+        if self._mark is not None:
+            self._mark -= discarded
+
+        filled = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            texts.append(text)
+            filled += len(text)
+            if filled >= size:
+                break
+        else:
+            texts.append(self._decoder.decode(b"", final=True))
+            self._eof = True
+        self._buffer = "".join(texts)
+        return filled > 0
+
+    def _error(self, message: str) -> ValueError:
+        return ValueError(f"Invalid JSON document: {message}")
+
+    def _peek(self) -> Optional[str]:
+        """
+        Skips whitespace and returns the next character without consuming it, or None at the end of the document
+        """
+        while True:
+            self._position = _WHITESPACE_REGEX.match(self._buffer, self._position).end()  # type: ignore
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return None
+
+    def _expect(self, character: str) -> None:
+        if self._peek() != character:
+            raise self._error(f"expected {character!r} at offset {self._position}")
+        self._position += 1
+
+    def _skip_string(self) -> None:
+        while True:
+            match = _STRING_REGEX.match(self._buffer, self._position)
+            if match is not None:
+                self._position = match.end()
+                return
+            # The string continues in the next chunks: the remaining buffer is at least doubled so that long strings
+            # are not searched again for every chunk
+            if not self._fill(len(self._buffer) - self._position):
+                raise self._error("unterminated string")
+
+    def _skip_container(self) -> None:
+        depth = 0
+        while True:
+            match = _STRUCTURE_REGEX.search(self._buffer, self._position)
+            if match is None:
+                self._position = len(self._buffer)
+                if not self._fill():
+                    raise self._error("unterminated container")
+                continue
+            self._position = match.start()
+            character = match.group()
+            if character == '"':
+                self._skip_string()
+                continue
+            self._position += 1
+            depth += 1 if character in "{[" else -1
+            if depth == 0:
+                return
+
+    def _skip_scalar(self) -> None:
+        while True:
+            end = _SCALAR_REGEX.match(self._buffer, self._position).end()  # type: ignore
+            if end < len(self._buffer) or not self._fill():
+                self._position = end
+                return
+
+    def skip_value(self) -> None:
+        """
+        Skips the next value without decoding it
+        """
+        character = self._peek()
+        if character is None:
+            raise self._error("unexpected end of document")
+        if character == '"':
+            self._skip_string()
+        elif character in "{[":
+            self._skip_container()
+        else:
+            self._skip_scalar()
+
+    def read_value(self):
+        """
+        Decodes the next value
+        """
+        self._peek()
+        self._mark = self._position
+        try:
+            self.skip_value()
+            return json.loads(self._buffer[self._mark:self._position])
+        finally:
+            self._mark = None
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Iterates over the keys of the next value, which must be an object. The value of each key must be consumed
+        before the next key is requested.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._position += 1
+            return
+        while True:
+            if self._peek() != '"':
+                raise self._error(f"expected a key at offset {self._position}")
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            character = self._peek()
+            self._position += 1
+            if character == "}":
+                return
+            if character != ",":
+                raise self._error(f"expected ',' or '}}' at offset {self._position - 1}")
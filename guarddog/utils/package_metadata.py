@@ -0,0 +1,280 @@
+""" Package metadata
+
+Normalized metadata of a package, extracted from the registry document (PyPI JSON API, npm packument) right after
+it is fetched. The models only keep what detectors read, so that the raw document, e.g. the readme of every version
+of an npm package, can be released before the package is analyzed.
+"""
+import base64
+import re
+from datetime import datetime
+from typing import Any, Optional
+
+from dateutil import parser
+from packaging.version import InvalidVersion, Version
+
+from guarddog.ecosystems import ECOSYSTEM
+
+GITHUB_REPOSITORY_REGEX = re.compile(r'(?:https?://)?(?:www\.)?github\.com/(?:[\w-]+/)(?:[\w-]+)')
+
+DIGEST_ALGORITHMS = ("sha1", "sha256", "sha384", "sha512")
+
+# Algorithm of unprefixed hexadecimal digests, from their length
+HEX_DIGEST_ALGORITHMS = {40: "sha1", 64: "sha256", 96: "sha384", 128: "sha512"}
+
+
+def _parse_date(text: Optional[str]) -> Optional[datetime]:
+    if not text:
+        return None
+    try:
+        return parser.isoparse(text).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def normalize_digest(digest: str) -> Optional[str]:
+    """
+    Converts a digest to the Subresource Integrity form of npm ("sha512-<base64>"), so that digests published by
+    registries and recorded in lockfiles can be compared. Hexadecimal digests may be prefixed by their algorithm, like
+    in Python lockfiles ("sha256:<hex>"), and integrity strings listing several digests are reduced to the first one.
+
+    Returns:
+        str: normalized digest, or None if the digest or its algorithm is not supported
+    """
+    digest = digest.strip().split(" ", 1)[0]
+    algorithm, separator, value = digest.partition("-")
+    if separator and algorithm in DIGEST_ALGORITHMS:
+        return digest if value else None
+
+    algorithm, separator, value = digest.partition(":")
+    if not separator:
+        algorithm, value = HEX_DIGEST_ALGORITHMS.get(len(digest), ""), digest
+    if algorithm not in DIGEST_ALGORITHMS or not value:
+        return None
+    try:
+        return f"{algorithm}-{base64.b64encode(bytes.fromhex(value)).decode()}"
+    except ValueError:
+        return None
+
+
+def _iter_leaves(value: Any) -> Any:
+    """
+    Iterates over the leaves of nested dicts and lists
+    """
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_leaves(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_leaves(item)
+    else:
+        yield value
+
+
+def _ensure_scheme(url: str) -> str:
+    return url if re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*://", url) else f"https://{url}"
+
+
+class Release:
+    """
+    Release of a package
+
+    Attributes:
+        version (str): version of the release
+        upload_time (datetime): naive UTC time the release was published, or None if it has no files
+    """
+    __slots__ = ("version", "upload_time")
+
+    def __init__(self, version: str, upload_time: Optional[datetime]) -> None:
+        self.version = version
+        self.upload_time = upload_time
+
+    def __repr__(self) -> str:
+        return f"Release({self.version!r}, {self.upload_time!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Release) and (self.version, self.upload_time) == (other.version, other.upload_time)
+
+
+class PackageMetadata:
+    """
+    Metadata of a package, as published on its registry
+
+    Attributes:
+        name (str): name of the package
+        version (str): latest version of the package
+        description (str): description of the package, empty if it has none
+        emails (tuple): e-mail addresses of the maintainers
+        releases (tuple): timeline of the releases, oldest first
+        repository_urls (tuple): URLs of the source code repositories linked by the package, sorted
+        homepage (str): homepage of the package, if it is also one of the repository URLs
+        digests (dict): map from each artifact of the scanned version to its digest, see normalize_digest
+    """
+    __slots__ = ("name", "version", "description", "emails", "releases", "repository_urls", "homepage", "digests")
+
+    def __init__(self, name: str, version: Optional[str], description: str = "", emails: tuple[str, ...] = (),
+                 releases: tuple[Release, ...] = (), repository_urls: tuple[str, ...] = (),
+                 homepage: Optional[str] = None, digests: Optional[dict[str, str]] = None) -> None:
+        self.name = name
+        self.version = version
+        self.description = description
+        self.emails = emails
+        self.releases = releases
+        self.repository_urls = repository_urls
+        self.homepage = homepage
+        self.digests = digests if digests is not None else {}
+
+    @classmethod
+    def from_json(cls, data: dict, version: Optional[str] = None) -> "PackageMetadata":
+        """
+        Extracts the metadata of a package from its registry document
+
+        Args:
+            data (dict): registry document
+            version (str, optional): scanned version, whose artifact digests are kept. Defaults to the latest version
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    @classmethod
+    def get(cls, package_info) -> "PackageMetadata":
+        """
+        Returns the metadata of a package given either as a model, or as a raw registry document
+        """
+        if isinstance(package_info, cls):
+            return package_info
+        return cls.from_json(package_info)
+
+    def get_release(self, version: str) -> Optional[Release]:
+        for release in self.releases:
+            if release.version == version:
+                return release
+        return None
+
+
+class PypiPackageMetadata(PackageMetadata):
+    """
+    Metadata of a PyPI package, from the PyPI JSON API. Releases are sorted by version.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, data: dict, version: Optional[str] = None) -> "PypiPackageMetadata":
+        info = data["info"]
+        releases = data.get("releases") or {}
+
+        emails = tuple(email for email in [info.get("author_email") or info.get("maintainer_email")] if email)
+
+        timeline = []
+        for release_version, files in releases.items():
+            upload_time = _parse_date(files[0].get("upload_time_iso_8601")) if len(files) > 0 else None
+            timeline.append(Release(release_version, upload_time))
+
+        def version_key(release: Release) -> tuple[int, Any]:
+            try:
+                return 1, Version(release.version)
+            except InvalidVersion:
+                return 0, release.version
+
+        timeline.sort(key=version_key)
+
+        repository_urls, homepage = cls._find_repository_urls(info)
+
+        digests = {}
+        for file in releases.get(version if version is not None else info.get("version"), None) or []:
+            sha256 = normalize_digest(f"sha256:{file.get('digests', {}).get('sha256', '')}")
+            if sha256 is not None:
+                digests[file["filename"]] = sha256
+
+        return cls(
+            name=info.get("name", ""),
+            version=info.get("version"),
+            description=info.get("description") or "",
+            emails=emails,
+            releases=tuple(timeline),
+            repository_urls=repository_urls,
+            homepage=homepage,
+            digests=digests,
+        )
+
+    @staticmethod
+    def _find_repository_urls(info: dict) -> tuple[tuple[str, ...], Optional[str]]:
+        """
+        Finds the GitHub repositories mentioned anywhere in the metadata, and whether the homepage is one of them
+        """
+        project_urls = info.get("project_urls", {})
+        # In some cases, the "project_urls" key is set, but is set to None
+        if project_urls is None:
+            return (), None
+
+        urls = set()
+        for leaf in _iter_leaves(info):
+            if type(leaf) is not str:
+                continue
+            for url in GITHUB_REPOSITORY_REGEX.findall(leaf):
+                urls.add(_ensure_scheme(url.strip()))
+
+        homepage = project_urls.get("Homepage")
+        return tuple(sorted(urls)), _ensure_scheme(homepage) if homepage in urls else None
+
+
+class NpmPackageMetadata(PackageMetadata):
+    """
+    Metadata of an npm package, from its packument. Releases are sorted by publication time.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, data: dict, version: Optional[str] = None) -> "NpmPackageMetadata":
+        versions = data.get("versions") or {}
+        times = data.get("time") or {}
+        latest_version = (data.get("dist-tags") or {}).get("latest")
+
+        emails = tuple(
+            maintainer["email"] for maintainer in data.get("maintainers") or []
+            if isinstance(maintainer, dict) and maintainer.get("email")
+        )
+
+        timeline = [
+            Release(release_version, _parse_date(upload_time)) for release_version, upload_time in times.items()
+            if release_version in versions or release_version == latest_version
+        ]
+        timeline.sort(key=lambda release: (release.upload_time is not None, release.upload_time or datetime.min))
+
+        repository = data.get("repository")
+        repository_url = repository.get("url") if isinstance(repository, dict) else repository
+        repository_urls = (repository_url,) if isinstance(repository_url, str) else ()
+
+        dist = (versions.get(version if version is not None else latest_version) or {}).get("dist") or {}
+        digests = {}
+        if "tarball" in dist:
+            digest = normalize_digest(dist.get("integrity") or dist.get("shasum") or "")
+            if digest is not None:
+                digests[dist["tarball"].rsplit("/", 1)[-1]] = digest
+
+        return cls(
+            name=data.get("name", ""),
+            version=latest_version,
+            description=data.get("description") or "",
+            emails=emails,
+            releases=tuple(timeline),
+            repository_urls=repository_urls,
+            homepage=data.get("homepage"),
+            digests=digests,
+        )
+
+
+PACKAGE_METADATA_CLASSES = {
+    ECOSYSTEM.PYPI: PypiPackageMetadata,
+    ECOSYSTEM.NPM: NpmPackageMetadata,
+}  # type: dict[ECOSYSTEM, type[PackageMetadata]]
+
+
+def get_package_metadata(ecosystem: ECOSYSTEM, data: dict, version: Optional[str] = None) -> PackageMetadata:
+    """
+    Extracts the metadata of a package of an ecosystem from its registry document
+
+    Args:
+        ecosystem (ECOSYSTEM): ecosystem of the package
+        data (dict): registry document
+        version (str, optional): scanned version. Defaults to the latest version
+    """
+    return PACKAGE_METADATA_CLASSES[ecosystem].from_json(data, version)
@@ -0,0 +1,74 @@
+""" npm packuments
+
+Reads the documents the npm registry serves for each package (packuments) while they are downloaded. Packuments of
+long-lived packages list thousands of versions, each with its own manifest and readme, and weigh up to a hundred
+megabytes: only the fields GuardDog uses are decoded.
+"""
+from typing import Iterable, Optional, Union
+
+from guarddog.utils.json_stream import JsonStream
+
+# Top-level fields of packuments decoded entirely, the versions are handled separately
+PACKUMENT_FIELDS = ("name", "dist-tags", "time", "maintainers", "description", "repository", "homepage")
+
+# Size of the chunks packuments are downloaded by
+PACKUMENT_CHUNK_SIZE = 256 * 1024
+
+
+def read_packument(chunks: Iterable[Union[str, bytes]], version: Optional[str] = None) -> dict:
+    """
+    Reads the fields of a packument GuardDog uses
+
+    Args:
+        chunks (Iterable): chunks of the packument, e.g. from requests.Response.iter_content
+        version (str, optional): version whose manifest is kept. Defaults to the latest version
+
+    Returns:
+        dict: packument limited to PACKUMENT_FIELDS and versions, in which every manifest but the one of the version is
+            replaced by None
+    """
+    stream = JsonStream(chunks)
+    packument = {}  # type: dict
+    for key in stream.iter_object():
+        if key == "versions":
+            # dist-tags precede versions in the packuments of the registry, otherwise all manifests are read until
+            # the latest version is known
+            target = version if version is not None else (packument.get("dist-tags") or {}).get("latest")
+            versions = {}
+            for manifest_version in stream.iter_object():
+                if target is None or manifest_version == target:
+                    versions[manifest_version] = stream.read_value()
+                else:
+                    stream.skip_value()
+                    versions[manifest_version] = None
+            packument["versions"] = versions
+        elif key in PACKUMENT_FIELDS:
+            packument[key] = stream.read_value()
+        else:
+            stream.skip_value()
+
+    if version is None and "versions" in packument:
+        latest_version = (packument.get("dist-tags") or {}).get("latest")
+        for manifest_version in packument["versions"]:
+            if manifest_version != latest_version:
+                packument["versions"][manifest_version] = None
+    return packument
+
+
+def read_packument_versions(chunks: Iterable[Union[str, bytes]]) -> list[str]:
+    """
+    Reads the versions listed in a packument, without decoding their manifests
+
+    Args:
+        chunks (Iterable): chunks of the packument, e.g. from requests.Response.iter_content
+    """
+    stream = JsonStream(chunks)
+    versions = []  # type: list[str]
+    for key in stream.iter_object():
+        if key != "versions":
+            stream.skip_value()
+            continue
+        for manifest_version in stream.iter_object():
+            stream.skip_value()
+            versions.append(manifest_version)
+    return versions
@@ -0,0 +1,13 @@
+import multiprocessing
+import os
+
+
+def get_parallelism() -> int:
+    """
+    Returns the number of parallel workers GuardDog may use, which defaults to the number of CPUs and can be
+    overridden through the GUARDDOG_PARALLELISM environment variable
+    """
+    parallelism = os.environ.get("GUARDDOG_PARALLELISM")
+    if parallelism is not None:
+        return max(1, int(parallelism))
+    return multiprocessing.cpu_count()
@@ -0,0 +1,96 @@
+""" Resources
+
+Data files used by the heuristics, such as the lists of popular packages. They are bundled with GuardDog and can be
+refreshed by the update-resources command, which writes the new copies to the user cache: scans only read local
+copies and never download anything.
+"""
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable
+
+import requests
+
+from guarddog.utils.cache import get_cache_dir, get_cache_path
+
+log = logging.getLogger("guarddog")
+
+BUNDLED_RESOURCES_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "analyzer", "metadata", "resources")
+)
+
+# Resources older than this should be refreshed
+RESOURCE_MAX_AGE = timedelta(days=30)
+
+
+def _is_top_pypi_packages(data) -> bool:
+    return isinstance(data, dict) and isinstance(data.get("rows"), list) and len(data["rows"]) > 0
+
+
+# Resources that can be refreshed, mapped to their download URL and to a check of their downloaded contents
+UPDATABLE_RESOURCES: dict[str, tuple[str, Callable[[object], bool]]] = {
+    "top_pypi_packages.json": (
+        "https://hugovk.github.io/top-pypi-packages/top-pypi-packages-30-days.min.json",
+        _is_top_pypi_packages,
+    ),
+}
+
+
+def get_resource_path(filename: str) -> str:
+    """
+    Returns the path of the most recent local copy of a resource, the one of the user cache if it was refreshed by
+    update-resources or the bundled one otherwise
+
+    Args:
+        filename (str): name of the resource file
+    """
+    # Scans only read the cache, which may not exist or be writable (e.g. in read-only containers)
+    cached_path = os.path.join(get_cache_path("resources"), filename)
+    path = cached_path if os.path.isfile(cached_path) else os.path.join(BUNDLED_RESOURCES_DIR, filename)
+
+    if filename in UPDATABLE_RESOURCES:
+        try:
+            update_time = datetime.fromtimestamp(os.path.getmtime(path))
+        except OSError:
+            return os.path.join(BUNDLED_RESOURCES_DIR, filename)
+        if datetime.now() - update_time > RESOURCE_MAX_AGE:
+            log.debug(f"{filename} was last updated on {update_time:%Y-%m-%d}, run 'guarddog update-resources' "
+                      "to refresh it")
+    return path
+
+
+def update_resources() -> list[str]:
+    """
+    Downloads the latest version of the updatable resources into the user cache. A resource is only replaced once
+    its new version is downloaded and checked, so that scans always have a good local copy to use.
+
+    Raises:
+        Exception: a resource could not be downloaded or is invalid
+
+    Returns:
+        list[str]: paths of the updated resources
+    """
+    updated = []
+    resources_dir = get_cache_dir("resources")
+    for filename, (url, is_valid) in UPDATABLE_RESOURCES.items():
+        log.debug(f"Downloading {filename} from {url}")
+        response = requests.get(url, timeout=60)
+        if response.status_code != 200:
+            raise Exception(f"Received status code: {response.status_code} when downloading {url}")
+        data = response.json()
+        if not is_valid(data):
+            raise Exception(f"Unexpected contents downloaded from {url}")
+
+        path = os.path.join(resources_dir, filename)
+        fd, temporary_path = tempfile.mkstemp(dir=resources_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        updated.append(path)
+    return updated
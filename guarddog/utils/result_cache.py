@@ -0,0 +1,194 @@
+""" Scan result cache
+
+Stores the results of remote scans in a SQLite database of the user cache. Published artifacts are immutable, so the
+results of a package version are reused as long as its artifacts, the rules and the metadata detectors did not
+change: they are keyed by the name and version of the package, a digest of its artifacts as published by the registry
+or recorded in the lockfile of a project, a fingerprint of the rules and the versions of the detectors. This allows
+skipping the download and the analysis of packages verified again, e.g. the locked dependencies of a project checked on
+every CI run.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, NamedTuple, Optional
+
+from guarddog.utils.cache import get_cache_dir
+
+log = logging.getLogger("guarddog")
+
+# Bumped whenever the results of scans change for the same rules, which invalidates results cached by previous
+# versions
+RESULT_FORMAT_VERSION = 2
+
+
+class ScanResultKey(NamedTuple):
+    """
+    Identifies the results of a scan
+
+    Attributes:
+        ecosystem (str): ecosystem of the package
+        name (str): name of the package, since metadata detectors (e.g. typosquatting) depend on it
+        version (str): scanned version of the package
+        digest (str): digest of the artifacts of the version, see get_artifacts_digest
+        fingerprint (str): fingerprint of the rules of the scan, see Analyzer.get_ruleset_fingerprint
+        detector_versions (str): versions of the metadata detectors of the scan
+    """
+    ecosystem: str
+    name: str
+    version: str
+    digest: str
+    fingerprint: str
+    detector_versions: str
+
+
+class CachedScanResult(NamedTuple):
+    """
+    Results of a scan stored in the cache
+
+    Attributes:
+        results (dict): output of the analyzer
+        detector_times (dict): map from each metadata rule to the time it last ran, in seconds since the epoch
+    """
+    results: dict
+    detector_times: dict[str, float]
+
+
+def get_artifacts_digest(digests: Iterable[str]) -> Optional[str]:
+    """
+    Combines the digests of the artifacts of a package version into a single digest
+
+    Args:
+        digests (Iterable): digests of the artifacts, as published by the registry or recorded in a lockfile, see
+            normalize_digest
+
+    Returns:
+        str: SHA-256 of the digests, or None if there are none
+    """
+    unique_digests = sorted(set(digests))
+    if len(unique_digests) == 0:
+        return None
+    digest = hashlib.sha256(f"{RESULT_FORMAT_VERSION}\n".encode())
+    for artifact_digest in unique_digests:
+        digest.update(f"{artifact_digest}\n".encode())
+    return digest.hexdigest()
+
+
+def get_scan_result_key(ecosystem: str, name: str, version: str, digests: Iterable[str], fingerprint: str,
+                        detector_versions: dict[str, int]) -> Optional[ScanResultKey]:
+    """
+    Returns the key of the results of a scan, or None if the scanned artifacts cannot be identified
+    """
+    digest = get_artifacts_digest(digests)
+    if digest is None:
+        return None
+    return ScanResultKey(ecosystem, name, version, digest, fingerprint, json.dumps(detector_versions, sort_keys=True))
+
+
+class ScanResultCache:
+    """
+    Results of scans, stored in a SQLite database
+
+    Attributes:
+        path (str): path of the SQLite database, or None to only cache results in memory
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+
+        self._entries = {}  # type: dict[ScanResultKey, CachedScanResult]
+        self._lock = threading.Lock()
+        self._connection = None  # type: Optional[sqlite3.Connection]
+
+    def _get_connection(self) -> Optional[sqlite3.Connection]:
+        if self._connection is None and self.path is not None:
+            try:
+                connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS scans "
+                    "(ecosystem TEXT, name TEXT, version TEXT, digest TEXT, fingerprint TEXT, detector_versions TEXT, "
+                    "results TEXT, detector_times TEXT, scanned_at REAL, "
+                    "PRIMARY KEY (ecosystem, name, version, digest, fingerprint, detector_versions))"
+                )
+                connection.commit()
+                self._connection = connection
+            except sqlite3.Error as e:
+                log.debug(f"Unable to open the scan result cache {self.path}, caching results in memory only: {str(e)}")
+                self.path = None
+        return self._connection
+
+    def get(self, key: ScanResultKey) -> Optional[CachedScanResult]:
+        """
+        Returns the cached results of a scan, or None if the scan was never run with the same artifacts and rules
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                return cached
+            connection = self._get_connection()
+            if connection is None:
+                return None
+            try:
+                row = connection.execute(
+                    "SELECT results, detector_times FROM scans WHERE ecosystem = ? AND name = ? AND version = ? "
+                    "AND digest = ? AND fingerprint = ? AND detector_versions = ?", key
+                ).fetchone()
+            except sqlite3.Error as e:
+                log.debug(f"Unable to read {key.name} {key.version} from the scan result cache: {str(e)}")
+                return None
+            if row is None:
+                return None
+            try:
+                cached = CachedScanResult(json.loads(row[0]), json.loads(row[1]))
+            except ValueError as e:
+                log.debug(f"Ignoring invalid cached results of {key.name} {key.version}: {str(e)}")
+                return None
+            self._entries[key] = cached
+            return cached
+
+    def store(self, key: ScanResultKey, results: dict, detector_times: dict[str, float]) -> None:
+        """
+        Stores the results of a scan, replacing the ones cached for the same key
+
+        Args:
+            key (ScanResultKey): key of the results
+            results (dict): output of the analyzer
+            detector_times (dict): map from each metadata rule to the time it last ran, in seconds since the epoch
+        """
+        with self._lock:
+            self._entries[key] = CachedScanResult(results, detector_times)
+            connection = self._get_connection()
+            if connection is None:
+                return
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*key, json.dumps(results), json.dumps(detector_times), time.time()),
+                )
+                connection.commit()
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                log.debug(f"Unable to write {key.name} {key.version} to the scan result cache: {str(e)}")
+
+
+_result_cache = None  # type: Optional[ScanResultCache]
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ScanResultCache:
+    """
+    Returns the scan result cache shared by all scanners, stored in the user cache
+    """
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                try:
+                    path = os.path.join(get_cache_dir("results"), "scans.sqlite3")  # type: Optional[str]
+                except OSError as e:
+                    log.debug(f"Unable to create the scan result cache, caching results in memory only: {str(e)}")
+                    path = None
+                _result_cache = ScanResultCache(path)
+    return _result_cache
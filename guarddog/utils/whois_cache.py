@@ -0,0 +1,241 @@
+""" Whois cache
+
+Caches whois lookups of domains in the user cache, since they are slow, rate-limited and repeated for the same
+e-mail providers across packages. Concurrent lookups of a domain are coalesced into a single whois query, and the
+number of whois queries running at the same time is bounded.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import NamedTuple, Optional, Protocol
+
+from guarddog.utils.cache import get_cache_dir
+
+log = logging.getLogger("guarddog")
+
+# Information about registered domains is refreshed after this many seconds
+WHOIS_TTL = 7 * 24 * 60 * 60
+
+# Domains found unregistered are looked up again sooner, since anyone may register them in the meantime
+WHOIS_NEGATIVE_TTL = 24 * 60 * 60
+
+# Maximum number of whois queries running at the same time, whois servers rate-limit clients
+WHOIS_MAX_CONCURRENT_QUERIES = 4
+
+
+class DomainInformation(NamedTuple):
+    """
+    Result of a whois lookup
+
+    Attributes:
+        creation_date (datetime): creation date of the domain, or None if unknown
+        registered (bool): whether the domain is currently registered
+        fetched_at (float): time of the lookup, in seconds since the epoch
+    """
+    creation_date: Optional[datetime]
+    registered: bool
+    fetched_at: float
+
+
+class WhoisBackend(Protocol):
+    def query(self, domain: str) -> tuple[Optional[datetime], bool]:
+        """
+        Queries whois for a domain
+
+        Returns:
+            datetime: creation date of the domain, or None if unknown
+            bool: whether the domain is currently registered
+        """
+        ...
+
+
+class PythonWhoisBackend:
+    """
+    Queries whois servers through the python-whois package
+    """
+
+    def query(self, domain: str) -> tuple[Optional[datetime], bool]:
+        import whois  # type: ignore
+
+        try:
+            domain_information = whois.whois(domain)
+        except whois.parser.PywhoisError as e:
+            # The domain doesn't exist at all, if that's the case we consider it vulnerable
+            # since someone could register it
+            return None, (not str(e).lower().startswith('no match for'))
+
+        creation_dates = domain_information.creation_date
+        if type(creation_dates) is list:
+            creation_dates = min(creation_dates)
+        if not isinstance(creation_dates, datetime):
+            # No creation date in whois, or one that could not be parsed, so we can't know
+            return None, True
+        return creation_dates, True
+
+
+def _get_int_setting(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value is not None else default
+
+
+class WhoisCache:
+    """
+    Whois lookups, cached in memory and in a SQLite database
+
+    Attributes:
+        backend (WhoisBackend): source of whois information
+        path (str): path of the SQLite database, or None to only cache lookups in memory
+        ttl (int): number of seconds information about a registered domain is kept
+        negative_ttl (int): number of seconds information about an unregistered domain is kept
+    """
+
+    def __init__(self, backend: Optional[WhoisBackend] = None, path: Optional[str] = None,
+                 ttl: int = WHOIS_TTL, negative_ttl: int = WHOIS_NEGATIVE_TTL,
+                 max_concurrent_queries: int = WHOIS_MAX_CONCURRENT_QUERIES) -> None:
+        self.backend = backend if backend is not None else PythonWhoisBackend()
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries = {}  # type: dict[str, DomainInformation]
+        self._pending = {}  # type: dict[str, Future]
+        self._lock = threading.Lock()
+        self._queries = threading.BoundedSemaphore(max(1, max_concurrent_queries))
+        self._connection = None  # type: Optional[sqlite3.Connection]
+
+    def _get_connection(self) -> Optional[sqlite3.Connection]:
+        if self._connection is None and self.path is not None:
+            try:
+                connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS domains "
+                    "(domain TEXT PRIMARY KEY, creation_date TEXT, registered INTEGER, fetched_at REAL)"
+                )
+                connection.commit()
+                self._connection = connection
+            except sqlite3.Error as e:
+                log.debug(f"Unable to open the whois cache {self.path}, caching lookups in memory only: {str(e)}")
+                self.path = None
+        return self._connection
+
+    def _is_fresh(self, information: DomainInformation) -> bool:
+        ttl = self.ttl if information.registered else self.negative_ttl
+        return time.time() - information.fetched_at < ttl
+
+    def _get_cached(self, domain: str) -> Optional[DomainInformation]:
+        """
+        Returns fresh information about a domain from memory or from the database, must be called with the lock held
+        """
+        information = self._entries.get(domain)
+        if information is None:
+            connection = self._get_connection()
+            if connection is not None:
+                try:
+                    row = connection.execute(
+                        "SELECT creation_date, registered, fetched_at FROM domains WHERE domain = ?", (domain,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    log.debug(f"Unable to read {domain} from the whois cache: {str(e)}")
+                    row = None
+                if row is not None:
+                    creation_date = datetime.fromisoformat(row[0]) if row[0] is not None else None
+                    information = DomainInformation(creation_date, bool(row[1]), row[2])
+                    self._entries[domain] = information
+        if information is not None and self._is_fresh(information):
+            return information
+        return None
+
+    def _store(self, domain: str, information: DomainInformation) -> None:
+        """
+        Stores information about a domain in memory and in the database, must be called with the lock held
+        """
+        self._entries[domain] = information
+        connection = self._get_connection()
+        if connection is None:
+            return
+        creation_date = information.creation_date.isoformat() if information.creation_date is not None else None
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO domains VALUES (?, ?, ?, ?)",
+                (domain, creation_date, int(information.registered), information.fetched_at),
+            )
+            connection.commit()
+        except sqlite3.Error as e:
+            log.debug(f"Unable to write {domain} to the whois cache: {str(e)}")
+
+    def lookup(self, domain: str) -> DomainInformation:
+        """
+        Returns whois information about a domain, querying whois only if no fresh information is cached and no other
+        thread is already querying it
+
+        Args:
+            domain (str): domain to look up
+
+        Returns:
+            DomainInformation: creation date and registration status of the domain
+        """
+        domain = domain.strip().rstrip(".").lower()
+        with self._lock:
+            information = self._get_cached(domain)
+            if information is not None:
+                return information
+            future = self._pending.get(domain)
+            if future is not None:
+                querying = False
+            else:
+                querying = True
+                future = Future()
+                self._pending[domain] = future
+
+        if not querying:
+            return future.result()
+
+        try:
+            with self._queries:
+                creation_date, registered = self.backend.query(domain)
+        except BaseException as e:
+            # Failures, e.g. timeouts or rate limiting, are not cached
+            with self._lock:
+                del self._pending[domain]
+            future.set_exception(e)
+            raise
+
+        information = DomainInformation(creation_date, registered, time.time())
+        with self._lock:
+            self._store(domain, information)
+            del self._pending[domain]
+        future.set_result(information)
+        return information
+
+
+_whois_cache = None  # type: Optional[WhoisCache]
+_whois_cache_lock = threading.Lock()
+
+
+def get_whois_cache() -> WhoisCache:
+    """
+    Returns the whois cache shared by all detectors, stored in the user cache. The GUARDDOG_WHOIS_TTL,
+    GUARDDOG_WHOIS_NEGATIVE_TTL and GUARDDOG_WHOIS_MAX_QUERIES environment variables override the number of seconds
+    registered and unregistered domains are cached, and the number of concurrent whois queries.
+    """
+    global _whois_cache
+    if _whois_cache is None:
+        with _whois_cache_lock:
+            if _whois_cache is None:
+                try:
+                    path = os.path.join(get_cache_dir("whois"), "domains.sqlite3")  # type: Optional[str]
+                except OSError as e:
+                    log.debug(f"Unable to create the whois cache, caching lookups in memory only: {str(e)}")
+                    path = None
+                _whois_cache = WhoisCache(
+                    path=path,
+                    ttl=_get_int_setting("GUARDDOG_WHOIS_TTL", WHOIS_TTL),
+                    negative_ttl=_get_int_setting("GUARDDOG_WHOIS_NEGATIVE_TTL", WHOIS_NEGATIVE_TTL),
+                    max_concurrent_queries=_get_int_setting("GUARDDOG_WHOIS_MAX_QUERIES",
+                                                            WHOIS_MAX_CONCURRENT_QUERIES),
+                )
+    return _whois_cache
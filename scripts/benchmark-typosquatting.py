@@ -0,0 +1,33 @@
+"""
+Measures the time taken by typosquatting lookups against the top PyPI and npm packages
+
+Usage: python scripts/benchmark-typosquatting.py [rounds]
+"""
+import sys
+import time
+
+from guarddog.analyzer.metadata.npm import NPMTyposquatDetector
+from guarddog.analyzer.metadata.pypi import PypiTyposquatDetector
+
+CANDIDATES = [
+    "ans1crypto", "colourama", "djanga", "mumpy", "nmap-python", "python-mysql", "reqeusts-oauthlib", "tenserflow",
+    "expresss", "wich-boxed-primitive", "jest-watchers", "hello-world", "some-long-package-name-without-typos",
+]
+
+
+def benchmark(detector, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for candidate in CANDIDATES:
+            detector.get_typosquatted_package(candidate)
+    return (time.perf_counter() - start) / (rounds * len(CANDIDATES))
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    for detector_class in (PypiTyposquatDetector, NPMTyposquatDetector):
+        start = time.perf_counter()
+        detector = detector_class()
+        setup_time = time.perf_counter() - start
+        lookup_time = benchmark(detector, rounds)
+        print(f"{detector_class.__name__}: setup {setup_time * 1000:.1f} ms, lookup {lookup_time * 1000:.3f} ms")
@@ -1,6 +1,7 @@
 import sys
 
-import guarddog.analyzer.sourcecode as sourcecode_analyzers
+from guarddog.analyzer.manifest import get_manifest_rules
+from guarddog.analyzer.rule_catalog import get_catalog
 from guarddog.ecosystems import ECOSYSTEM, get_friendly_name
 import guarddog.analyzer.metadata as metadata_analyzers
 
@@ -16,20 +17,18 @@ def generate_docs() -> str:
         output += 'Source code heuristics:\n\n'
         output += '| **Heuristic** | **Description** |\n'
         output += '|:-------------:|:---------------:|\n'
-        for rule in sourcecode_analyzers.SOURCECODE_RULES[ecosystem]:
-            description = rule.get("metadata", {}).get("description")
-            if description is None:
-                description = rule.get('message')
-            description = description.replace("\n", "")
-            output += f'| {rule["id"]} | {description} |\n'
+        for rule in get_catalog().get_rules(ecosystem):
+            description = rule.description.replace("\n", "")
+            output += f'| {rule.id} | {description} |\n'
+        for name, manifest_rule in get_manifest_rules(ecosystem).items():
+            output += f'| {name} | {manifest_rule.get_description()} |\n'
 
         output += '\nMetadata heuristics:\n\n'
         output += '| **Heuristic** | **Description** |\n'
         output += '|:-------------:|:---------------:|\n'
         rules = metadata_analyzers.get_metadata_detectors(ecosystem)
         for ruleName in rules:
-            rule = rules[ruleName]
-            output += f"| {rule.get_name()} | {rule.get_description()} |\n"
+            output += f"| {ruleName} | {rules.get_description(ruleName)} |\n"
 
         output += "\n\n"
     return output
@@ -0,0 +1,65 @@
+import os
+import pathlib
+
+import pytest
+
+from guarddog.analyzer.analyzer import Analyzer
+from guarddog.analyzer.manifest import CmdOverwriteRule
+
+RESOURCES_PATH = os.path.join(pathlib.Path(__file__).parent.resolve(), "resources")
+
+rule = CmdOverwriteRule()
+
+
+def get_expected_lines(path, rule_name):
+    """
+    Returns the lines annotated with a Semgrep-style "# ruleid: <rule_name>" comment on the line before
+    """
+    with open(path, "r") as f:
+        lines = f.readlines()
+    return [idx + 2 for idx, line in enumerate(lines) if line.strip() == f"# ruleid: {rule_name}"]
+
+
+class TestCmdOverwrite:
+    def test_setup_py(self):
+        path = os.path.join(RESOURCES_PATH, "setup.py")
+        matches = rule.analyze_manifest(path)
+        assert [line for line, _ in matches] == get_expected_lines(path, "cmd-overwrite")
+        assert all("cmdclass" in code for _, code in matches)
+
+    @pytest.mark.parametrize("contents, expected", [
+        ("[metadata]\nname = foo\n\n[options]\ncmdclass =\n    install = foo.commands.Install\n", [5]),
+        ("[options]\ncmdclass =\n    upload = foo.commands.Upload\n", []),
+        ("[options]\npackages = find:\n", []),
+    ])
+    def test_setup_cfg(self, tmp_path, contents, expected):
+        path = tmp_path / "setup.cfg"
+        path.write_text(contents)
+        assert [line for line, _ in rule.analyze_manifest(str(path))] == expected
+
+    @pytest.mark.parametrize("contents, expected", [
+        ('[project]\nname = "foo"\n\n[tool.setuptools.cmdclass]\ndevelop = "foo.commands.Develop"\n', [4]),
+        ('[project]\nname = "foo"\n\n[tool.setuptools.cmdclass]\nupload = "foo.commands.Upload"\n', []),
+        ('[project\n', []),
+    ])
+    def test_pyproject_toml(self, tmp_path, contents, expected):
+        path = tmp_path / "pyproject.toml"
+        path.write_text(contents)
+        assert [line for line, _ in rule.analyze_manifest(str(path))] == expected
+
+    def test_invalid_setup_py(self, tmp_path):
+        path = tmp_path / "setup.py"
+        path.write_text("print 'python 2'\nsetup(cmdclass={'install': Install})\n")
+        assert rule.analyze_manifest(str(path)) == []
+
+    def test_analyzer_output(self, tmp_path):
+        package_path = tmp_path / "foo-1.0"
+        package_path.mkdir()
+        (package_path / "setup.py").write_text("from setuptools import setup\n\nsetup(cmdclass={'install': Install})\n")
+
+        result = Analyzer().analyze_sourcecode(str(tmp_path), rules={"cmd-overwrite"})
+        assert result["issues"] == 1
+        assert result["errors"] == {}
+        finding = result["results"]["cmd-overwrite"][0]
+        assert finding["location"] == os.path.join("foo-1.0", "setup.py") + ":3"
+        assert finding["message"] == rule.get_message()
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from guarddog.analyzer.analyzer import Analyzer
+from guarddog.analyzer.manifest import NPMInstallScriptRule
+
+rule = NPMInstallScriptRule()
+
+
+def write_package_json(directory, scripts):
+    path = directory / "package.json"
+    path.write_text(json.dumps({"name": "my-package", "version": "1.0.0", "scripts": scripts}, indent=2))
+    return str(path)
+
+
+class TestNPMInstallScript:
+    @pytest.mark.parametrize("script", ["preinstall", "install", "postinstall", "prepare"])
+    def test_install_scripts(self, tmp_path, script):
+        path = write_package_json(tmp_path, {"test": "jest", script: "node malicious.js"})
+        assert rule.analyze_manifest(path) == [(6, f'"{script}": "node malicious.js"')]
+
+    def test_no_install_script(self, tmp_path):
+        path = write_package_json(tmp_path, {"test": "jest", "build": "tsc"})
+        assert rule.analyze_manifest(path) == []
+
+    def test_install_outside_scripts(self, tmp_path):
+        path = tmp_path / "package.json"
+        path.write_text(json.dumps({"name": "my-package", "config": {"postinstall": "node index.js"}}))
+        assert rule.analyze_manifest(str(path)) == []
+
+    @pytest.mark.parametrize("contents", ["{ not json", "[]", '{"scripts": "postinstall"}'])
+    def test_malformed_package_json(self, tmp_path, contents):
+        path = tmp_path / "package.json"
+        path.write_text(contents)
+        assert rule.analyze_manifest(str(path)) == []
+
+    def test_analyzer_output(self, tmp_path):
+        package_path = tmp_path / "package"
+        package_path.mkdir()
+        write_package_json(package_path, {"postinstall": "node malicious.js"})
+        # Manifests in excluded directories are not analyzed
+        (package_path / "tests").mkdir()
+        write_package_json(package_path / "tests", {"postinstall": "node fixture.js"})
+
+        result = Analyzer().analyze_manifests(str(tmp_path), rules={"npm-install-script"})
+        assert result["issues"] == 1
+        assert result["results"]["npm-install-script"] == [{
+            "location": os.path.join("package", "package.json") + ":5",
+            "code": '"postinstall": "node malicious.js"',
+            "message": rule.get_message()
+        }]
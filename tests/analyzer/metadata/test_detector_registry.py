@@ -0,0 +1,37 @@
+import pytest
+
+from guarddog.analyzer.metadata import get_metadata_detectors
+from guarddog.analyzer.metadata.registry import DetectorEntry, DetectorRegistry
+from guarddog.ecosystems import ECOSYSTEM
+
+
+@pytest.mark.parametrize("ecosystem", list(ECOSYSTEM))
+def test_registry_matches_detectors(ecosystem):
+    registry = get_metadata_detectors(ecosystem)
+    for name in registry:
+        detector = registry[name]
+        assert detector.get_name() == name
+        assert detector.get_description() == registry.get_description(name)
+        assert type(detector) is registry.get_class(name)
+
+
+def test_detectors_are_instantiated_on_first_use():
+    registry = DetectorRegistry([
+        DetectorEntry("release_zero", "Identify packages with an release version that's 0.0 or 0.0.0",
+                      "guarddog.analyzer.metadata.pypi.release_zero.PypiReleaseZeroDetector"),
+    ])
+    assert list(registry.keys()) == ["release_zero"]
+    assert registry._detectors == {}
+
+    detector = registry["release_zero"]
+    assert registry["release_zero"] is detector
+    with pytest.raises(KeyError):
+        registry["typosquatting"]
+
+
+def test_detector_classes_can_be_imported_from_ecosystem_packages():
+    from guarddog.analyzer.metadata.pypi import PypiTyposquatDetector
+
+    assert PypiTyposquatDetector.__name__ == "PypiTyposquatDetector"
+    with pytest.raises(ImportError):
+        from guarddog.analyzer.metadata.pypi import UnknownDetector  # noqa: F401
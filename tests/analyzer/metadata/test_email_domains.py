@@ -0,0 +1,42 @@
+import pytest
+
+from guarddog.analyzer.metadata.email_domains import WellKnownEmailDomains, get_well_known_email_domains
+from guarddog.analyzer.metadata.pypi import PypiPotentiallyCompromisedEmailDomainDetector
+from guarddog.utils.whois_cache import WhoisCache
+
+well_known_domains = WellKnownEmailDomains(
+    ["gmail.com", "amazonaws.com", "yahoo.co.uk", "co.uk", "com"],
+    ["co.uk", "s3.amazonaws.com"],
+)
+
+
+@pytest.mark.parametrize("domain, expected", [
+    ("gmail.com", "gmail.com"),
+    ("GMail.com.", "gmail.com"),
+    ("eu.gmail.com", "gmail.com"),
+    ("notgmail.com", None),
+    ("gmail.com.evil.net", None),
+    ("yahoo.co.uk", "yahoo.co.uk"),
+    ("evil.co.uk", None),
+    ("co.uk", None),
+    ("amazonaws.com", "amazonaws.com"),
+    ("bucket.s3.amazonaws.com", None),
+    ("example.com", None),
+])
+def test_well_known_domains(domain, expected):
+    assert well_known_domains.get_well_known_domain(domain) == expected
+
+
+def test_well_known_domains_skip_whois():
+    class FailingWhoisBackend:
+        def query(self, domain):
+            raise AssertionError(f"unexpected whois lookup of {domain}")
+
+    detector = PypiPotentiallyCompromisedEmailDomainDetector()
+    detector.whois_cache = WhoisCache(FailingWhoisBackend())
+    hit_count = get_well_known_email_domains().get_hit_count()
+
+    compromised, _ = detector.detect({"info": {"author_email": "<maintainer@gmail.com>", "maintainer_email": None}})
+
+    assert not compromised
+    assert get_well_known_email_domains().get_hit_count() == hit_count + 1
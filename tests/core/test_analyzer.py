@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest.mock
+
+from guarddog import ecosystems
+from guarddog.analyzer.analyzer import Analyzer
+from guarddog.analyzer.package_manifest import build_manifest
+from tests.analyzer.metadata.resources.sample_project_info import generate_pypi_project_info
+
+
+class BlockingDetector:
+    def __init__(self, started: threading.Barrier, result: tuple) -> None:
+        self.started = started
+        self.result = result
+
+    def detect(self, package_info, path=None, name=None, version=None, manifest=None):
+        # Only returns once every other task started, which requires them to run concurrently
+        self.started.wait(timeout=10)
+        return self.result
+
+
+def test_metadata_and_source_code_run_concurrently(tmp_path):
+    started = threading.Barrier(3)
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    analyzer.metadata_detectors = {
+        "empty_information": BlockingDetector(started, (True, "empty description")),
+        "release_zero": BlockingDetector(started, (False, "")),
+    }
+
+    def mock_analyze_sourcecode(path, rules=None, manifest=None, deadline=None):
+        started.wait(timeout=10)
+        return {"results": {"exec-base64": [{"location": "setup.py:1"}]}, "errors": {}, "issues": 1, "targets": {}}
+
+    with unittest.mock.patch.object(analyzer, "analyze_sourcecode", mock_analyze_sourcecode):
+        result = analyzer.analyze(str(tmp_path), rules={"empty_information", "release_zero", "exec-base64"})
+
+    assert result["errors"] == {}
+    assert result["issues"] == 2
+    assert result["results"] == {"empty_information": "empty description",
+                                 "exec-base64": [{"location": "setup.py:1"}]}
+
+
+def test_tasks_timing_out_are_reported_as_errors(tmp_path):
+    class SlowDetector:
+        def detect(self, package_info, path=None, name=None, version=None, manifest=None):
+            time.sleep(1)
+            return True, "too late"
+
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    analyzer.metadata_detectors = {"release_zero": SlowDetector()}
+    analyzer.metadata_timeout = analyzer.sourcecode_timeout = 0.1
+
+    def mock_analyze_sourcecode(path, rules=None, manifest=None, deadline=None):
+        time.sleep(1)
+        return {"results": {}, "errors": {}, "issues": 0}
+
+    with unittest.mock.patch.object(analyzer, "analyze_sourcecode", mock_analyze_sourcecode):
+        start = time.monotonic()
+        result = analyzer.analyze(str(tmp_path), rules={"release_zero", "exec-base64"})
+
+    assert time.monotonic() - start < 1
+    assert result["issues"] == 0
+    assert result["errors"] == {
+        "release_zero": "failed to run rule release_zero: timed out after 0.1 seconds",
+        "exec-base64": "failed to run rule exec-base64: timed out after 0.1 seconds",
+    }
+
+
+def test_manifest_is_only_built_for_rules_reading_files(tmp_path):
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    info = generate_pypi_project_info("name", "sampleproject")
+
+    with unittest.mock.patch("guarddog.analyzer.analyzer.build_manifest", wraps=build_manifest) as mock_build_manifest:
+        analyzer.analyze(str(tmp_path), info, rules={"typosquatting", "release_zero"}, name="sampleproject")
+        mock_build_manifest.assert_not_called()
+
+        analyzer.analyze(str(tmp_path), info, rules={"typosquatting", "single_python_file"}, name="sampleproject")
+        mock_build_manifest.assert_called_once_with(str(tmp_path))
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+import unittest.mock
+
+import pytest
+
+from guarddog import ecosystems
+from guarddog.analyzer.analyzer import Analyzer
+from guarddog.analyzer.metadata.detector import Detector
+from guarddog.scanners.scanner import PackageScanner
+
+
+class AsyncDetector(Detector):
+    def __init__(self) -> None:
+        super().__init__(name="release_zero", description="")
+
+    def detect(self, package_info, path=None, name=None, version=None, manifest=None):
+        raise AssertionError("detect_async should be used")
+
+    async def detect_async(self, package_info, path=None, name=None, version=None, manifest=None):
+        await asyncio.sleep(0)
+        return True, "async finding"
+
+
+class ThreadedDetector(Detector):
+    def __init__(self) -> None:
+        super().__init__(name="empty_information", description="")
+
+    def detect(self, package_info, path=None, name=None, version=None, manifest=None):
+        return True, f"ran in {threading.current_thread().name}"
+
+
+def test_analyze_async(tmp_path):
+    (tmp_path / "setup.py").write_text("eval(base64.b64decode('cHJpbnQoMSk='))\n")
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    analyzer.metadata_detectors = {"release_zero": AsyncDetector(), "empty_information": ThreadedDetector()}
+    semgrep_output = json.dumps({"results": [{
+        "check_id": "exec-base64", "path": str(tmp_path / "setup.py"), "start": {"line": 1},
+        "extra": {"lines": "eval(base64.b64decode('cHJpbnQoMSk='))", "message": "base64 payload"},
+    }]})
+
+    with unittest.mock.patch.object(analyzer, "_get_semgrep_command",
+                                    return_value=[sys.executable, "-c", f"print({semgrep_output!r})"]):
+        result = asyncio.run(analyzer.analyze_async(str(tmp_path), rules={"release_zero", "empty_information",
+                                                                          "exec-base64"}))
+
+    assert result["errors"] == {}
+    assert result["issues"] == 3
+    assert result["results"]["release_zero"] == "async finding"
+    assert result["results"]["empty_information"] != f"ran in {threading.current_thread().name}"
+    [finding] = result["results"]["exec-base64"]
+    assert finding["location"] == "setup.py:1"
+    assert finding["message"] == "base64 payload"
+
+
+def test_cancelling_analyze_async_kills_semgrep(tmp_path):
+    (tmp_path / "setup.py").write_text("import os\n")
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    processes = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def record_subprocess(*args, **kwargs):
+        process = await create_subprocess_exec(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    async def cancel_analysis():
+        task = asyncio.ensure_future(analyzer.analyze_sourcecode_async(str(tmp_path), {"exec-base64"}))
+        while len(processes) == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with unittest.mock.patch.object(analyzer, "_get_semgrep_command",
+                                    return_value=[sys.executable, "-c", "import time; time.sleep(60)"]), \
+            unittest.mock.patch("asyncio.create_subprocess_exec", record_subprocess):
+        asyncio.run(cancel_analysis())
+
+    assert processes[0].returncode is not None
+
+
+def test_cancelling_download_aborts_it(tmp_path):
+    class EndlessRaw:
+        def __init__(self) -> None:
+            self.reads = 0
+
+        def read(self, size):
+            self.reads += 1
+            time.sleep(0.01)
+            return b"x" * 16
+
+    raw = EndlessRaw()
+    response = unittest.mock.MagicMock()
+    response.__enter__.return_value.raw = raw
+
+    class EndlessPackageScanner(PackageScanner):
+        def download_and_get_package_info(self, directory, package_name, version=None):
+            self.download_compressed("https://example.com/package.tar.gz", str(tmp_path / "package.tar.gz"),
+                                     str(tmp_path / "package"))
+            return {}, str(tmp_path / "package")
+
+    async def cancel_download():
+        scanner = EndlessPackageScanner(Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI))
+        task = asyncio.ensure_future(scanner.download_and_get_package_info_async(str(tmp_path), "package"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with unittest.mock.patch("requests.get", return_value=response):
+        asyncio.run(cancel_download())
+        reads = raw.reads
+        time.sleep(0.1)
+
+    assert reads > 0
+    assert raw.reads == reads
@@ -1,6 +1,11 @@
+import json
 import os
+import subprocess
+import sys
 import unittest.mock
 
+from click.testing import CliRunner
+
 import guarddog.cli
 
 
@@ -19,3 +24,45 @@ def test_is_local_target():
         mock.return_value = False
         assert not guarddog.cli.is_local_target("foo.tar.gz")
 
+
+def test_typosquat_check(tmp_path):
+    names_file = tmp_path / "names.txt"
+    names_file.write_text("# newly published packages\nreqeusts\nhello-world\n\nDjanga\n")
+
+    result = CliRunner().invoke(guarddog.cli.cli, ["pypi", "typosquat-check", str(names_file)])
+
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert [line["name"] for line in lines] == ["reqeusts", "Djanga"]
+    assert "requests" in lines[0]["similar_packages"]
+    assert "django" in lines[1]["similar_packages"]
+
+
+# Cumulative time allowed to import the CLI, in microseconds. GuardDog runs in hooks hundreds of times a day, where
+# startup dominates
+CLI_IMPORT_TIME_BUDGET = 300_000
+
+# Modules that are slow to import and only needed by some commands
+CLI_DEFERRED_IMPORTS = {
+    "guarddog.analyzer.analyzer", "guarddog.reporters.sarif", "guarddog.scanners", "pkg_resources", "prettytable",
+    "pygit2", "requests", "semantic_version", "termcolor", "whois", "yaml",
+}
+
+
+def test_cli_import_time_budget():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "guarddog", "--help"],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.join(os.path.dirname(__file__), "..", ".."),
+    )
+
+    # Lines look like "import time: <self us> | <cumulative us> | <indentation><module>"
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        import_times[module.strip()] = int(cumulative)
+
+    assert CLI_DEFERRED_IMPORTS.isdisjoint(import_times.keys())
+    assert import_times["guarddog.cli"] < CLI_IMPORT_TIME_BUDGET
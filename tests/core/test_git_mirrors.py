@@ -0,0 +1,69 @@
+import os
+import unittest.mock
+
+import pygit2
+
+from guarddog.utils.git_mirrors import GitMirrors
+
+
+def commit_files(repo: pygit2.Repository, files: dict[str, str], tag: str) -> None:
+    for file_name, contents in files.items():
+        with open(os.path.join(repo.workdir, file_name), "w") as f:
+            f.write(contents)
+        repo.index.add(file_name)
+    repo.index.write()
+    signature = pygit2.Signature("GuardDog", "guarddog@example.com")
+    parents = [] if repo.head_is_unborn else [repo.head.target]
+    commit = repo.create_commit("HEAD", signature, signature, tag, repo.index.write_tree(), parents)
+    repo.create_reference(f"refs/tags/{tag}", commit)
+
+
+def test_mirrors_are_fetched_incrementally(tmp_path):
+    source = pygit2.init_repository(str(tmp_path / "source"))
+    commit_files(source, {"setup.py": "version = '1.0'\n"}, "v1.0")
+    mirrors = GitMirrors(str(tmp_path / "mirrors"))
+
+    with mirrors.open(str(tmp_path / "source")) as repo:
+        assert "refs/tags/v1.0" in repo.references
+        assert repo.is_bare
+
+    commit_files(source, {"setup.py": "version = '2.0'\n"}, "v2.0")
+    with mirrors.open(str(tmp_path / "source") + "/") as repo:
+        assert repo.path.rstrip("/") == mirrors.get_mirror_path(str(tmp_path / "source"))
+        assert {"refs/tags/v1.0", "refs/tags/v2.0"} <= set(repo.references)
+        tree = repo.revparse_single("refs/tags/v1.0").peel(pygit2.Commit).tree
+        assert tree["setup.py"].data == b"version = '1.0'\n"
+
+
+def test_least_recently_used_mirrors_are_evicted(tmp_path):
+    for name in ["first", "second"]:
+        commit_files(pygit2.init_repository(str(tmp_path / name)), {"setup.py": name}, "v1.0")
+    mirrors = GitMirrors(str(tmp_path / "mirrors"), max_size=1)
+
+    with mirrors.open(str(tmp_path / "first")):
+        pass
+    with mirrors.open(str(tmp_path / "second")):
+        pass
+
+    assert not os.path.exists(mirrors.get_mirror_path(str(tmp_path / "first")))
+    assert os.path.exists(mirrors.get_mirror_path(str(tmp_path / "second")))
+
+
+def test_only_listed_refs_are_fetched(tmp_path):
+    source = pygit2.init_repository(str(tmp_path / "source"))
+    commit_files(source, {"setup.py": "version = '1.0'\n"}, "v1.0")
+    commit_files(source, {"setup.py": "version = '2.0'\n"}, "v2.0")
+    mirrors = GitMirrors(str(tmp_path / "mirrors"))
+
+    remote_refs = mirrors.list_remote_refs(str(tmp_path / "source"))
+    assert remote_refs["refs/tags/v1.0"] == str(source.references["refs/tags/v1.0"].target)
+    assert not os.path.exists(mirrors.get_mirror_path(str(tmp_path / "source")))
+
+    refs = {"refs/tags/v1.0": remote_refs["refs/tags/v1.0"]}
+    with mirrors.open(str(tmp_path / "source"), refs=refs, depth=1) as repo:
+        assert list(repo.references) == ["refs/tags/v1.0"]
+
+    with unittest.mock.patch("guarddog.utils.git_mirrors._fetch") as fetch:
+        with mirrors.open(str(tmp_path / "source"), refs=refs, depth=1):
+            pass
+    fetch.assert_not_called()
@@ -0,0 +1,193 @@
+import base64
+import json
+
+from guarddog.scanners.lockfiles import (
+    LockedPackage,
+    parse_hash_pinned_requirements,
+    parse_package_lock,
+    parse_pipfile_lock,
+    parse_poetry_lock,
+    parse_yarn_lock,
+)
+from guarddog.scanners.npm_project_scanner import NPMRequirementsScanner
+from guarddog.scanners.pypi_project_scanner import PypiRequirementsScanner
+from guarddog.utils.package_metadata import normalize_digest
+from guarddog.utils.result_cache import ScanResultCache
+from tests.analyzer.metadata.resources.sample_project_info import PYPI_PACKAGE_INFO
+from tests.core.test_result_cache import LocalPackageScanner
+
+WHEEL_SHA256 = "7a7a8b91086deccc54cac8d631e33f6a0e232ce5775c6be3dc44f86c2154019d"
+SDIST_SHA256 = "3427a8a5dd0c1e176da48a44efb410875b3973bd9843403a0997e4187c408dc1"
+INTEGRITY = "sha512-" + "A" * 86 + "=="
+
+
+def test_normalize_digest():
+    assert normalize_digest(f"sha256:{WHEEL_SHA256}") == normalize_digest(WHEEL_SHA256)
+    wheel_digest = base64.b64encode(bytes.fromhex(WHEEL_SHA256)).decode()
+    assert normalize_digest(f"sha256:{WHEEL_SHA256}") == f"sha256-{wheel_digest}"
+    assert normalize_digest(f"{INTEGRITY} sha1-AAAAAAAAAAAAAAAAAAAAAAAAAAA=") == INTEGRITY
+    assert normalize_digest("sha256:") is None
+    assert normalize_digest("crc32:00000000") is None
+
+
+def test_parse_package_lock():
+    v1 = {
+        "lockfileVersion": 1,
+        "dependencies": {
+            "express": {
+                "version": "4.18.2",
+                "resolved": "https://registry.npmjs.org/express/-/express-4.18.2.tgz",
+                "integrity": INTEGRITY,
+                "dependencies": {"debug": {"version": "2.6.9", "integrity": INTEGRITY}},
+            },
+            "local": {"version": "file:../local"},
+            "forked": {"version": "1.0.0", "resolved": "git+ssh://git@github.com/user/forked.git#abc"},
+        },
+    }
+    assert parse_package_lock(json.dumps(v1)) == [
+        LockedPackage("express", "4.18.2", (INTEGRITY,)),
+        LockedPackage("debug", "2.6.9", (INTEGRITY,)),
+    ]
+
+    v3 = {
+        "lockfileVersion": 3,
+        "packages": {
+            "": {"name": "project", "version": "1.0.0"},
+            "node_modules/@types/node": {"version": "20.1.0", "integrity": INTEGRITY},
+            "node_modules/express/node_modules/debug": {"version": "2.6.9", "integrity": INTEGRITY},
+            "node_modules/lodash-alias": {"name": "lodash", "version": "4.17.21"},
+            "node_modules/workspace": {"resolved": "packages/workspace", "link": True},
+        },
+    }
+    assert parse_package_lock(json.dumps(v3)) == [
+        LockedPackage("@types/node", "20.1.0", (INTEGRITY,)),
+        LockedPackage("debug", "2.6.9", (INTEGRITY,)),
+        LockedPackage("lodash", "4.17.21", ()),
+    ]
+
+
+def test_parse_yarn_lock():
+    contents = f"""# THIS IS AN AUTOGENERATED FILE. DO NOT EDIT THIS FILE DIRECTLY.
+# yarn lockfile v1
+
+
+"@babel/code-frame@^7.0.0", "@babel/code-frame@^7.22.5":
+  version "7.22.5"
+  resolved "https://registry.yarnpkg.com/@babel/code-frame/-/code-frame-7.22.5.tgz#234d98e1551960604f12"
+  integrity {INTEGRITY}
+  dependencies:
+    "@babel/highlight" "^7.22.5"
+
+lodash-alias@npm:lodash@^4.17.21:
+  version "4.17.21"
+
+forked@github:user/forked:
+  version "1.0.0"
+"""
+    assert parse_yarn_lock(contents) == [
+        LockedPackage("@babel/code-frame", "7.22.5", (INTEGRITY,)),
+        LockedPackage("lodash", "4.17.21", ()),
+    ]
+
+
+def test_parse_poetry_lock():
+    contents = f"""
+[[package]]
+name = "sampleproject"
+version = "1.2.0"
+files = [
+    {{file = "sampleproject-1.2.0-py2.py3-none-any.whl", hash = "sha256:{WHEEL_SHA256}"}},
+    {{file = "sampleproject-1.2.0.tar.gz", hash = "sha256:{SDIST_SHA256}"}},
+]
+
+[[package]]
+name = "legacy"
+version = "0.1.0"
+
+[[package]]
+name = "guarddog"
+version = "1.0.0"
+
+[package.source]
+type = "git"
+url = "https://github.com/DataDog/guarddog.git"
+
+[metadata.files]
+legacy = [
+    {{file = "legacy-0.1.0.tar.gz", hash = "sha256:{SDIST_SHA256}"}},
+]
+"""
+    assert parse_poetry_lock(contents) == [
+        LockedPackage("sampleproject", "1.2.0", (normalize_digest(WHEEL_SHA256), normalize_digest(SDIST_SHA256))),
+        LockedPackage("legacy", "0.1.0", (normalize_digest(SDIST_SHA256),)),
+    ]
+
+
+def test_parse_pipfile_lock():
+    contents = json.dumps({
+        "default": {"sampleproject": {"version": "==1.2.0", "hashes": [f"sha256:{WHEEL_SHA256}"]}},
+        "develop": {
+            "pytest": {"version": "==7.2.0", "hashes": []},
+            "guarddog": {"git": "https://github.com/DataDog/guarddog.git", "ref": "abc"},
+        },
+    })
+    assert parse_pipfile_lock(contents) == [
+        LockedPackage("sampleproject", "1.2.0", (normalize_digest(WHEEL_SHA256),)),
+        LockedPackage("pytest", "7.2.0", ()),
+    ]
+
+
+def test_parse_hash_pinned_requirements():
+    contents = f"""# pip-compile --generate-hashes
+sampleproject==1.2.0 \\
+    --hash=sha256:{WHEEL_SHA256} \\
+    --hash=sha256:{SDIST_SHA256}
+    # via -r requirements.in
+requests[security]==2.28.1 ; python_version >= "3.7" \\
+    --hash=sha256:{WHEEL_SHA256}
+flask>=2.2.2
+"""
+    scanner = PypiRequirementsScanner()
+    assert scanner.parse_lockfile(contents, "requirements.txt") == parse_hash_pinned_requirements(contents) == [
+        LockedPackage("sampleproject", "1.2.0", (normalize_digest(WHEEL_SHA256), normalize_digest(SDIST_SHA256))),
+        LockedPackage("requests", "2.28.1", (normalize_digest(WHEEL_SHA256),)),
+    ]
+    assert scanner.parse_lockfile("flask==2.2.2\n", "requirements.txt") is None
+    assert NPMRequirementsScanner().parse_lockfile("{}", "package.json") is None
+
+
+def get_locked_scanner(cache: ScanResultCache) -> PypiRequirementsScanner:
+    scanner = PypiRequirementsScanner()
+    scanner.package_scanner = LocalPackageScanner(PYPI_PACKAGE_INFO)
+    scanner.enable_result_cache(cache)
+    return scanner
+
+
+def test_scan_locked_versions(tmp_path):
+    lockfile = tmp_path / "Pipfile.lock"
+    lockfile.write_text(json.dumps({
+        "default": {"sampleproject": {"version": "==1.2.0", "hashes": [f"sha256:{WHEEL_SHA256}"]}},
+    }))
+    cache = ScanResultCache()
+
+    scanner = get_locked_scanner(cache)
+    results = scanner.scan_local(str(lockfile), {"stable"})
+    assert [(result["dependency"], result["version"]) for result in results] == [("sampleproject", "1.2.0")]
+    assert results[0]["result"]["issues"] == 1
+    assert scanner.package_scanner.downloads == 1
+
+    # Results are looked up with the lockfile digests, without fetching the registry document
+    scanner = get_locked_scanner(cache)
+    scanner.package_scanner.get_package_info = None
+    assert scanner.scan_local(str(lockfile), {"stable"})[0]["result"]["issues"] == 1
+    assert scanner.package_scanner.downloads == 0
+
+
+def test_scan_mismatched_digests(tmp_path):
+    lockfile = tmp_path / "requirements.txt"
+    lockfile.write_text(f"sampleproject==1.2.0 --hash=sha256:{'0' * 64}\n")
+
+    scanner = get_locked_scanner(ScanResultCache())
+    result = scanner.scan_local(str(lockfile), {"stable"})[0]["result"]
+    assert "lockfile-digest" in result["errors"]
+    assert scanner.package_scanner.downloads == 0
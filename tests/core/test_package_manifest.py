@@ -0,0 +1,61 @@
+import os
+from copy import deepcopy
+
+import pygit2
+
+from guarddog.analyzer.metadata.pypi import PypiSinglePythonFileDetector
+from guarddog.analyzer.package_manifest import build_manifest
+from guarddog.analyzer.targets import discover_targets, get_targets
+from tests.analyzer.metadata.resources.sample_project_info import PYPI_PACKAGE_INFO
+
+
+def test_build_manifest(tmp_path):
+    (tmp_path / "package" / "lib").mkdir(parents=True)
+    (tmp_path / "package" / "setup.py").write_text("from setuptools import setup\n")
+    (tmp_path / "package" / "lib" / "index.js").write_text("var a=1;" * 500 + "\n")
+    (tmp_path / "package" / "package.json").write_text("{}\n")
+    (tmp_path / "package" / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    os.symlink("setup.py", tmp_path / "package" / "link.py")
+
+    manifest = build_manifest(str(tmp_path))
+
+    assert manifest.paths == [
+        "package",
+        os.path.join("package", "lib"),
+        os.path.join("package", "lib", "index.js"),
+        os.path.join("package", "link.py"),
+        os.path.join("package", "logo.png"),
+        os.path.join("package", "package.json"),
+        os.path.join("package", "setup.py"),
+    ]
+    setup_py = manifest.get_index("package/setup.py")
+    assert manifest.is_file(setup_py)
+    assert manifest.sizes[setup_py] == len("from setuptools import setup\n")
+    assert manifest.get_blob_id(setup_py) == str(pygit2.hashfile(str(tmp_path / "package" / "setup.py")))
+    assert manifest.get_language(setup_py) == "python"
+    assert manifest.get_kind(setup_py) == "source"
+    assert manifest.get_kind(manifest.get_index("package/lib/index.js")) == "minified"
+    assert manifest.get_kind(manifest.get_index("package/logo.png")) == "binary"
+    assert manifest.is_dir(manifest.get_index("package/lib"))
+    assert manifest.get_blob_id(manifest.get_index("package/lib")) is None
+    assert manifest.get_blob_id(manifest.get_index("package/link.py")) == str(pygit2.hash("setup.py"))
+    assert manifest.get_files(language="python") == [os.path.join("package", "setup.py")]
+    assert [manifest.paths[index] for index in manifest.iter_files("package/lib")] == \
+        [os.path.join("package", "lib", "index.js")]
+
+
+def test_manifest_is_shared(tmp_path):
+    (tmp_path / "package" / "tests").mkdir(parents=True)
+    (tmp_path / "package" / "setup.py").write_text("from setuptools import setup\n")
+    (tmp_path / "package" / "tests" / "test_setup.py").write_text("import setup\n")
+
+    manifest = build_manifest(str(tmp_path))
+    targets = get_targets(manifest, ["tests"])
+    assert targets.files == [os.path.join("package", "setup.py")]
+    assert targets.get_statistics() == discover_targets(str(tmp_path), ["tests"]).get_statistics()
+
+    # The detector counts the files of the manifest, even if the package changed since it was built
+    os.remove(tmp_path / "package" / "tests" / "test_setup.py")
+    detector = PypiSinglePythonFileDetector()
+    assert not detector.detect(deepcopy(PYPI_PACKAGE_INFO), str(tmp_path), manifest=manifest)[0]
+    assert detector.detect(deepcopy(PYPI_PACKAGE_INFO), str(tmp_path))[0]
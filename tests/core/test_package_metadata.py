@@ -0,0 +1,45 @@
+import json
+import os
+import pathlib
+from datetime import datetime
+
+import pytest
+
+from guarddog.ecosystems import ECOSYSTEM
+from guarddog.utils.package_metadata import NpmPackageMetadata, PypiPackageMetadata, Release, get_package_metadata
+from tests.analyzer.metadata.resources.sample_project_info import PYPI_PACKAGE_INFO
+
+NPM_DATA_PATH = os.path.join(pathlib.Path(__file__).parent.parent.resolve(), "analyzer", "metadata", "resources",
+                             "npm_data.json")
+
+
+def test_pypi_package_metadata():
+    metadata = get_package_metadata(ECOSYSTEM.PYPI, PYPI_PACKAGE_INFO, "1.2.0")
+
+    assert isinstance(metadata, PypiPackageMetadata)
+    assert metadata.name == PYPI_PACKAGE_INFO["info"]["name"]
+    assert metadata.version == "1.2.0"
+    assert metadata.emails == ("pypa-dev@googlegroups.com",)
+    assert [release.version for release in metadata.releases] == ["1.0", "1.2.0"]
+    assert metadata.get_release("1.0") == Release("1.0", None)
+    assert metadata.get_release("1.2.0") == Release("1.2.0", datetime(2015, 6, 14, 14, 38, 5, 93750))
+    assert metadata.homepage == "https://github.com/pypa/sampleproject"
+    assert "https://github.com/pypa/sampleproject" in metadata.repository_urls
+    assert set(metadata.digests) == {file["filename"] for file in PYPI_PACKAGE_INFO["releases"]["1.2.0"]}
+    assert PypiPackageMetadata.get(metadata) is metadata
+    with pytest.raises(AttributeError):
+        metadata.readme = ""
+
+
+def test_npm_package_metadata():
+    with open(NPM_DATA_PATH) as f:
+        data = json.load(f)
+
+    metadata = get_package_metadata(ECOSYSTEM.NPM, data)
+
+    assert isinstance(metadata, NpmPackageMetadata)
+    assert metadata.name == data["name"]
+    assert metadata.version == "1.0.0"
+    assert metadata.emails == ("john.does@a-non-existing-domain.00notld",)
+    assert metadata.releases == (Release("1.0.0", datetime(2022, 11, 30, 15, 50, 49, 459000)),)
+    assert list(metadata.digests.values()) == [data["versions"]["1.0.0"]["dist"]["integrity"]]
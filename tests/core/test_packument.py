@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from guarddog.ecosystems import ECOSYSTEM
+from guarddog.utils.json_stream import JsonStream
+from guarddog.utils.package_metadata import PackageMetadata, get_package_metadata
+from guarddog.utils.packument import read_packument, read_packument_versions
+
+PACKUMENT = {
+    "_id": "package",
+    "name": "package",
+    "dist-tags": {"latest": "2.0.0"},
+    "versions": {
+        "1.0.0": {"readme": "escaped \"}] \\ and unicode é☃\U0001F600", "numbers": [1, -2.5e-3, None, True]},
+        "2.0.0": {"dist": {"tarball": "https://registry.npmjs.org/package/-/package-2.0.0.tgz", "shasum": "abc"}},
+    },
+    "time": {"created": "2020-01-01T00:00:00.000Z", "1.0.0": "2020-01-01T00:00:00.000Z",
+             "2.0.0": "2021-01-01T00:00:00.000Z"},
+    "maintainers": [{"name": "maintainer", "email": "maintainer@example.com"}],
+    "description": "description",
+    "readme": "readme of the latest version",
+}
+
+
+def get_chunks(document: dict, chunk_size: int) -> list[bytes]:
+    raw = json.dumps(document, ensure_ascii=False).encode()
+    return [raw[i:i + chunk_size] for i in range(0, len(raw), chunk_size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+def test_read_packument(chunk_size):
+    packument = read_packument(get_chunks(PACKUMENT, chunk_size))
+    assert packument == {
+        "name": "package",
+        "dist-tags": {"latest": "2.0.0"},
+        "versions": {"1.0.0": None, "2.0.0": PACKUMENT["versions"]["2.0.0"]},
+        "time": PACKUMENT["time"],
+        "maintainers": PACKUMENT["maintainers"],
+        "description": "description",
+    }
+
+    packument = read_packument(get_chunks(PACKUMENT, chunk_size), "1.0.0")
+    assert packument["versions"] == {"1.0.0": PACKUMENT["versions"]["1.0.0"], "2.0.0": None}
+    assert read_packument_versions(get_chunks(PACKUMENT, chunk_size)) == ["1.0.0", "2.0.0"]
+
+
+def test_read_packument_versions_before_dist_tags():
+    document = {key: PACKUMENT[key] for key in ("name", "versions", "dist-tags")}
+    packument = read_packument(get_chunks(document, 16))
+    assert packument["versions"] == {"1.0.0": None, "2.0.0": PACKUMENT["versions"]["2.0.0"]}
+
+
+def test_packument_metadata():
+    expected = get_package_metadata(ECOSYSTEM.NPM, PACKUMENT)
+    metadata = get_package_metadata(ECOSYSTEM.NPM, read_packument(get_chunks(PACKUMENT, 64)))
+    for attribute in PackageMetadata.__slots__:
+        assert getattr(metadata, attribute) == getattr(expected, attribute)
+
+
+@pytest.mark.parametrize("document", ['{"a": [1, 2}', '{"a": "unterminated', '{"a" 1}', '[1]'])
+def test_invalid_documents(document):
+    stream = JsonStream([document])
+    with pytest.raises(ValueError):
+        for _ in stream.iter_object():
+            stream.skip_value()
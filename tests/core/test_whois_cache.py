@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest.mock
+from datetime import datetime
+
+import pytest
+
+from guarddog.utils.whois_cache import WhoisCache
+
+
+class LocalWhoisBackend:
+    def __init__(self, domains: dict, delay: float = 0) -> None:
+        self.domains = domains
+        self.delay = delay
+        self.queries = []  # type: list[str]
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def query(self, domain):
+        with self.lock:
+            self.queries.append(domain)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        if domain not in self.domains:
+            return None, False
+        return self.domains[domain], True
+
+
+def test_lookups_are_persisted(tmp_path):
+    backend = LocalWhoisBackend({"gmail.com": datetime(1995, 8, 13)})
+    path = str(tmp_path / "domains.sqlite3")
+
+    assert WhoisCache(backend, path).lookup("Gmail.com.").creation_date == datetime(1995, 8, 13)
+    information = WhoisCache(backend, path).lookup("gmail.com")
+
+    assert information.creation_date == datetime(1995, 8, 13)
+    assert information.registered
+    assert backend.queries == ["gmail.com"]
+
+
+def test_unregistered_domains_expire_sooner():
+    backend = LocalWhoisBackend({"gmail.com": datetime(1995, 8, 13)})
+    cache = WhoisCache(backend, ttl=100, negative_ttl=10)
+    now = time.time()
+
+    with unittest.mock.patch("time.time", return_value=now):
+        assert not cache.lookup("nope.com").registered
+        cache.lookup("gmail.com")
+    with unittest.mock.patch("time.time", return_value=now + 50):
+        cache.lookup("nope.com")
+        cache.lookup("gmail.com")
+
+    assert backend.queries == ["nope.com", "gmail.com", "nope.com"]
+
+
+def test_failed_lookups_are_not_cached():
+    backend = unittest.mock.Mock()
+    backend.query.side_effect = [TimeoutError("rate limited"), (datetime(1995, 8, 13), True)]
+    cache = WhoisCache(backend)
+
+    with pytest.raises(TimeoutError):
+        cache.lookup("gmail.com")
+    assert cache.lookup("gmail.com").registered
+
+
+def test_concurrent_lookups_are_coalesced_and_bounded():
+    domains = {f"domain{i}.com": datetime(2000, 1, 1) for i in range(4)}
+    backend = LocalWhoisBackend(domains, delay=0.1)
+    cache = WhoisCache(backend, max_concurrent_queries=2)
+
+    threads = [threading.Thread(target=cache.lookup, args=(domain,)) for domain in domains for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(backend.queries) == sorted(domains)
+    assert backend.max_running <= 2